@@ -1,3 +1,12 @@
 from .utils.structures import *
 from .utils.pbar import ProgressBar
+from .utils.quota import QuotaScheduler, RateLimit
+from .utils.retry import RetryPolicy, RetryEvent
+from .utils.token_store import TokenStore, FileTokenStore, MemoryTokenStore
+from .utils.metrics import RequestHook, RequestMetrics, MetricsAggregator, LatencyHistogram
+from .utils.upload_journal import UploadJournal, JournalEntry, JournalStatus
+from .utils.dedup_index import DedupIndex, hash_files
+from .utils.transcoder import Transcoder, TranscodeCache
+from .utils.ttl_cache import TTLCache
+from .utils.thumbnail_store import ThumbnailStore
 from .objects import *
@@ -1,11 +1,12 @@
-import pathlib
+import math
 from typing import Optional, Generator, Iterable
 from requests.models import Response  # type:ignore
-from .core import GooglePhotos, CoreAlbum, CoreEnrichmentItem
+from .core import GooglePhotos, CoreAlbum, CoreEnrichmentItem, DEFAULT_UPLOAD_WORKERS, \
+    MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, ALBUM_LIST_DEFAULT_PAGE_SIZE, ALBUM_LIST_MAXIMUM_PAGE_SIZE, \
+    DownloadResult, DEFAULT_DOWNLOAD_WORKERS
 from .MediaItem import MediaItem
-from ..utils import PositionType, EnrichmentType, RequestType, AlbumMaskType,\
-    NewMediaItem, SimpleMediaItem, MediaItemResult
-from ..utils import Path, NextPageToken, get_python_version
+from ..utils import PositionType, EnrichmentType, AlbumMaskType, MediaItemResult
+from ..utils import Path, NextPageToken, UploadJournal, DedupIndex, paginate, limit_pages, get_python_version
 if get_python_version() < (3, 9):
     from typing import List as t_list, Tuple as t_tuple
 else:
@@ -55,14 +56,18 @@ class Album(CoreAlbum):
     @staticmethod
     def all_albums(
         gp: GooglePhotos,
-        pageSize: int = 20,
+        pageSize: Optional[int] = None,
         prevPageToken: Optional[NextPageToken] = None,
-        excludeNonAppCreatedData: bool = False
+        excludeNonAppCreatedData: bool = False,
+        pre_fetch: int = 0,
+        limit: int = math.inf  # type:ignore
     ) -> Generator["Album", None, None]:
         """gets all albums serially
         Args:
             pageSize (int): Maximum number of albums to return in the response.
                 Fewer albums might be returned than the specified number. The default pageSize is 20, the maximum is 50.
+                Defaults to None which is ALBUM_LIST_DEFAULT_PAGE_SIZE without a limit,
+                and pages sized to the albums still missing, up to ALBUM_LIST_MAXIMUM_PAGE_SIZE, with one.
             pageToken (str): A continuation token to get the next page of the results.
                 Adding this to the request returns the rows after the pageToken.
                 The pageToken should be the value returned in the nextPageToken parameter in the response
@@ -70,21 +75,25 @@ class Album(CoreAlbum):
             excludeNonAppCreatedData (bool): If set, the results exclude media items that were not created by this app.
                 Defaults to false (all albums are returned).
                 This field is ignored if the photoslibrary.readonly.appcreateddata scope is used.
+            pre_fetch (int): how many pages to fetch ahead on a background thread while the current one is consumed.
+                Defaults to 0 which fetches each page only when it is needed.
+            limit (int): how many albums to return at most, no page is fetched once they were received.
+                Defaults to all of them.
         Raises:
             HTTPError: if the request fails
 
         Returns:
             Generator[Album, None, None]: a generator of Album objects
         """
-        gen, prevPageToken = Album.list(
-            gp, pageSize, None, excludeNonAppCreatedData)
-        if gen:
-            yield from (Album._from_core(g) for g in gen)
-        while prevPageToken:
-            gen, prevPageToken = Album.list(
-                gp, pageSize, prevPageToken, excludeNonAppCreatedData)
-            if gen:
-                yield from (Album._from_core(g) for g in gen)
+        def fetch(pageToken: Optional[NextPageToken], size: int):
+            gen, pageToken = Album.list(gp, size, pageToken, excludeNonAppCreatedData)
+            return (Album._from_core(g) for g in gen or []), pageToken
+        yield from paginate(
+            limit_pages(fetch, pageSize or ALBUM_LIST_DEFAULT_PAGE_SIZE, limit,
+                        pageSize or ALBUM_LIST_MAXIMUM_PAGE_SIZE),
+            prevPageToken,
+            pre_fetch=pre_fetch
+        )
 
     @staticmethod
     def exists(
@@ -187,30 +196,53 @@ class Album(CoreAlbum):
             ))
         return items
 
-    def get_media(self) -> Iterable[MediaItem]:
-        """gets all media in album
+    def get_media(
+        self,
+        pre_fetch: int = 0,
+        limit: int = math.inf  # type:ignore
+    ) -> Generator[MediaItem, None, None]:
+        """gets all media in album, following every page of the listing
 
-        Returns:
-            Iterable[GooglePhotosMediaItem]: all media of the album
+        Args:
+            pre_fetch (int, optional): how many pages to fetch ahead on a background thread
+                while the current one is consumed. Defaults to 0.
+            limit (int, optional): how many media items to return at most. Defaults to all of them.
+
+        Raises:
+            HTTPError: if a request has failed
 
         Yields:
-            Iterator[Iterable[GooglePhotosMediaItem]]: _description_
+            Generator[MediaItem, None, None]: the media of the album, in the order of the album
         """
-        endpoint = "https://photoslibrary.googleapis.com/v1/mediaItems:search"
-        data = {
-            "albumId": self.id
-        }
-        response = self.gp.request(
-            RequestType.POST, endpoint, json=data)
-        if not response.status_code == 200:
-            return []
-        j = response.json()
-        if "mediaItems" not in j:
-            return []
-        res = []
-        for dct in j["mediaItems"]:
-            res.append(MediaItem.from_dict(self.gp, dct))
-        return res
+        yield from MediaItem.search_all(
+            self.gp,
+            albumId=self.id,
+            pageSize=MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE,
+            pre_fetch=pre_fetch,
+            limit=limit
+        )
+
+    def download(
+        self,
+        directory: Path = ".",
+        max_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        overwrite: bool = False,
+        keep_times: bool = True
+    ) -> Generator[DownloadResult, None, None]:
+        """downloads the original bytes of all media in album into 'directory', see MediaItem.download_all
+
+        Args:
+            directory (Path, optional): where to save the files. Defaults to ".".
+            max_workers (int, optional): how many files to download at once. Defaults to DEFAULT_DOWNLOAD_WORKERS.
+            overwrite (bool, optional): whether to download a file which already exists again. Defaults to False.
+            keep_times (bool, optional): whether to give every file the creation time of its media item.
+                Defaults to True.
+
+        Yields:
+            Generator[DownloadResult, None, None]: the results in the order they complete
+        """
+        yield from MediaItem.download_all(
+            self.gp, self.get_media(pre_fetch=True), directory, max_workers, overwrite, keep_times)
 
     def set_title(self, new_title: str) -> Response:
         """sets the title of an album
@@ -228,35 +260,32 @@ class Album(CoreAlbum):
 
     def upload_and_add(
         self,
-        paths: Iterable[Path]
+        paths: Iterable[Path],
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        journal: Optional[UploadJournal] = None,
+        dedup: Optional[DedupIndex] = None
     ) -> t_list[MediaItemResult]:
-        """uploads the media to the library and also adds them to current album
+        """uploads the media to the library and also adds them to current album.
+        the files are uploaded concurrently and created in batches while the rest are still uploading
 
         Args:
             paths (Iterable[Path]): paths to media files
+            max_workers (int, optional): how many files to upload at once. Defaults to DEFAULT_UPLOAD_WORKERS.
+            journal (Optional[UploadJournal], optional): records the progress so that running the same job
+                again only uploads what is missing. Defaults to None.
+            dedup (Optional[DedupIndex], optional): files whose contents are in it are not uploaded,
+                their existing media items are added to the album instead. all of the files are hashed up front.
+                Defaults to None.
 
         Returns:
-            list[MediaItemResult]: resulting objects of the uploads
+            list[MediaItemResult]: resulting objects of the uploads, in the order of 'paths'
         """
-        # same code as MediaItem.add_to_library but it is more memory efficient this way
-        items: t_list[NewMediaItem] = []
-        for path in paths:
-            token = MediaItem.upload_media(self.gp, path)
-            filename = pathlib.Path(path).stem
-            item = NewMediaItem("", SimpleMediaItem(token, filename))
-            items.append(item)
-        batches: t_list[t_list[NewMediaItem]] = []
-        batch: t_list[NewMediaItem] = []
-        for item in items:
-            if len(batch) >= 50:
-                batches.append(batch)
-                batch = []
-            batch.append(item)
-        batches.append(batch)
-        res = []
-        for batch in batches:
-            res.extend(MediaItem.batchCreate(self.gp, batch, self.id))
-        return res
+        results = sorted(
+            MediaItem.add_to_library_iter(self.gp, paths, max_workers, albumId=self.id, journal=journal, dedup=dedup,
+                                          hash_ahead=True),
+            key=lambda r: r.index
+        )
+        return [result.result for result in results]
 
 
 __all__ = [
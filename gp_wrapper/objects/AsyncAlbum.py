@@ -0,0 +1,59 @@
+import math
+from typing import Optional, AsyncGenerator
+from .core import AsyncGooglePhotos, AsyncCoreAlbum, CoreAlbum, ALBUM_LIST_DEFAULT_PAGE_SIZE, \
+    ALBUM_LIST_MAXIMUM_PAGE_SIZE
+from .Album import Album
+from ..utils import NextPageToken, limit_pages
+
+
+class AsyncAlbum(AsyncCoreAlbum):
+    """asyncio counterparts of the higher order static methods of Album
+    """
+
+    @staticmethod
+    async def get(agp: AsyncGooglePhotos, albumId: str) -> Optional[Album]:  # type:ignore
+        """asyncio counterpart of Album.get
+
+        Returns:
+            Optional[Album]: the desired album
+        """
+        core = await AsyncCoreAlbum.get(agp, albumId)
+        if not core:
+            return None
+        return Album._from_core(core)
+
+    @staticmethod
+    async def all_albums(
+        agp: AsyncGooglePhotos,
+        pageSize: Optional[int] = None,
+        prevPageToken: Optional[NextPageToken] = None,
+        excludeNonAppCreatedData: bool = False,
+        limit: int = math.inf  # type:ignore
+    ) -> AsyncGenerator[Album, None]:
+        """asyncio counterpart of Album.all_albums
+
+        Additional Args:
+            pageSize (Optional[int]): Defaults to None which is ALBUM_LIST_DEFAULT_PAGE_SIZE without a limit,
+                and pages sized to the albums still missing, up to ALBUM_LIST_MAXIMUM_PAGE_SIZE, with one.
+            limit (int): how many albums to return at most, no page is fetched once they were received.
+                Defaults to all of them.
+
+        Yields:
+            AsyncGenerator[Album, None]: the resulting objects
+        """
+        def list_albums(pageToken: Optional[NextPageToken], size: int):
+            gen, pageToken = CoreAlbum.list(agp.gp, size, pageToken, excludeNonAppCreatedData)
+            return list(gen) if gen else [], pageToken
+        fetch = limit_pages(list_albums, pageSize or ALBUM_LIST_DEFAULT_PAGE_SIZE, limit,
+                            pageSize or ALBUM_LIST_MAXIMUM_PAGE_SIZE)
+        while True:
+            lst, prevPageToken = await agp.run(fetch, prevPageToken)
+            for o in lst or []:
+                yield Album._from_core(o)
+            if not prevPageToken:
+                break
+
+
+__all__ = [
+    "AsyncAlbum"
+]
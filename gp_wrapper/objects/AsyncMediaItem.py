@@ -0,0 +1,83 @@
+import math
+from typing import Optional, AsyncGenerator
+from .core import AsyncGooglePhotos, AsyncCoreMediaItem, CoreMediaItem, SearchFilter, \
+    MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE
+from .MediaItem import MediaItem
+from ..utils import NextPageToken, limit_pages
+
+
+class AsyncMediaItem(AsyncCoreMediaItem):
+    """asyncio counterparts of the higher order static methods of MediaItem
+    """
+
+    @staticmethod
+    async def search_all(
+        agp: AsyncGooglePhotos,
+        albumId: Optional[str] = None,
+        pageSize: Optional[int] = None,
+        filters: Optional[SearchFilter] = None,
+        orderBy: Optional[str] = None,
+        tokens_to_use: int = math.inf,  # type:ignore
+        limit: int = math.inf  # type:ignore
+    ) -> AsyncGenerator[MediaItem, None]:
+        """asyncio counterpart of MediaItem.search_all
+
+        Additional Args:
+            pageSize (Optional[int]): Defaults to None which is MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE without a limit,
+                and pages sized to the items still missing, up to MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, with one.
+                when given with a limit it is the maximal size of a page.
+            tokens_to_use (int): how many times to use the token automatically to fetch the next batch.
+                Defaults to using all tokens.
+            limit (int): how many media items to return at most, no page is fetched once they were received.
+                Defaults to all of them.
+
+        Yields:
+            AsyncGenerator[MediaItem, None]: the resulting objects
+        """
+        if not (0 < tokens_to_use):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError(
+                "'tokens_to_use' should be a positive integer")
+
+        def search(pageToken: Optional[NextPageToken], size: int):
+            gen, pageToken = CoreMediaItem.search(agp.gp, albumId, size, pageToken, filters, orderBy)
+            return list(gen), pageToken
+        fetch = limit_pages(search, pageSize or MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE, limit,
+                            pageSize or MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE)
+        pageToken: Optional[NextPageToken] = None
+        while tokens_to_use > 0:
+            lst, pageToken = await agp.run(fetch, pageToken)
+            tokens_to_use -= 1
+            for o in lst or []:
+                yield MediaItem._from_core(o)
+            if not pageToken:
+                break
+
+    @staticmethod
+    async def all_media(
+        agp: AsyncGooglePhotos,
+        limit: int = math.inf  # type:ignore
+    ) -> AsyncGenerator[MediaItem, None]:
+        """asyncio counterpart of MediaItem.all_media
+
+        Args:
+            agp (AsyncGooglePhotos): the object to use
+            limit (int, optional): how many media items to return at most,
+                the last page is sized to the items still missing. Defaults to all of them.
+
+        Yields:
+            AsyncGenerator[MediaItem, None]: the resulting objects
+        """
+        fetch = limit_pages(lambda token, size: CoreMediaItem.list(agp.gp, size, token),
+                            MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, limit)
+        pageToken: Optional[NextPageToken] = None
+        while True:
+            lst, pageToken = await agp.run(fetch, pageToken)
+            for o in lst or []:
+                yield MediaItem._from_core(o)
+            if not pageToken:
+                break
+
+
+__all__ = [
+    "AsyncMediaItem"
+]
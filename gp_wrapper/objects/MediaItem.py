@@ -1,16 +1,18 @@
-import pathlib
 import math
-from threading import Semaphore
+import datetime
 from typing import Generator, Optional, Iterable
-from queue import Queue
 from requests.models import Response  # pylint: disable=import-error
 from gp_wrapper.objects.core.gp import GooglePhotos
 from gp_wrapper.objects.core.media_item.core_media_item import CoreMediaItem
 from gp_wrapper.objects.core.media_item.filters import SearchFilter
 from gp_wrapper.utils import AlbumId, AlbumPosition, MediaItemResult, NewMediaItem, NextPageToken, Path
 from .core import GooglePhotos, CoreMediaItem, MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE,\
-    MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS
-from ..utils import MediaItemMaskTypes, NewMediaItem, SimpleMediaItem, get_python_version
+    MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, UploadPipeline, UploadResult, DEFAULT_UPLOAD_WORKERS, \
+    DEFAULT_UPLOAD_MAX_PENDING, LibraryScanner, DEFAULT_SCAN_WORKERS, \
+    QueryPlanner, MediaQuery, DEFAULT_QUERY_WORKERS, MediaDownloader, DownloadResult, DEFAULT_DOWNLOAD_WORKERS, \
+    Thumbnailer
+from ..utils import MediaItemMaskTypes, NewMediaItem, UploadJournal, DedupIndex, Transcoder, paginate, limit_pages, \
+    CropMode, ThumbnailStore, get_python_version
 if get_python_version() < (3, 9):
     from typing import List as t_list, Tuple as t_tuple  # pylint: disable=ungrouped-imports,redefined-builtin
 else:
@@ -29,6 +31,8 @@ class MediaItem(CoreMediaItem):
         filename (str): name of media
         baseUrl (str, optional): ?. Defaults to "".
         description (str, optional): media's description. Defaults to "".
+        baseUrlFetchedAt (float, optional): the time.time() of when 'baseUrl' was received.
+            Defaults to None which is now if there is a 'baseUrl'.
     """
     # ================================= STATIC HELPER METHODS =================================
 
@@ -43,7 +47,8 @@ class MediaItem(CoreMediaItem):
             filename=obj.filename,
             baseUrl=obj.baseUrl,
             description=obj.description,
-            contributorInfo=obj.contributorInfo
+            contributorInfo=obj.contributorInfo,
+            baseUrlFetchedAt=obj.baseUrlFetchedAt
         )
 
     # ================================= ADDITIONAL STATIC METHODS =================================
@@ -65,103 +70,203 @@ class MediaItem(CoreMediaItem):
     def search_all(
         gp: GooglePhotos,
         albumId: Optional[str] = None,
-        pageSize: int = 25,
+        pageSize: Optional[int] = None,
         filters: Optional[SearchFilter] = None,
         orderBy: Optional[str] = None,
         tokens_to_use: int = math.inf,  # type:ignore
-        # pre_fetch: bool = False
+        pre_fetch: int = 0,
+        limit: int = math.inf  # type:ignore
     ) -> Generator["MediaItem", None, None]:
         """like CoreGPMediaItem.search but automatically converts the objects to the
         higher order class and automatically uses the tokens to get all objects
 
         Additional Args:
+            pageSize (Optional[int]): Defaults to None which is MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE without a limit,
+                and pages sized to the items still missing, up to MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, with one.
+                when given with a limit it is the maximal size of a page.
             tokens_to_use (int): how many times to use the token automatically to fetch the next batch.
                 Defaults to using all tokens.
-            pre_fetch (Boolean): whether to non-blocking-ly fetch ALL available items using the tokens
-                Defaults to False.
+            pre_fetch (int): how many pages to fetch ahead on a background thread while the current one is consumed.
+                True is DEFAULT_PREFETCH_PAGES. Defaults to 0 which fetches each page only when it is needed.
+            limit (int): how many media items to return at most, no page is fetched once they were received.
+                Defaults to all of them.
         """
-        q: Queue[MediaItem] = Queue()  # pylint: disable=unsubscriptable-object
-        sem = Semaphore(0)
         if not (0 < tokens_to_use):  # pylint: disable=unneeded-not,superfluous-parens
             raise ValueError(
                 "'tokens_to_use' should be a positive integer")
 
-        def inner_logic(blocking: bool = True) -> Optional[Generator]:
-            nonlocal tokens_to_use
+        def fetch(pageToken: Optional[NextPageToken], size: int):
             core_gen, pageToken = CoreMediaItem.search(
-                gp, albumId, pageSize, None, filters, orderBy)
-            tokens_to_use -= 1
-            for o in (MediaItem._from_core(o) for o in core_gen):
-                if blocking:
-                    yield o
-                else:
-                    q.put(o)
-                sem.release()
-            while pageToken and tokens_to_use > 0:
-                core_gen, pageToken = CoreMediaItem.search(
-                    gp, albumId, pageSize, pageToken, filters, orderBy)
-                tokens_to_use -= 1
-                for o in (MediaItem._from_core(o) for o in core_gen):
-                    if blocking:
-                        yield o
-                    else:
-                        q.put(o)
-                    sem.release()
-        # if pre_fetch:
-        #     # _TODO fix this part
-        #     raise NotImplementedError("pre_fetch is currently not supported")
-        #     t = Thread(target=inner_logic, args=(False,))
-        #     t.start()
-        #     with sem:
-        #         # re-add value that was used as a barrier
-        #         sem.release()
-        #         while not q.empty():
-        #             with sem:
-        #                 yield q.get()
-        # else:
-        yield from inner_logic()  # type:ignore
+                gp, albumId, size, pageToken, filters, orderBy)
+            return (MediaItem._from_core(o) for o in core_gen), pageToken
+        yield from paginate(
+            limit_pages(fetch, pageSize or MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE, limit,
+                        pageSize or MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE),
+            max_pages=tokens_to_use,
+            pre_fetch=pre_fetch
+        )
 
     @staticmethod
-    def all_media(gp: GooglePhotos) -> Generator["MediaItem", None, None]:
+    def all_media(
+        gp: GooglePhotos,
+        pre_fetch: int = 0,
+        limit: int = math.inf  # type:ignore
+    ) -> Generator["MediaItem", None, None]:
         """uses MediaItem.list under the hood to pull all media
 
+        Args:
+            gp (GooglePhotos): Google Photos object
+            pre_fetch (int, optional): how many pages to fetch ahead on a background thread. Defaults to 0.
+            limit (int, optional): how many media items to return at most,
+                the last page is sized to the items still missing. Defaults to all of them.
+
         Yields:
             Generator[MediaItem, None, None]: the resulting objects
         """
-        lst, token = MediaItem.list(
-            gp, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, None)
-        yield from lst
-        while token:
-            lst, token = MediaItem.list(
-                gp, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, token)
-            yield from lst
+        yield from paginate(
+            limit_pages(lambda token, size: MediaItem.list(gp, size, token), MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, limit),
+            pre_fetch=pre_fetch
+        )
+
+    @staticmethod
+    def query(
+        gp: GooglePhotos,
+        *queries: MediaQuery,
+        ordered: bool = False,
+        max_workers: int = DEFAULT_QUERY_WORKERS
+    ) -> Generator["MediaItem", None, None]:
+        """like MediaItem.search_all but with queries which are not bound by the limits of a single request,
+        see QueryPlanner
+
+        Args:
+            gp (GooglePhotos): Google Photos object
+            *queries (MediaQuery): an item is returned if it matches any of them
+            ordered (bool, optional): whether to yield newest first. Defaults to False.
+            max_workers (int, optional): how many pages to fetch at once. Defaults to DEFAULT_QUERY_WORKERS.
+
+        Yields:
+            Generator[MediaItem, None, None]: every matching media item once
+        """
+        planner = QueryPlanner(gp, max_workers)
+        yield from (MediaItem._from_core(o) for o in planner.search(*queries, ordered=ordered))
 
     @staticmethod
-    def add_to_library(gp: GooglePhotos, paths: Iterable[Path]) -> t_list[Optional["MediaItem"]]:
-        """a higher order function to add media to the library without needing to use lower-end API functions
+    def scan_all(
+        gp: GooglePhotos,
+        max_workers: int = DEFAULT_SCAN_WORKERS,
+        ordered: bool = True,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None
+    ) -> Generator["MediaItem", None, None]:
+        """like MediaItem.all_media but pages through ranges of creation dates concurrently, see LibraryScanner.
+        NOTE: media items without a creation date are not returned
+
+        Args:
+            gp (GooglePhotos): Google Photos object
+            max_workers (int, optional): how many pages to fetch at once. Defaults to DEFAULT_SCAN_WORKERS.
+            ordered (bool, optional): whether to yield newest first or as soon as each page arrives.
+                Defaults to True.
+            start (Optional[datetime.date], optional): the oldest creation date to scan. Defaults to None.
+            end (Optional[datetime.date], optional): the newest creation date to scan. Defaults to None.
+
+        Yields:
+            Generator[MediaItem, None, None]: every media item once
+        """
+        scanner = LibraryScanner(gp, max_workers, ordered, start, end)
+        yield from (MediaItem._from_core(o) for o in scanner.scan())
+
+    @staticmethod
+    def add_to_library(
+        gp: GooglePhotos,
+        paths: Iterable[Path],
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        journal: Optional[UploadJournal] = None,
+        dedup: Optional[DedupIndex] = None
+    ) -> t_list[Optional["MediaItem"]]:
+        """a higher order function to add media to the library without needing to use lower-end API functions.
+        the files are uploaded concurrently, see MediaItem.add_to_library_iter.
+        pass a journal to be able to resume the job after it was interrupted
+        and a dedup index to not upload files which are already in the library.
+        with a dedup index all of the files are hashed up front, see UploadPipeline.hash_ahead
 
         Returns:
-            list[Optional[MediaItem]]: list of resulting objects for further use
+            list[Optional[MediaItem]]: list of resulting objects for further use, in the order of 'paths'.
+                None for files which have failed
         """
-        items: t_list[NewMediaItem] = []
-        for path in paths:
-            token = MediaItem.upload_media(gp, path)
-            filename = pathlib.Path(path).stem
-            item = NewMediaItem("", SimpleMediaItem(token, filename))
-            items.append(item)
-        batches: t_list[t_list[NewMediaItem]] = []
-        batch: t_list[NewMediaItem] = []
-        for item in items:
-            if len(batch) >= MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS:
-                batches.append(batch)
-                batch = []
-            batch.append(item)
-        batches.append(batch)
-        res = []
-        for batch in batches:
-            res.extend(
-                [item.mediaItem for item in MediaItem.batchCreate(gp, batch)])
-        return res
+        results = sorted(
+            MediaItem.add_to_library_iter(gp, paths, max_workers, journal=journal, dedup=dedup, hash_ahead=True),
+            key=lambda r: r.index
+        )
+        return [result.mediaItem for result in results]  # type:ignore
+
+    @staticmethod
+    def add_to_library_iter(
+        gp: GooglePhotos,
+        paths: Iterable[Path],
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        max_pending: int = DEFAULT_UPLOAD_MAX_PENDING,
+        albumId: Optional[AlbumId] = None,
+        journal: Optional[UploadJournal] = None,
+        dedup: Optional[DedupIndex] = None,
+        transcoder: Optional[Transcoder] = None,
+        hash_ahead: bool = False
+    ) -> Generator[UploadResult, None, None]:
+        """like MediaItem.add_to_library but yields the result of each file as soon as it has been created
+
+        Args:
+            gp (GooglePhotos): Google Photos object
+            paths (Iterable[Path]): the files to add. consumed lazily unless 'hash_ahead' is passed
+            max_workers (int, optional): how many files to upload at once. Defaults to DEFAULT_UPLOAD_WORKERS.
+            max_pending (int, optional): how many files may be in progress at once.
+                Defaults to DEFAULT_UPLOAD_MAX_PENDING.
+            albumId (Optional[AlbumId], optional): an album to also add the media to. Defaults to None.
+            journal (Optional[UploadJournal], optional): records the progress so that running the same job
+                again only uploads what is missing. Defaults to None.
+            dedup (Optional[DedupIndex], optional): files whose contents are in it are linked
+                instead of uploaded. Defaults to None.
+            transcoder (Optional[Transcoder], optional): converts the videos which need it.
+                Defaults to None which uses Transcoder.default().
+            hash_ahead (bool, optional): whether to hash all of the files on a pool of processes
+                before the first upload instead of on the upload threads, see UploadPipeline.hash_ahead.
+                Defaults to False.
+
+        Yields:
+            Generator[UploadResult, None, None]: the results in the order they complete
+        """
+        pipeline = UploadPipeline(gp, albumId, max_workers, max_pending, journal=journal, dedup=dedup,
+                                  transcoder=transcoder)
+        digests = None
+        if hash_ahead:
+            paths = list(paths)
+            digests = pipeline.hash_ahead(paths)
+        yield from pipeline.run(paths, digests)
+
+    @staticmethod
+    def download_all(
+        gp: GooglePhotos,
+        mediaItems: Iterable[CoreMediaItem],
+        directory: Path = ".",
+        max_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        overwrite: bool = False,
+        keep_times: bool = True
+    ) -> Generator[DownloadResult, None, None]:
+        """downloads the original bytes of media items, i.e the results of a search, see MediaDownloader
+
+        Args:
+            gp (GooglePhotos): Google Photos object
+            mediaItems (Iterable[CoreMediaItem]): the media items. consumed lazily
+            directory (Path, optional): where to save the files. Defaults to ".".
+            max_workers (int, optional): how many files to download at once. Defaults to DEFAULT_DOWNLOAD_WORKERS.
+            overwrite (bool, optional): whether to download a file which already exists again. Defaults to False.
+            keep_times (bool, optional): whether to give every file the creation time of its media item.
+                Defaults to True.
+
+        Yields:
+            Generator[DownloadResult, None, None]: the results in the order they complete
+        """
+        downloader = MediaDownloader(gp, directory, max_workers, overwrite=overwrite, keep_times=keep_times)
+        yield from downloader.run(mediaItems)
+
     # ================================= OVERRIDDEN STATIC METHODS =================================
 
     @staticmethod
@@ -172,6 +277,10 @@ class MediaItem(CoreMediaItem):
         albumPosition: Optional[AlbumPosition] = None
     ) -> t_list[MediaItemResult]:
         return CoreMediaItem.batchCreate(gp, newMediaItems, albumId, albumPosition)
+
+    @staticmethod
+    def get(gp: GooglePhotos, mediaItemId: str) -> "MediaItem":
+        return MediaItem._from_core(CoreMediaItem.get(gp, mediaItemId))
     # ================================= OVERRIDDEN INSTANCE METHODS =================================
 
     @staticmethod
@@ -184,6 +293,49 @@ class MediaItem(CoreMediaItem):
         return [MediaItem._from_core(o) for o in lst], token
     # ================================= ADDITIONAL INSTANCE METHODS =================================
 
+    def download(self, directory: Path = ".", overwrite: bool = False, keep_times: bool = True) -> DownloadResult:
+        """downloads the original bytes of this media item into 'directory', see MediaDownloader
+
+        Args:
+            directory (Path, optional): where to save the file. Defaults to ".".
+            overwrite (bool, optional): whether to download the file if it already exists. Defaults to False.
+            keep_times (bool, optional): whether to give the file the creation time of the media item.
+                Defaults to True.
+
+        Returns:
+            DownloadResult: the result, with the error if the download has failed
+        """
+        return MediaDownloader(self.gp, directory, 1, overwrite=overwrite, keep_times=keep_times).download(self)
+
+    def thumbnail(self, width: int, height: int, crop: CropMode = CropMode.FIT,
+                  store: Optional[ThumbnailStore] = None) -> bytes:
+        """returns the thumbnail of this media item in a given size, fetching it only if it isn't cached,
+        see Thumbnailer
+
+        Args:
+            width (int): the maximal width in pixels
+            height (int): the maximal height in pixels
+            crop (CropMode, optional): how to fit the media item into the size. Defaults to CropMode.FIT.
+            store (Optional[ThumbnailStore], optional): where the thumbnails are cached.
+                Defaults to None which is ThumbnailStore.default().
+
+        Raises:
+            HTTPError: if the thumbnail could not be fetched
+
+        Returns:
+            bytes: the thumbnail
+        """
+        return Thumbnailer(self.gp, store).get(self, width, height, crop)
+
+    def thumbnail_path(self, width: int, height: int, crop: CropMode = CropMode.FIT,
+                       store: Optional[ThumbnailStore] = None) -> Path:
+        """like thumbnail but returns the path of the cached file
+
+        Returns:
+            Path: the path of the thumbnail
+        """
+        return Thumbnailer(self.gp, store).path(self, width, height, crop)
+
     def set_description(self, description: str) -> Response:
         """sets the description to the MediaItem
 
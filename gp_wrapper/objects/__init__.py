@@ -1,3 +1,7 @@
 from .core import *
 from .Album import Album
 from .MediaItem import MediaItem
+from .AsyncAlbum import AsyncAlbum
+from .AsyncMediaItem import AsyncMediaItem
+from .library_mirror import LibraryMirror
+from .library_backup import LibraryBackup, BackupReport, BackupEntry
@@ -2,6 +2,9 @@ from .enrichment_item import *
 # ===============
 # the order matters
 from .media_item import *
+from .observer import *
 from .gp import *
+from .async_gp import *
 # ===============
 from .album import *
+from .async_album import *
@@ -13,6 +13,9 @@ if get_python_version() < (3, 9):
 else:
     from builtins import tuple as t_tuple, dict as t_dict  # type:ignore
 
+ALBUM_LIST_DEFAULT_PAGE_SIZE: int = 20
+ALBUM_LIST_MAXIMUM_PAGE_SIZE: int = 50
+
 
 class CoreAlbum(Printable, OnlyPrivate):
     """the basic wrapper class over 'Album' object
@@ -136,6 +139,8 @@ class CoreAlbum(Printable, OnlyPrivate):
             "mediaItemIds": list(ids)
         }
         response = self.gp.request(RequestType.POST, endpoint, json=payload)
+        if response.status_code == 200:
+            self.gp.notify_observers("album_media_added", self.id, payload["mediaItemIds"])
         return response
 
     def batchRemoveMediaItems(self, ids: Iterable[MediaItemID]) -> Response:
@@ -152,11 +157,13 @@ class CoreAlbum(Printable, OnlyPrivate):
         Returns:
             Response: the response of the request
         """
-        endpoint = f"https://photoslibrary.googleapis.com/v1/albums/{self.id}:batchAddMediaItems"
+        endpoint = f"https://photoslibrary.googleapis.com/v1/albums/{self.id}:batchRemoveMediaItems"
         payload: dict = {
             "mediaItemIds": list(ids)
         }
         response = self.gp.request(RequestType.POST, endpoint, json=payload)
+        if response.status_code == 200:
+            self.gp.notify_observers("album_media_removed", self.id, payload["mediaItemIds"])
         return response
 
     def patch(self, mask_type: AlbumMaskType, field_value) -> Response:
@@ -180,6 +187,8 @@ class CoreAlbum(Printable, OnlyPrivate):
         }
         response = self.gp.request(
             RequestType.PATCH, endpoint, json=payload, params=params)
+        if response.status_code == 200:
+            self.gp.notify_observers("album_updated", CoreAlbum._from_dict(self.gp, response.json()))
         return response
 
     def share(self, isCollaborative: bool = True, isCommentable: bool = True) -> Response:
@@ -241,12 +250,14 @@ class CoreAlbum(Printable, OnlyPrivate):
         )
         dct = response.json()
         album = CoreAlbum._from_dict(gp, dct)
+        gp.notify_observers("album_updated", album)
         return album
 
     @staticmethod
     def get(gp: GooglePhotos, albumId: str) -> Optional["CoreAlbum"]:
         """Returns the album based on the specified albumId.
         The albumId must be the ID of an album owned by the user or a shared album that the user has joined.
+        the album is served from the cache of 'gp' if it was fetched within the cache's ttl
 
         Args:
             gp (CoreGooglePhotos): Google Photos object
@@ -258,22 +269,26 @@ class CoreAlbum(Printable, OnlyPrivate):
         Returns:
             CoreGPAlbum: the desired album
         """
-        endpoint = f"https://photoslibrary.googleapis.com/v1/albums/{albumId}"
-        response = gp.request(
-            RequestType.GET,
-            endpoint,
-            HeaderType.DEFAULT
-        )
-        if response.status_code not in {200, 400}:
-            response.raise_for_status()
-        if response.status_code == 200:
-            return CoreAlbum._from_dict(gp, response.json())
-        return None
+        dct = gp.cache.get(("album", albumId))
+        if dct is None:
+            endpoint = f"https://photoslibrary.googleapis.com/v1/albums/{albumId}"
+            response = gp.request(
+                RequestType.GET,
+                endpoint,
+                HeaderType.DEFAULT
+            )
+            if response.status_code not in {200, 400}:
+                response.raise_for_status()
+            if response.status_code != 200:
+                return None
+            dct = response.json()
+            gp.cache.put(("album", albumId), dct)
+        return CoreAlbum._from_dict(gp, dct)
 
     @staticmethod
     def list(
         gp: GooglePhotos,
-        pageSize: int = 20,
+        pageSize: int = ALBUM_LIST_DEFAULT_PAGE_SIZE,
         prevPageToken: Optional[NextPageToken] = None,
         excludeNonAppCreatedData: bool = False
     ) -> t_tuple[Optional[Generator["CoreAlbum", None, None]], Optional[NextPageToken]]:
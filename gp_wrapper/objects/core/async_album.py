@@ -0,0 +1,59 @@
+from typing import Optional, Iterable
+from requests import Response
+from .album import CoreAlbum
+from .async_gp import AsyncGooglePhotos
+from .media_item import MediaItemID
+from ...utils import NextPageToken, get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Tuple as t_tuple  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, tuple as t_tuple  # type:ignore
+
+
+class AsyncCoreAlbum:
+    """asyncio counterparts of the API methods of CoreAlbum.
+    see the matching CoreAlbum method for the full documentation of each argument
+    """
+
+    @staticmethod
+    async def get(agp: AsyncGooglePhotos, albumId: str) -> Optional[CoreAlbum]:
+        """asyncio counterpart of CoreAlbum.get
+
+        Returns:
+            Optional[CoreAlbum]: the desired album
+        """
+        return await agp.run(CoreAlbum.get, agp.gp, albumId)
+
+    @staticmethod
+    async def list(
+        agp: AsyncGooglePhotos,
+        pageSize: int = 20,
+        prevPageToken: Optional[NextPageToken] = None,
+        excludeNonAppCreatedData: bool = False
+    ) -> t_tuple[t_list[CoreAlbum], Optional[NextPageToken]]:
+        """asyncio counterpart of CoreAlbum.list
+
+        Returns:
+            tuple[list[CoreAlbum], Optional[NextPageToken]]: the resulting objects, token for next request.
+        """
+        def inner() -> t_tuple[t_list[CoreAlbum], Optional[NextPageToken]]:
+            gen, token = CoreAlbum.list(agp.gp, pageSize, prevPageToken, excludeNonAppCreatedData)
+            return list(gen) if gen else [], token
+        return await agp.run(inner)
+
+    @staticmethod
+    async def batchAddMediaItems(agp: AsyncGooglePhotos, album: CoreAlbum, ids: Iterable[MediaItemID]) -> Response:
+        """asyncio counterpart of CoreAlbum.batchAddMediaItems
+
+        Args:
+            album (CoreAlbum): the album to add the media items to
+
+        Returns:
+            Response: the response of the request
+        """
+        return await agp.run(album.batchAddMediaItems, list(ids))
+
+
+__all__ = [
+    "AsyncCoreAlbum"
+]
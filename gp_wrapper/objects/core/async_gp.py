@@ -0,0 +1,90 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, TypeVar, Any
+from requests import Response
+from .gp import GooglePhotos
+from ...utils import RequestType, HeaderType, ProgressBar, Printable, OnlyPrivate
+
+T = TypeVar("T")
+DEFAULT_ASYNC_CONCURRENCY: int = 32
+
+
+class AsyncGooglePhotos(Printable, OnlyPrivate):
+    """An asyncio client over GooglePhotos.
+    every call is dispatched to a pool of worker threads so that many
+    API calls can be in flight at once while awaiting them on a single event loop
+
+    Args:
+        gp (Optional[GooglePhotos], optional): an already authenticated GooglePhotos object to use.
+            Defaults to None which will create a new one from 'client_secrets_path'.
+        client_secrets_path (str, optional): path to the client secrets file.
+            Only used if 'gp' is not supplied. Defaults to "./client_secrets.json".
+        max_concurrency (int, optional): maximum amount of API calls to have in flight at the same time.
+            Defaults to DEFAULT_ASYNC_CONCURRENCY.
+    """
+
+    def __init__(
+        self,
+        gp: Optional[GooglePhotos] = None,
+        client_secrets_path: str = "./client_secrets.json",
+        max_concurrency: int = DEFAULT_ASYNC_CONCURRENCY
+    ) -> None:
+        if not (0 < max_concurrency):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_concurrency' should be a positive integer")
+        self.gp: GooglePhotos = gp if gp is not None else GooglePhotos(client_secrets_path)
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gp_wrapper")
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """runs a blocking function on the worker pool and awaits its result
+
+        Args:
+            func (Callable[..., T]): the function to run
+
+        Returns:
+            T: the result of the function
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def request(
+            self,
+            req_type: RequestType,
+            endpoint: str,
+            header_type: HeaderType = HeaderType.JSON,
+            pbar: Optional[ProgressBar] = None,
+            additional_headers: Optional[dict] = None,
+            **kwargs
+    ) -> Response:
+        """the asyncio counterpart of GooglePhotos.request, which is run on the worker pool
+
+        Args:
+            req_type (RequestType): the type of request
+            endpoint (str): the endpoint
+            header_type (HeaderType, optional): which header type should the request use. Defaults to HeaderType.JSON.
+
+        Raises:
+            RequestException: if no response was received and the request should not be retried
+
+        Returns:
+            Response: the response of the request
+        """
+        return await self.run(self.gp.request, req_type, endpoint, header_type, pbar, additional_headers, **kwargs)
+
+    def close(self) -> None:
+        """shuts down the worker pool. Already running calls are allowed to finish
+        """
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncGooglePhotos":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.close()
+
+
+__all__ = [
+    "AsyncGooglePhotos",
+    "DEFAULT_ASYNC_CONCURRENCY"
+]
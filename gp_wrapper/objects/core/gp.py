@@ -1,31 +1,248 @@
 import json
-from typing import Optional,  Callable
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional,  Callable, Union
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
+from google.auth.exceptions import RefreshError  # type:ignore
+from google.auth.transport.requests import Request as AuthRequest  # type:ignore
 from google.oauth2.credentials import Credentials  # type:ignore
 from google_auth_oauthlib.flow import InstalledAppFlow  # type:ignore
 import gp_wrapper.objects.core.media_item
-from ...utils import RequestType, Printable, HeaderType, ProgressBarInjector, ProgressBar, OnlyPrivate
+from .observer import LibraryObserver
+from ...utils import RequestType, Printable, HeaderType, ProgressBarInjector, ProgressBar, OnlyPrivate, \
+    QuotaScheduler, RetryPolicy, TokenStore, FileTokenStore, Seconds, RequestHook, RequestMetrics, TTLCache
 from ...utils import EMPTY_PROMPT_MESSAGE, SCOPES, MEDIA_ITEMS_CREATE_ENDPOINT, get_python_version
 if get_python_version() < (3, 9):
-    from typing import Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+    from typing import Dict as t_dict, Tuple as t_tuple, List as t_list  # pylint: disable=ungrouped-imports,redefined-builtin
 else:
-    from builtins import dict as t_dict  # type:ignore
+    from builtins import dict as t_dict, tuple as t_tuple, list as t_list  # type:ignore
+
+CREDENTIALS_REFRESH_MARGIN: Seconds = 300
+DEFAULT_POOL_CONNECTIONS: int = 10
+DEFAULT_POOL_MAXSIZE: int = 32
+DEFAULT_TIMEOUT: t_tuple[Seconds, Seconds] = (10, 300)
+API_ROOT = "https://photoslibrary.googleapis.com/"
+Timeout = Union[None, Seconds, t_tuple[Seconds, Seconds]]
+_CONTENT_TYPE_HEADERS: t_dict[HeaderType, t_dict[str, str]] = {
+    header_type: {"Content-Type": f"application/{header_type.value}"} if header_type != HeaderType.DEFAULT else {}
+    for header_type in HeaderType
+}
+
+
+def create_session(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    pool_block: bool = False,
+    keep_alive: bool = True
+) -> requests.Session:
+    """creates a session with a configured connection pool.
+    the same session may be passed to several GooglePhotos objects so that they share one pool
+
+    Args:
+        pool_connections (int, optional): how many hosts to keep pools for. Defaults to DEFAULT_POOL_CONNECTIONS.
+        pool_maxsize (int, optional): maximum amount of connections kept per host. Defaults to DEFAULT_POOL_MAXSIZE.
+        pool_block (bool, optional): whether to wait for a free connection instead of opening
+            a connection which will be discarded afterwards. Defaults to False.
+        keep_alive (bool, optional): whether to reuse connections between requests. Defaults to True.
+
+    Returns:
+        requests.Session: the resulting session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+class _CacheInvalidator(LibraryObserver):
+    # drops the cached objects which a change made through the GooglePhotos object has made stale
+    def __init__(self, cache: TTLCache) -> None:
+        self.cache = cache
+
+    def media_items_created(self, mediaItems, albumId=None) -> None:
+        if albumId is not None:
+            self.cache.invalidate([("album", albumId)])
+
+    def media_item_updated(self, mediaItem) -> None:
+        self.cache.invalidate([("mediaItem", mediaItem.id)])
+
+    def album_updated(self, album) -> None:
+        self.cache.invalidate([("album", album.id)])
+
+    def album_media_added(self, albumId, mediaItemIds) -> None:
+        self.cache.invalidate([("album", albumId)])
+
+    def album_media_removed(self, albumId, mediaItemIds) -> None:
+        self.cache.invalidate([("album", albumId)])
 
 
 class GooglePhotos(Printable, OnlyPrivate):
     """A wrapper class over GooglePhotos API to get 
     higher level abstraction for easy use
+
+    Args:
+        client_secrets_path (str, optional): path to the client secrets file. Defaults to "./client_secrets.json".
+        quota (Optional[QuotaScheduler], optional): the scheduler every request will pass through.
+            May be shared between several instances. Defaults to None which uses the default rate limits.
+        retry_policy (Optional[RetryPolicy], optional): decides which failed requests are sent again.
+            Defaults to None which uses the default RetryPolicy.
+        token_store (Optional[TokenStore], optional): where credentials are loaded from and saved to.
+            The interactive OAuth flow only runs if it holds no usable refresh token.
+            Defaults to None which uses a FileTokenStore at DEFAULT_TOKEN_PATH.
+        session (Optional[requests.Session], optional): the session to send requests with.
+            Pass the same session to several objects to share one connection pool.
+            Defaults to None which creates one using create_session.
+        timeout (Timeout, optional): the default (connect, read) timeout of every request.
+            Can be overridden per call. Defaults to DEFAULT_TIMEOUT.
+        warm_up_connections (int, optional): how many connections to open ahead of time. Defaults to 0.
+        cache (Optional[TTLCache], optional): holds the media items and albums fetched by id, so that
+            looking them up again within its ttl sends no request. entries are dropped when changed through
+            this object. Defaults to None which uses a TTLCache whose entries expire before their baseUrls do.
+            Pass TTLCache(maxsize=0) to disable caching.
     """
-    # TODO implement quota
 
-    def __init__(self, client_secrets_path: str = "./client_secrets.json") -> None:
+    def __init__(self, client_secrets_path: str = "./client_secrets.json",
+                 quota: Optional[QuotaScheduler] = None, retry_policy: Optional[RetryPolicy] = None,
+                 token_store: Optional[TokenStore] = None, session: Optional[requests.Session] = None,
+                 timeout: Timeout = DEFAULT_TIMEOUT, warm_up_connections: int = 0,
+                 cache: Optional[TTLCache] = None) -> None:
+        self.quota = quota if quota is not None else QuotaScheduler()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.token_store: TokenStore = token_store if token_store is not None else FileTokenStore()
+        self.session = session if session is not None else create_session()
+        self.timeout = timeout
+        self._request_map: t_dict[RequestType, Callable[..., Response]] = {
+            RequestType.GET: self.session.get,
+            RequestType.POST: self.session.post,
+            RequestType.PATCH: self.session.patch,
+        }
+        self.hooks: t_list[RequestHook] = []
+        self.observers: t_list[LibraryObserver] = []
+        self.cache = cache if cache is not None else TTLCache()
+        self._cache_invalidator = _CacheInvalidator(self.cache)
+        self._credentials_lock = threading.Lock()
+        self.credentials: Credentials = self._load_credentials(client_secrets_path)
+        if warm_up_connections > 0:
+            self.warm_up(warm_up_connections)
+
+    def warm_up(self, connections: int, url: str = API_ROOT) -> int:
+        """opens connections to the API ahead of time so that the first requests
+        do not pay for the TCP and TLS handshakes.
+        at most as many connections as the pool's maxsize are kept
+
+        Args:
+            connections (int): how many connections to open
+            url (str, optional): the url to open the connections to. Defaults to API_ROOT.
+
+        Returns:
+            int: how many connections were opened successfully
+        """
+        if not (0 < connections):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'connections' should be a positive integer")
+        # all threads send at the same time so that each of them needs its own connection
+        barrier = threading.Barrier(connections)
+
+        def open_connection(_: int) -> bool:
+            try:
+                barrier.wait()
+                self.session.head(url, timeout=self.timeout).close()
+            except (requests.RequestException, threading.BrokenBarrierError):
+                barrier.abort()
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(open_connection, range(connections)))
+
+    def add_hook(self, hook: RequestHook) -> None:
+        """registers a hook which will be called before and after every request
+
+        Args:
+            hook (RequestHook): the hook, i.e a MetricsAggregator
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        """unregisters a hook which was added with add_hook
+
+        Args:
+            hook (RequestHook): the hook
+        """
+        self.hooks.remove(hook)
+
+    def add_observer(self, observer: LibraryObserver) -> None:
+        """registers an observer which will be told about every change made to the library
+
+        Args:
+            observer (LibraryObserver): the observer, i.e a LibraryMirror
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: LibraryObserver) -> None:
+        """unregisters an observer which was added with add_observer
+
+        Args:
+            observer (LibraryObserver): the observer
+        """
+        self.observers.remove(observer)
+
+    def notify_observers(self, event: str, *args) -> None:
+        """calls the method named 'event' of every observer with 'args'
+
+        Args:
+            event (str): the name of a method of LibraryObserver, i.e "media_items_created"
+        """
+        # the cache is invalidated first, so an observer reading the changed object gets a fresh copy
+        getattr(self._cache_invalidator, event)(*args)
+        for observer in list(self.observers):
+            getattr(observer, event)(*args)
+
+    @staticmethod
+    def _needs_refresh(credentials: Credentials) -> bool:
+        if not credentials.token:
+            return True
+        if credentials.expiry is None:
+            return False
+        # google-auth keeps 'expiry' as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now < timedelta(seconds=CREDENTIALS_REFRESH_MARGIN)
+
+    def _load_credentials(self, client_secrets_path: str) -> Credentials:
+        credentials = self.token_store.load()
+        if credentials is not None and credentials.refresh_token:
+            if not GooglePhotos._needs_refresh(credentials):
+                return credentials
+            try:
+                credentials.refresh(AuthRequest(self.session))  # type:ignore
+            except RefreshError:
+                pass
+            else:
+                self.token_store.save(credentials)
+                return credentials
         flow: InstalledAppFlow = InstalledAppFlow.from_client_secrets_file(client_secrets_path, SCOPES)  # noqa
-        self.credentials: Credentials = flow.run_local_server(
+        credentials = flow.run_local_server(
             authorization_prompt_message=EMPTY_PROMPT_MESSAGE
         )
-        self.session = requests.Session()
-        self.session.credentials = self.credentials  # type:ignore
+        self.token_store.save(credentials)
+        return credentials
+
+    def _refresh_credentials(self) -> None:
+        """refreshes the access token if it is about to expire and saves it to 'token_store'
+        """
+        if not GooglePhotos._needs_refresh(self.credentials):
+            return
+        with self._credentials_lock:
+            if not GooglePhotos._needs_refresh(self.credentials):
+                return
+            self.credentials.refresh(AuthRequest(self.session))  # type:ignore
+            self.token_store.save(self.credentials)
 
     def request(
             self,
@@ -35,38 +252,111 @@ class GooglePhotos(Printable, OnlyPrivate):
             # mime_type: Optional[MimeType] = None,
             pbar: Optional[ProgressBar] = None,
             additional_headers: Optional[dict] = None,
+            retry_policy: Optional[RetryPolicy] = None,
             **kwargs
     ) -> Response:
-        """core request function to handle request for all other classes
+        """core request function to handle request for all other classes.
+        failed requests are sent again according to 'retry_policy'.
+        a file object passed as 'data' is rewound to its current position before every attempt
 
         Args:
             req_type (RequestType): the type of request
             endpoint (str): the endpoint 
             header_type (HeaderType, optional): which header type should the request use. Defaults to HeaderType.JSON.
+            retry_policy (Optional[RetryPolicy], optional): overrides the retry policy of this object for this
+                request only, i.e RetryPolicy(max_attempts=1) for a caller which recovers on its own.
+                Defaults to None.
+
+        Raises:
+            RequestException: if no response was received and the request should not be retried
 
         Returns:
             Response: the response of the request
         """
-        headers: dict = {"Authorization": f"Bearer {self.credentials.token}"}
-        if header_type != HeaderType.DEFAULT:
-            headers["Content-Type"] = f"application/{header_type.value}"
+        if not self.hooks:
+            return self._request(
+                req_type, endpoint, header_type, pbar, additional_headers, retry_policy, None, **kwargs)
+        metrics = RequestMetrics(req_type, endpoint)
+        for hook in self.hooks:
+            hook.before_request(metrics)
+        start = time.perf_counter()
+        try:
+            response = self._request(
+                req_type, endpoint, header_type, pbar, additional_headers, retry_policy, metrics, **kwargs)
+            metrics.record_response(response, kwargs.get("stream", False))
+            return response
+        except Exception as e:
+            metrics.exception = e
+            raise
+        finally:
+            metrics.wall_time = time.perf_counter() - start
+            for hook in self.hooks:
+                hook.after_request(metrics)
+
+    def _request(
+            self,
+            req_type: RequestType,
+            endpoint: str,
+            header_type: HeaderType,
+            pbar: Optional[ProgressBar],
+            additional_headers: Optional[dict],
+            retry_policy: Optional[RetryPolicy],
+            metrics: Optional[RequestMetrics],
+            **kwargs
+    ) -> Response:
+        endpoint_class = QuotaScheduler.classify(req_type, endpoint)
+        policy = retry_policy if retry_policy is not None else self.retry_policy
+        data = kwargs.get("data")
+        position: Optional[int] = None
+        if data is not None and hasattr(data, "seek"):
+            position = data.tell()
+        attempt = 0
+        total_delay: float = 0
+        while True:
+            attempt += 1
+            self.quota.acquire(endpoint_class)
+            if data is not None and position is not None:
+                data.seek(position)
+            response: Optional[Response] = None
+            try:
+                response = self._send(req_type, endpoint, header_type, pbar, additional_headers, **kwargs)
+            except requests.RequestException as e:
+                delay = policy.next_delay(req_type, endpoint, attempt, exception=e, total_delay=total_delay)
+                if delay is None:
+                    raise
+            else:
+                delay = policy.next_delay(req_type, endpoint, attempt, response=response, total_delay=total_delay)
+                if delay is None:
+                    return response
+                response.close()
+            total_delay += delay
+            if metrics is not None:
+                metrics.retries = attempt
+            time.sleep(delay)
 
+    def _send(
+            self,
+            req_type: RequestType,
+            endpoint: str,
+            header_type: HeaderType = HeaderType.JSON,
+            pbar: Optional[ProgressBar] = None,
+            additional_headers: Optional[dict] = None,
+            **kwargs
+    ) -> Response:
+        self._refresh_credentials()
+        headers: dict = {"Authorization": f"Bearer {self.credentials.token}", **_CONTENT_TYPE_HEADERS[header_type]}
         if additional_headers:
             headers.update(additional_headers)
 
         if pbar is not None:
-            kwargs['data'] = \
-                ProgressBarInjector(
-                    kwargs['data'],
-                    pbar
-            )
+            data = kwargs['data']
+            if isinstance(data, ProgressBarInjector):
+                data.pbar = pbar
+            else:
+                kwargs['data'] = ProgressBarInjector(data, pbar)
 
-        request_map: t_dict[RequestType, Callable[..., Response]] = {
-            RequestType.GET: self.session.get,
-            RequestType.POST: self.session.post,
-            RequestType.PATCH: self.session.patch,
-        }
-        return request_map[req_type](url=endpoint, headers=headers, **kwargs)
+        kwargs.setdefault("timeout", self.timeout)
+        return self._request_map[req_type](url=endpoint, headers=headers, **kwargs)
 
     def _get_media_item_id(self, upload_token: str) -> "gp_wrapper.objects.core.media_item.CoreMediaItem":
         payload = {
@@ -87,12 +377,19 @@ class GooglePhotos(Printable, OnlyPrivate):
         j = response.json()
         if "newMediaItemResults" in j:
             dct = j['newMediaItemResults'][0]['mediaItem']
-            return gp_wrapper.objects.core.media_item.CoreMediaItem._from_dict(self, dct)  # pylint: disable=protected-access #noqa
+            item = gp_wrapper.objects.core.media_item.CoreMediaItem._from_dict(self, dct)  # pylint: disable=protected-access #noqa
+            self.notify_observers("media_items_created", [item], None)
+            return item
         # TODO fix this
         print(json.dumps(j, indent=4))
         raise AttributeError("'newMediaItemResults' not found in response")
 
 
 __all__ = [
-    "GooglePhotos"
+    "GooglePhotos",
+    "create_session",
+    "CREDENTIALS_REFRESH_MARGIN",
+    "DEFAULT_POOL_CONNECTIONS",
+    "DEFAULT_POOL_MAXSIZE",
+    "DEFAULT_TIMEOUT"
 ]
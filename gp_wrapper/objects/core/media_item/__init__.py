@@ -1,2 +1,9 @@
 from .core_media_item import *
+from .async_core_media_item import *
 from .filters import *
+from .upload_pipeline import *
+from .library_scanner import *
+from .query_planner import *
+from .base_url_refresher import *
+from .media_downloader import *
+from .thumbnailer import *
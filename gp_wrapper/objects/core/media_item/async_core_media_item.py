@@ -0,0 +1,88 @@
+from typing import Iterable, Optional
+from .core_media_item import CoreMediaItem, MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE
+from .filters import SearchFilter
+from ..async_gp import AsyncGooglePhotos
+from ....utils import AlbumPosition, NewMediaItem, MediaItemResult, ProgressBar
+from ....utils import AlbumId, Path, NextPageToken, UploadToken
+from ....utils import get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Tuple as t_tuple  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, tuple as t_tuple  # type:ignore
+
+
+class AsyncCoreMediaItem:
+    """asyncio counterparts of the static API methods of CoreMediaItem.
+    see the matching CoreMediaItem method for the full documentation of each argument
+    """
+
+    @staticmethod
+    async def upload_media(agp: AsyncGooglePhotos, media: Path, *,
+                           pbar: Optional[ProgressBar] = None) -> UploadToken:
+        """asyncio counterpart of CoreMediaItem.upload_media
+
+        Returns:
+            UploadToken: the upload token to pass to be used in other functions
+        """
+        return await agp.run(CoreMediaItem.upload_media, agp.gp, media, pbar=pbar)
+
+    @staticmethod
+    async def batchCreate(
+        agp: AsyncGooglePhotos,
+        newMediaItems: Iterable[NewMediaItem],
+        albumId: Optional[AlbumId] = None,
+        albumPosition: Optional[AlbumPosition] = None
+    ) -> t_list[MediaItemResult]:
+        """asyncio counterpart of CoreMediaItem.batchCreate
+
+        Returns:
+            list[MediaItemResult]: the contents of the response
+        """
+        return await agp.run(CoreMediaItem.batchCreate, agp.gp, list(newMediaItems), albumId, albumPosition)
+
+    @staticmethod
+    async def batchGet(agp: AsyncGooglePhotos, ids: Iterable[str]) -> t_list[MediaItemResult]:
+        """asyncio counterpart of CoreMediaItem.batchGet
+
+        Returns:
+            list[MediaItemResult]: the results, in the same order as the supplied identifiers
+        """
+        ids = list(ids)
+        return await agp.run(lambda: list(CoreMediaItem.batchGet(agp.gp, ids)))
+
+    @staticmethod
+    async def search(
+            agp: AsyncGooglePhotos,
+            albumId: Optional[str] = None,
+            pageSize: int = 25,
+            pageToken: Optional[str] = None,
+            filters: Optional[SearchFilter] = None,
+            orderBy: Optional[str] = None
+    ) -> t_tuple[t_list[CoreMediaItem], Optional[NextPageToken]]:
+        """asyncio counterpart of CoreMediaItem.search
+
+        Returns:
+            tuple[list[CoreMediaItem], Optional[NextPageToken]]: the resulting objects, token for next request.
+        """
+        def inner() -> t_tuple[t_list[CoreMediaItem], Optional[NextPageToken]]:
+            gen, token = CoreMediaItem.search(agp.gp, albumId, pageSize, pageToken, filters, orderBy)
+            return list(gen), token
+        return await agp.run(inner)
+
+    @staticmethod
+    async def list(
+        agp: AsyncGooglePhotos,
+        pageSize: int = MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE,
+        pageToken: Optional[str] = None
+    ) -> t_tuple[t_list[CoreMediaItem], Optional[NextPageToken]]:
+        """asyncio counterpart of CoreMediaItem.list
+
+        Returns:
+            tuple[list[CoreMediaItem], Optional[NextPageToken]]: the resulting objects, token for next request.
+        """
+        return await agp.run(CoreMediaItem.list, agp.gp, pageSize, pageToken)
+
+
+__all__ = [
+    "AsyncCoreMediaItem"
+]
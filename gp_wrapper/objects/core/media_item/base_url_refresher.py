@@ -0,0 +1,90 @@
+from typing import Iterable, Generator, TypeVar, Sequence
+from .core_media_item import CoreMediaItem, MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS, DEFAULT_BATCH_GET_WORKERS
+from ..gp import GooglePhotos
+from ....utils import Seconds, Status, BASE_URL_LIFETIME, split_iterable, get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Tuple as t_tuple  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, tuple as t_tuple  # type:ignore
+
+# a baseUrl older than this is refreshed, leaving time to finish using it
+DEFAULT_BASE_URL_MAX_AGE: Seconds = BASE_URL_LIFETIME - 15 * 60
+T = TypeVar("T", bound=CoreMediaItem)
+
+
+class BaseUrlRefresher:
+    """Makes sure media items hold a usable baseUrl right before they are used, i.e for downloading.
+    the media items whose baseUrl is missing or older than 'max_age' are fetched again
+    with batchGet, so refreshing them costs a request per MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS items
+    and the requests of each window of items are sent concurrently
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        max_age (Seconds, optional): the age from which a baseUrl is refreshed. Defaults to DEFAULT_BASE_URL_MAX_AGE.
+        max_workers (int, optional): how many requests to send at once. Defaults to DEFAULT_BATCH_GET_WORKERS.
+    """
+
+    def __init__(self, gp: GooglePhotos, max_age: Seconds = DEFAULT_BASE_URL_MAX_AGE,
+                 max_workers: int = DEFAULT_BATCH_GET_WORKERS) -> None:
+        if not (0 < max_age < BASE_URL_LIFETIME):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_age' should be positive and less than BASE_URL_LIFETIME")
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        self.gp = gp
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self.refreshed = 0
+        # the media items which could not be refreshed, with the reason
+        self.failures: t_list[t_tuple[CoreMediaItem, Status]] = []
+
+    def is_stale(self, item: CoreMediaItem) -> bool:
+        """whether the baseUrl of 'item' is missing or older than 'max_age'
+        """
+        return item.base_url_age() >= self.max_age
+
+    def _refresh(self, items: Sequence[CoreMediaItem]) -> None:
+        # the cached copies are at least as old as the items
+        self.gp.cache.invalidate(("mediaItem", item.id) for item in items)
+        results = CoreMediaItem.batchGet(self.gp, [item.id for item in items], self.max_workers)
+        for item, result in zip(items, results):
+            if result.mediaItem is not None and result.mediaItem.baseUrl is not None:
+                item._set_base_url(result.mediaItem.baseUrl, result.mediaItem.baseUrlFetchedAt)
+                self.refreshed += 1
+            else:
+                self.failures.append((item, result.status))  # type:ignore
+
+    def refresh(self, items: Iterable[T], force: bool = False) -> Generator[T, None, None]:
+        """yields 'items' in their order, after refreshing the baseUrl of every stale one in place.
+        the items are read ahead a window of 'max_workers' full requests at a time.
+        an item which can't be refreshed, i.e because it was deleted, is yielded as is and added to 'failures'
+
+        Args:
+            items (Iterable[CoreMediaItem]): the media items
+            force (bool, optional): whether to refresh every item regardless of its age. Defaults to False.
+
+        Yields:
+            Generator[CoreMediaItem, None, None]: the same media items
+        """
+        for window in split_iterable(items, MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS * self.max_workers):
+            stale = [item for item in window if force or self.is_stale(item)]
+            if stale:
+                self._refresh(stale)
+            yield from window
+
+    def refresh_all(self, items: Iterable[T], force: bool = False) -> t_list[T]:
+        """like refresh but refreshes all of 'items' at once
+
+        Returns:
+            list[CoreMediaItem]: the same media items
+        """
+        items = list(items)
+        stale = [item for item in items if force or self.is_stale(item)]
+        if stale:
+            self._refresh(stale)
+        return items
+
+
+__all__ = [
+    "BaseUrlRefresher",
+    "DEFAULT_BASE_URL_MAX_AGE"
+]
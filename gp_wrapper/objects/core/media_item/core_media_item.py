@@ -1,15 +1,20 @@
 import os
-import pathlib
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, Optional, Union, Generator
+from requests import RequestException, HTTPError
 from requests.models import Response  # pylint: disable=import-error
-import moviepy.editor as moviepy  # type:ignore
 from .filters import SearchFilter
 from ..gp import GooglePhotos
 from ....utils import MediaItemMaskTypes, RequestType, AlbumPosition, NewMediaItem,\
-    MediaItemResult, MediaMetadata, Printable, HeaderType, ProgressBar, ContributorInfo, OnlyPrivate, MimeType
+    MediaItemResult, MediaMetadata, Printable, HeaderType, ProgressBar, ContributorInfo, OnlyPrivate, \
+    ProgressBarInjector, VideoPolicy, Status, StatusCode, RetryPolicy
 from ....utils import MediaItemID, AlbumId, Path, NextPageToken, UploadToken
-from ....utils import UPLOAD_MEDIA_ITEM_ENDPOINT, MEDIA_ITEMS_CREATE_ENDPOINT
-from ....utils import slowdown, get_python_version, set_file_time, get_file_time, FileTime
+from ....utils import UPLOAD_MEDIA_ITEM_ENDPOINT, MEDIA_ITEMS_CREATE_ENDPOINT, MEDIA_ITEMS_SEARCH_ENDPOINT
+from ....utils import get_python_version, size_unit, split_iterable
+from ....utils import ACCEPTED_VIDEO_MIME_TYPES, Transcoder, is_video, mime_type, needs_conversion
 if get_python_version() < (3, 9):
     from typing import List as t_list, Tuple as t_tuple, Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
 else:
@@ -18,7 +23,14 @@ else:
 MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE: int = 25
 MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE: int = 100
 MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS: int = 50
-DEFAULT_QUOTA: int = 30
+MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS: int = 50
+DEFAULT_BATCH_GET_WORKERS: int = 4
+RESUMABLE_UPLOAD_THRESHOLD: int = 32 * 1024 * 1024
+UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+UPLOAD_MAXIMUM_RESUMES: int = 10
+# how many new sessions are started for a resumable upload whose token was lost
+UPLOAD_MAXIMUM_RESTARTS: int = 1
+_SINGLE_ATTEMPT = RetryPolicy(max_attempts=1)
 
 
 class CoreMediaItem(Printable, OnlyPrivate):
@@ -33,12 +45,14 @@ class CoreMediaItem(Printable, OnlyPrivate):
         filename (str): name of media
         baseUrl (str, optional): ?. Defaults to "".
         description (str, optional): media's description. Defaults to "".
+        baseUrlFetchedAt (float, optional): the time.time() of when 'baseUrl' was received.
+            Defaults to None which is now if there is a 'baseUrl'.
     """
-    SUPPORTED_VIDEO_FILE_TYPES = {".mov", ".mp4", ".wmv"}
+    SUPPORTED_VIDEO_FILE_TYPES = set(ACCEPTED_VIDEO_MIME_TYPES)
     # ================================= STATIC HELPER METHODS =================================
 
     @staticmethod
-    def _from_dict(gp: GooglePhotos, dct: dict) -> "CoreMediaItem":
+    def _from_dict(gp: GooglePhotos, dct: dict, baseUrlFetchedAt: Optional[float] = None) -> "CoreMediaItem":
         return CoreMediaItem(
             gp=gp,
             id=dct["id"],
@@ -49,12 +63,118 @@ class CoreMediaItem(Printable, OnlyPrivate):
             baseUrl=dct["baseUrl"] if "baseUrl" in dct else None,
             description=dct["description"] if "description" in dct else None,
             contributorInfo=ContributorInfo.from_dict(
-                dct["ContributorInfo"]) if "ContributorInfo" in dct else None
+                dct["ContributorInfo"]) if "ContributorInfo" in dct else None,
+            baseUrlFetchedAt=baseUrlFetchedAt
         )
 
     @staticmethod
-    @slowdown(60//DEFAULT_QUOTA)
-    def upload_media(gp: GooglePhotos, media: Path, *, pbar: Optional[ProgressBar] = None) -> UploadToken:
+    def _query_upload(gp: GooglePhotos, upload_url: str) -> Response:
+        response = gp.request(
+            RequestType.POST,
+            upload_url,
+            HeaderType.DEFAULT,
+            additional_headers={"X-Goog-Upload-Command": "query"}
+        )
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _upload_session(gp: GooglePhotos, path: Path, mimeType: str, chunk_size: int,
+                        pbar: Optional[ProgressBar] = None) -> Optional[UploadToken]:
+        # a single resumable upload session. returns None if the server has finalized the upload
+        # but the response which carries the token was lost
+        size = os.path.getsize(path)
+        response = gp.request(
+            RequestType.POST,
+            UPLOAD_MEDIA_ITEM_ENDPOINT,
+            HeaderType.DEFAULT,
+            additional_headers={
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Content-Type": mimeType,
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Raw-Size": str(size),
+            }
+        )
+        response.raise_for_status()
+        upload_url = response.headers["X-Goog-Upload-URL"]
+        granularity = int(response.headers.get("X-Goog-Upload-Chunk-Granularity", 0) or 0)
+        if granularity > 0:
+            # every chunk but the last must be a multiple of the granularity
+            chunk_size = max(granularity, chunk_size // granularity * granularity)
+
+        unit_size, unit = size_unit(size)
+        if pbar is not None:
+            pbar.unit = unit
+            pbar.total = size / unit_size
+        offset = 0
+        resumes = 0
+        with open(path, "rb") as f:
+            while True:
+                length = min(chunk_size, size - offset)
+                command = "upload, finalize" if offset + length >= size else "upload"
+                f.seek(offset)
+                chunk_response: Optional[Response] = None
+                try:
+                    # the query below decides where to continue, so a chunk is never sent again blindly
+                    chunk_response = gp.request(
+                        RequestType.POST,
+                        upload_url,
+                        HeaderType.DEFAULT,
+                        data=ProgressBarInjector(f, offset=offset, length=length),
+                        additional_headers={
+                            "X-Goog-Upload-Command": command,
+                            "X-Goog-Upload-Offset": str(offset),
+                        },
+                        retry_policy=_SINGLE_ATTEMPT
+                    )
+                except RequestException:
+                    if resumes >= UPLOAD_MAXIMUM_RESUMES:
+                        raise
+                if chunk_response is not None and chunk_response.status_code == 200:
+                    if pbar is not None:
+                        pbar.update(length / unit_size)
+                    if command == "upload, finalize":
+                        return chunk_response.content.decode('utf-8')
+                    offset += length
+                    continue
+                if resumes >= UPLOAD_MAXIMUM_RESUMES and chunk_response is not None:
+                    chunk_response.raise_for_status()
+                resumes += 1
+                # ask the server how much it has committed and continue from there
+                query_response = CoreMediaItem._query_upload(gp, upload_url)
+                if query_response.headers.get("X-Goog-Upload-Status") == "final":
+                    # the finalize request went through but its response, which holds the token, did not
+                    return None
+                committed = int(query_response.headers["X-Goog-Upload-Size-Received"])
+                if pbar is not None:
+                    pbar.update((committed - offset) / unit_size)
+                offset = committed
+
+    @staticmethod
+    def _upload_resumable(gp: GooglePhotos, path: Path, mimeType: str, chunk_size: int,
+                          pbar: Optional[ProgressBar] = None) -> UploadToken:
+        """uploads a file using the resumable upload protocol.
+        see https://developers.google.com/photos/library/guides/resumable-uploads
+        """
+        for _ in range(UPLOAD_MAXIMUM_RESTARTS + 1):
+            try:
+                token = CoreMediaItem._upload_session(gp, path, mimeType, chunk_size, pbar)
+            except BaseException:
+                if pbar is not None:
+                    pbar.reset()
+                raise
+            if token:
+                return token
+            # the upload starts over
+            if pbar is not None:
+                pbar.reset()
+        raise RequestException(f"the upload token of {path} was lost {UPLOAD_MAXIMUM_RESTARTS + 1} times")
+
+    @staticmethod
+    def upload_media(gp: GooglePhotos, media: Path, *, pbar: Optional[ProgressBar] = None,
+                     resumable: Optional[bool] = None, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                     video_policy: VideoPolicy = VideoPolicy.AUTO,
+                     transcoder: Optional[Transcoder] = None) -> UploadToken:
         """uploads a single media item to Google's servers
         NOTE: This does not add it to your library!
         NOTE: To add the media to your library, you need to use MediaItem.batchCreate afterwards
@@ -65,44 +185,53 @@ class CoreMediaItem(Printable, OnlyPrivate):
             media (Path): the path to the media
             pbar (Optional[ProgressBar]): An instance of a class implementing ProgressBar to show an 
                 optional progress bar while uploading. tqdm is okay.
+            resumable (Optional[bool]): whether to upload in chunks using the resumable upload protocol
+                so that a dropped connection only costs the current chunk.
+                Defaults to None which uses it for files of at-least RESUMABLE_UPLOAD_THRESHOLD bytes.
+            chunk_size (int): the size of each chunk of a resumable upload. Defaults to UPLOAD_CHUNK_SIZE.
+            video_policy (VideoPolicy): whether to upload a video as it is or convert it to mp4 first.
+                Defaults to VideoPolicy.AUTO which only converts formats Google Photos does not accept.
+            transcoder (Optional[Transcoder]): converts the video into its cache instead of next to the source.
+                Defaults to None which uses Transcoder.default().
 
         Raises:
             HTTPError: If the HTTP request has failed
+            subprocess.CalledProcessError: If a video could not be remuxed with VideoPolicy.REMUX
 
         Returns:
             UploadToken: the upload token to pass to be used in other functions
         """
-        header_type = HeaderType.JSON
-        # TODO add more options
-        file_extension = pathlib.Path(media).suffix.lower()
         additional_headers: dict = {
             "X-Goog-Upload-Protocol": "raw"
         }
-        new_path = media  # assign default value
-        if file_extension in CoreMediaItem.SUPPORTED_VIDEO_FILE_TYPES:
-            if file_extension != '.mp4':
-                p = pathlib.Path(media)
-                new_path = os.path.join(p.parent, f'{p.stem}.mp4')
-                if not os.path.exists(new_path):
-                    if pbar is not None:
-                        pbar.write(
-                            f"Video is not MP4. Creating {new_path}."
-                            "\nThis may take a while depending on the length of the video"
-                        )
-                        clip = moviepy.VideoFileClip(media)
-                    clip.write_videofile(new_path, verbose=False, logger=None)
-                    ft = get_file_time(media)
-                    set_file_time(new_path, FileTime(
-                        creation=ft.creation, access=ft.creation, modification=ft.creation))
-            header_type = HeaderType.OCTET
-            additional_headers["X-Goog-Upload-Content-Type"] = MimeType.MP4.value
+        if is_video(media) and needs_conversion(media, video_policy):
+            if pbar is not None:
+                pbar.write(
+                    f"Converting {media} to MP4."
+                    "\nThis may take a while depending on the length of the video"
+                )
+            transcoder = transcoder if transcoder is not None else Transcoder.default()
+            with transcoder.prepared(media, video_policy) as (converted, _):
+                return CoreMediaItem.upload_media(
+                    gp, converted, pbar=pbar, resumable=resumable, chunk_size=chunk_size,
+                    video_policy=VideoPolicy.PASSTHROUGH
+                )
+        new_path = media
+        content_type = mime_type(media)
+        if content_type:
+            additional_headers["X-Goog-Upload-Content-Type"] = content_type
+        if resumable is None:
+            resumable = os.path.getsize(new_path) >= RESUMABLE_UPLOAD_THRESHOLD
+        if resumable:
+            return CoreMediaItem._upload_resumable(
+                gp, new_path, content_type or "application/octet-stream", chunk_size, pbar)
         with open(new_path, 'rb') as data_stream:
+            # the file is streamed from disk and read again from its start if the request is retried
             response = gp.request(
                 RequestType.POST,
                 UPLOAD_MEDIA_ITEM_ENDPOINT,
-                header_type=header_type,
-                pbar=pbar,
-                data=data_stream.read(),
+                header_type=HeaderType.OCTET,
+                data=ProgressBarInjector(data_stream, pbar),
                 additional_headers=additional_headers
             )
         response.raise_for_status()
@@ -174,44 +303,102 @@ class CoreMediaItem(Printable, OnlyPrivate):
         for dct in response.json()["newMediaItemResults"]:
             dct["gp"] = gp
             media_items.append(MediaItemResult.from_dict(dct))
+        gp.notify_observers(
+            "media_items_created", [r.mediaItem for r in media_items if r.mediaItem is not None], albumId)
         return media_items
 
     @staticmethod
-    def batchGet(gp: GooglePhotos, ids: Iterable[str]
+    def _batchGet(gp: GooglePhotos, ids: t_list[MediaItemID]) -> t_list[MediaItemResult]:
+        # only the ids missing from the cache are requested
+        cached = [gp.cache.get(("mediaItem", mediaItemId)) for mediaItemId in ids]
+        missing = [mediaItemId for mediaItemId, entry in zip(ids, cached) if entry is None]
+        fetched = iter(CoreMediaItem._request_batch(gp, missing) if missing else [])
+        results = []
+        for entry in cached:
+            if entry is None:
+                results.append(next(fetched))
+                continue
+            fetchedAt, dct = entry
+            result = MediaItemResult.from_dict({"mediaItem": dct, "gp": gp})
+            result.mediaItem._set_base_url(dct.get("baseUrl"), fetchedAt)
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _request_batch(gp: GooglePhotos, ids: t_list[MediaItemID]) -> t_list[MediaItemResult]:
+        # a single request, its failure is reported as the status of each of the ids.
+        # an invalid id fails the whole request, so such a request is split to find it
+        try:
+            response = gp.request(
+                RequestType.GET,
+                "https://photoslibrary.googleapis.com/v1/mediaItems:batchGet",
+                HeaderType.DEFAULT,
+                params={"mediaItemIds": ids},
+            )
+            response.raise_for_status()
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 400 and len(ids) > 1:
+                middle = len(ids) // 2
+                return CoreMediaItem._request_batch(gp, ids[:middle]) + CoreMediaItem._request_batch(gp, ids[middle:])
+            return [MediaItemResult(status=Status.from_exception(e)) for _ in ids]
+        except RequestException as e:
+            return [MediaItemResult(status=Status.from_exception(e)) for _ in ids]
+        results = []
+        for dct in (response.json() or {}).get("mediaItemResults", []):
+            if "mediaItem" in dct:
+                gp.cache.put(("mediaItem", dct["mediaItem"]["id"]), (time.time(), dct["mediaItem"]))
+            dct["gp"] = gp
+            results.append(MediaItemResult.from_dict(dct))
+        results.extend(
+            MediaItemResult(status=Status("missing from the response of batchGet", StatusCode.UNKNOWN))
+            for _ in range(len(ids) - len(results))
+        )
+        return results
+
+    @staticmethod
+    def batchGet(gp: GooglePhotos, ids: Iterable[MediaItemID], max_workers: int = DEFAULT_BATCH_GET_WORKERS
                  ) -> Generator[MediaItemResult, None, None]:
         """Returns the list of media items for the specified media item identifiers. 
             Items are returned in the same order as the supplied identifiers.
+            items found in the cache of 'gp' are not requested.
+            any amount of ids is split into requests of MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS which are sent concurrently,
+            and the results are yielded as soon as the ones before them are ready
 
         Args:
             gp (GooglePhotos): Google Photos object
             ids (Iterable[str]): Returns the list of media items for the specified media item identifiers. 
                 Items are returned in the same order as the supplied identifiers.
+            max_workers (int, optional): how many requests to send at once. Defaults to DEFAULT_BATCH_GET_WORKERS.
 
         Raises:
-            HTTPError: If the HTTP request has failed
+            ValueError: if 'max_workers' is not positive
 
         Yields:
-            Generator[MediaItemResult, None, None]: _description_
+            Generator[MediaItemResult, None, None]: a result for every id, in the order of 'ids'.
+                an id which could not be fetched has a result with a 'status' instead of a 'mediaItem'
         """
-        ENDPOINT = "https://photoslibrary.googleapis.com/v1/mediaItems:batchGet"
-        params = {
-            "mediaItemIds": ids
-        }
-        response = gp.request(
-            RequestType.GET,
-            ENDPOINT,
-            HeaderType.DEFAULT,
-            params=params,
-        )
-
-        response.raise_for_status()
-        for dct in response.json()["mediaItemResults"]:
-            dct["gp"] = gp
-            yield MediaItemResult.from_dict(dct)
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        chunks = (chunk for chunk in split_iterable(ids, MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS) if chunk)
+        executor = ThreadPoolExecutor(max_workers, thread_name_prefix="gp_wrapper-batchGet")
+        # the ids are read only as far as the requests in flight need
+        pending: deque = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(CoreMediaItem._batchGet, gp, chunk))
+                if len(pending) > max_workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
 
     @staticmethod
-    def get(gp: GooglePhotos, mediaItemId: str) -> Response:
+    def get(gp: GooglePhotos, mediaItemId: str) -> "CoreMediaItem":
         """Returns the media item for the specified media item identifier.
+        the media item is served from the cache of 'gp' if it was fetched within the cache's ttl
 
         Args:
             gp (gp_wrapper.gp.GooglePhotos): Google Photos object
@@ -221,12 +408,17 @@ class CoreMediaItem(Printable, OnlyPrivate):
             HTTPError: if the request fails
 
         Returns:
-            GPMediaItem: the resulting object
+            CoreMediaItem: the resulting object
         """
-        endpoint = f"https://photoslibrary.googleapis.com/v1/mediaItems/{mediaItemId}"
-        response = gp.request(RequestType.GET, endpoint)
-        response.raise_for_status()
-        return response  # GPMediaItem.from_dict(gp, response.json())
+        entry = gp.cache.get(("mediaItem", mediaItemId))
+        if entry is None:
+            endpoint = f"https://photoslibrary.googleapis.com/v1/mediaItems/{mediaItemId}"
+            response = gp.request(RequestType.GET, endpoint)
+            response.raise_for_status()
+            entry = (time.time(), response.json())
+            gp.cache.put(("mediaItem", mediaItemId), entry)
+        fetchedAt, dct = entry
+        return CoreMediaItem._from_dict(gp, dct, fetchedAt)
 
     @staticmethod
     def search(
@@ -283,7 +475,7 @@ class CoreMediaItem(Printable, OnlyPrivate):
         if not (0 < pageSize <= 100):  # pylint: disable=unneeded-not,superfluous-parens
             raise ValueError(
                 "'pageSize' must be a positive integer. maximum value: 100")
-        endpoint = "https://photoslibrary.googleapis.com/v1/mediaItems:search"
+        endpoint = MEDIA_ITEMS_SEARCH_ENDPOINT
         payload: dict = {
             "pageSize": pageSize
         }
@@ -308,6 +500,12 @@ class CoreMediaItem(Printable, OnlyPrivate):
             if filters.mediaTypeFilter:
                 payload["filters"]["mediaTypeFilter"] = filters.mediaTypeFilter.to_dict()
 
+            if filters.includeArchivedMedia:
+                payload["filters"]["includeArchivedMedia"] = True
+
+            if filters.excludeNonAppCreatedData:
+                payload["filters"]["excludeNonAppCreatedData"] = True
+
         if orderBy:
             if not filters or not filters.dateFilter:
                 raise ValueError(
@@ -391,6 +589,7 @@ class CoreMediaItem(Printable, OnlyPrivate):
         response = self.gp.request(
             RequestType.PATCH, endpoint, json=payload, params=params)
         response.raise_for_status()
+        self.gp.notify_observers("media_item_updated", CoreMediaItem._from_dict(self.gp, response.json()))
         return response
 
     # ================================= INSTANCE METHODS =================================
@@ -405,6 +604,7 @@ class CoreMediaItem(Printable, OnlyPrivate):
             baseUrl: Optional[str] = None,
             description: Optional[str] = None,
             contributorInfo: Optional[ContributorInfo] = None,
+            baseUrlFetchedAt: Optional[float] = None
     ) -> None:
         self.gp = gp
         self.id = id
@@ -414,9 +614,23 @@ class CoreMediaItem(Printable, OnlyPrivate):
             mediaMetadata, MediaMetadata) else MediaMetadata.from_dict(mediaMetadata)
         self.filename = filename
         self.baseUrl = baseUrl
+        # the time.time() of when 'baseUrl' was received, as it expires after BASE_URL_LIFETIME
+        self.baseUrlFetchedAt = baseUrlFetchedAt if baseUrlFetchedAt is not None or baseUrl is None \
+            else time.time()
         self.description = description
         self.contributorInfo = contributorInfo
 
+    def _set_base_url(self, baseUrl: Optional[str], fetchedAt: Optional[float] = None) -> None:
+        self.baseUrl = baseUrl
+        self.baseUrlFetchedAt = fetchedAt if fetchedAt is not None else time.time()
+
+    def base_url_age(self) -> float:
+        """how many seconds ago 'baseUrl' was received, infinite if there is none
+        """
+        if self.baseUrl is None or self.baseUrlFetchedAt is None:
+            return math.inf
+        return time.time() - self.baseUrlFetchedAt
+
     def __eq__(self, other) -> bool:
         if not isinstance(other, CoreMediaItem):
             return False
@@ -431,5 +645,10 @@ __all__ = [
     "MediaItemID",
     "MEDIA_ITEM_LIST_DEFAULT_PAGE_SIZE",
     "MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE",
-    "MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS"
+    "MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS",
+    "MEDIA_ITEM_BATCH_GET_MAXIMUM_IDS",
+    "DEFAULT_BATCH_GET_WORKERS",
+    "RESUMABLE_UPLOAD_THRESHOLD",
+    "UPLOAD_CHUNK_SIZE",
+    "UPLOAD_MAXIMUM_RESTARTS"
 ]
@@ -6,6 +6,8 @@ if get_python_version() < (3, 9):
 else:
     from builtins import list as t_list  # type:ignore
 
+CONTENT_FILTER_MAXIMUM_CATEGORIES: int = 10
+
 
 class ContentCategory(Enum):
     """
@@ -81,12 +83,12 @@ class ContentFilter(Printable, Dictable):
                 "'includedContentCategories', 'excludedContentCategories'")
 
         if includedContentCategories:
-            if not (0 < len(includedContentCategories) < 10):  # pylint: disable=unneeded-not,superfluous-parens
+            if not (0 < len(includedContentCategories) <= CONTENT_FILTER_MAXIMUM_CATEGORIES):  # pylint: disable=unneeded-not,superfluous-parens
                 raise ValueError(
                     "There's a maximum of 10 includedContentCategories per request.")
 
         if excludedContentCategories:
-            if not (0 < len(excludedContentCategories) < 10):  # pylint: disable=unneeded-not,superfluous-parens
+            if not (0 < len(excludedContentCategories) <= CONTENT_FILTER_MAXIMUM_CATEGORIES):  # pylint: disable=unneeded-not,superfluous-parens
                 raise ValueError(
                     "There's a maximum of 10 excludedContentCategories per request.")
         self.includedContentCategories = includedContentCategories
@@ -5,6 +5,8 @@ if get_python_version() < (3, 9):
 else:
     from builtins import list as t_list  # type:ignore
 
+DATE_FILTER_MAXIMUM_DATES: int = 5
+
 
 class Date(Printable, Dictable):
     """A wrapper class over Date object
@@ -63,11 +65,11 @@ class DateFilter(Printable, Dictable):
                 "When creating a DateFilter, must supply at-least one of 'dates', 'ranges'")
 
         if dates:
-            if not (0 < len(dates) <= 5):  # pylint: disable=unneeded-not,superfluous-parens
+            if not (0 < len(dates) <= DATE_FILTER_MAXIMUM_DATES):  # pylint: disable=unneeded-not,superfluous-parens
                 raise ValueError(
                     "A maximum of 5 dates can be included per request.")
         if ranges:
-            if not (0 < len(ranges) <= 5):  # pylint: disable=unneeded-not,superfluous-parens
+            if not (0 < len(ranges) <= DATE_FILTER_MAXIMUM_DATES):  # pylint: disable=unneeded-not,superfluous-parens
                 raise ValueError(
                     "A maximum of 5 dates ranges can be included per request.")
         self.dates = dates
@@ -89,5 +91,6 @@ class DateFilter(Printable, Dictable):
 __all__ = [
     "Date",
     "DateRange",
-    "DateFilter"
+    "DateFilter",
+    "DATE_FILTER_MAXIMUM_DATES"
 ]
@@ -0,0 +1,219 @@
+import math
+import datetime
+import threading
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Generator, Any
+from .core_media_item import CoreMediaItem, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE
+from .filters import SearchFilter, DateFilter, DateRange, Date
+from ..gp import GooglePhotos
+from ....utils import get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Set as t_set  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, set as t_set  # type:ignore
+
+DEFAULT_SCAN_WORKERS: int = 8
+# how many pages a new partition should hold, judging by the density observed so far
+SCAN_PARTITION_PAGES: int = 4
+DEFAULT_SCAN_START: datetime.date = datetime.date(1, 1, 1)
+_DAY = datetime.timedelta(days=1)
+
+# the events a partition reports to the consumer
+_ITEMS = "items"
+_SPLIT = "split"
+_DONE = "done"
+_ERROR = "error"
+
+
+class _Partition:
+    def __init__(self, start: datetime.date, end: datetime.date) -> None:
+        self.start = start
+        self.end = end
+        # only used when the scan is ordered
+        self.events: Queue = Queue()
+
+
+class LibraryScanner:
+    """Scans the whole library by splitting it into ranges of creation dates which are paged through concurrently,
+    so the time of a scan depends on the allowed concurrency instead of the size of the library.
+
+    a partition starts as one range. whenever a page of a partition shows that more pages follow and a worker is idle,
+    the rest of the partition is split into new ranges, sized by the amount of items per day observed so far.
+    a split range overlaps the day of the oldest item already received, so nothing falls between two ranges,
+    and the duplicates this causes are dropped by id.
+
+    NOTE: media items without a creation date in their metadata are not matched by date filters
+    and so are not returned by a scan, use MediaItem.all_media to get them as well
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        max_workers (int, optional): how many pages to fetch at once. Defaults to DEFAULT_SCAN_WORKERS.
+        ordered (bool, optional): whether to yield the items newest first by creation time, like a serial listing.
+            when False every page is yielded as soon as it arrives. Defaults to True.
+        start (Optional[datetime.date], optional): the oldest creation date to scan.
+            Defaults to None which is DEFAULT_SCAN_START.
+        end (Optional[datetime.date], optional): the newest creation date to scan.
+            Defaults to None which is a day after today, to not miss items of timezones ahead of UTC.
+        pageSize (int, optional): the size of each page. Defaults to MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE.
+    """
+
+    def __init__(
+        self,
+        gp: GooglePhotos,
+        max_workers: int = DEFAULT_SCAN_WORKERS,
+        ordered: bool = True,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+        pageSize: int = MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE
+    ) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        self.gp = gp
+        self.max_workers = max_workers
+        self.ordered = ordered
+        self.start = start if start is not None else DEFAULT_SCAN_START
+        self.end = end if end is not None else datetime.date.today() + _DAY
+        if not (self.start <= self.end):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'start' should not be after 'end'")
+        self.pageSize = pageSize
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._active = 0
+        self._events: Queue = Queue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _filter(partition: _Partition) -> SearchFilter:
+        def date(d: datetime.date) -> Date:
+            return Date(d.year, d.month, d.day)
+        return SearchFilter(dateFilter=DateFilter(ranges=[DateRange(date(partition.start), date(partition.end))]))
+
+    def _emit(self, partition: _Partition, kind: str, value: Any = None) -> None:
+        (partition.events if self.ordered else self._events).put((partition, kind, value))
+
+    def _submit(self, partitions: t_list[_Partition]) -> None:
+        with self._lock:
+            self._active += len(partitions)
+        for partition in partitions:
+            self._executor.submit(self._scan, partition)  # type:ignore
+
+    def _split(self, start: datetime.date, end: datetime.date, density: float) -> t_list[_Partition]:
+        # the ranges for the items between 'start' and 'end', newest first.
+        # the calling partition is about to end so its worker is counted as idle
+        span = (end - start).days + 1
+        with self._lock:
+            count = min(self.max_workers - self._active + 1, span)
+        if count <= 1:
+            return []
+        days = min(span, max(1, math.ceil(self.pageSize * SCAN_PARTITION_PAGES / max(density, 1e-9))))
+        partitions: t_list[_Partition] = []
+        while len(partitions) < count - 1 and days < (end - start).days + 1:
+            partitions.append(_Partition(end - (days - 1) * _DAY, end))
+            end -= days * _DAY
+            # older parts of a library tend to be sparser
+            days = min(span, days * 2)
+        partitions.append(_Partition(start, end))
+        return partitions
+
+    def _scan(self, partition: _Partition) -> None:
+        try:
+            received = 0
+            pageToken = None
+            while True:
+                if self._stop.is_set():
+                    if self._error is not None:
+                        self._emit(partition, _ERROR, self._error)
+                    else:
+                        self._emit(partition, _DONE)
+                    return
+                core_gen, pageToken = CoreMediaItem.search(
+                    self.gp, pageSize=self.pageSize, pageToken=pageToken, filters=self._filter(partition))
+                items = list(core_gen)
+                received += len(items)
+                if items and pageToken:
+                    # every item newer than the oldest one received has already been received.
+                    # the next day is included as well as the date filter may not use UTC dates
+                    cut = min(partition.end, min(i.mediaMetadata.creationTime for i in items).date() + _DAY)
+                    if partition.start < cut < partition.end:
+                        covered = (partition.end - cut).days + 1
+                        children = self._split(partition.start, cut, received / covered)
+                        if children:
+                            self._emit(partition, _ITEMS, items)
+                            self._emit(partition, _SPLIT, children)
+                            self._submit(children)
+                            return
+                self._emit(partition, _ITEMS, items)
+                if not pageToken:
+                    self._emit(partition, _DONE)
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+            self._stop.set()
+            self._emit(partition, _ERROR, e)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _ordered(self, partition: _Partition) -> Generator[CoreMediaItem, None, None]:
+        while True:
+            _, kind, value = partition.events.get()
+            if kind == _ITEMS:
+                yield from value
+            elif kind == _SPLIT:
+                for child in value:
+                    yield from self._ordered(child)
+                return
+            elif kind == _DONE:
+                return
+            else:
+                raise value
+
+    def _unordered(self) -> Generator[CoreMediaItem, None, None]:
+        remaining = 1
+        while remaining > 0:
+            _, kind, value = self._events.get()
+            if kind == _ITEMS:
+                yield from value
+            elif kind == _SPLIT:
+                remaining += len(value) - 1
+            elif kind == _DONE:
+                remaining -= 1
+            else:
+                raise value
+
+    def scan(self) -> Generator[CoreMediaItem, None, None]:
+        """runs the scan. stopping the iteration stops the workers after the pages they are fetching
+
+        Raises:
+            HTTPError: if a request has failed
+
+        Yields:
+            Generator[CoreMediaItem, None, None]: every media item once
+        """
+        if self._executor is not None:
+            raise RuntimeError("a LibraryScanner can only be scanned once")
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="gp_wrapper-scan")
+        root = _Partition(self.start, self.end)
+        self._submit([root])
+        seen: t_set[str] = set()
+        try:
+            for item in (self._ordered(root) if self.ordered else self._unordered()):
+                if item.id in seen:
+                    continue
+                seen.add(item.id)
+                yield item
+        finally:
+            self._stop.set()
+            self._executor.shutdown(wait=False)
+
+
+__all__ = [
+    "LibraryScanner",
+    "DEFAULT_SCAN_WORKERS",
+    "DEFAULT_SCAN_START",
+    "SCAN_PARTITION_PAGES"
+]
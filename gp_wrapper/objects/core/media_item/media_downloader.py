@@ -0,0 +1,301 @@
+import os
+import time
+import pathlib
+import threading
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Iterable, Generator, Callable
+from requests import RequestException, HTTPError
+from .core_media_item import CoreMediaItem
+from .base_url_refresher import BaseUrlRefresher
+from ..gp import GooglePhotos
+from ....utils import RequestType, HeaderType, Printable, Path, Seconds, set_file_times, get_python_version
+if get_python_version() < (3, 9):
+    from typing import Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import dict as t_dict  # type:ignore
+
+DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024
+# the body is read in smaller pieces, a piece cut short by a dropped connection is lost and fetched again
+DOWNLOAD_READ_SIZE: int = 64 * 1024
+DEFAULT_DOWNLOAD_WORKERS: int = 4
+DEFAULT_DOWNLOAD_MAX_PENDING: int = 64
+DOWNLOAD_MAXIMUM_RESUMES: int = 10
+# the suffix of a file which is being downloaded, it is kept on failure so the next run resumes it
+PARTIAL_DOWNLOAD_SUFFIX: str = ".part"
+
+
+class DownloadResult(Printable):
+    """The outcome of a single media item passed to MediaDownloader.run
+
+    Args:
+        mediaItem (CoreMediaItem): the media item
+        path (Path): where the media item is saved
+        size (int, optional): the size of the file. Defaults to 0.
+        downloaded (int, optional): how many bytes were received for it by this run. Defaults to 0.
+        elapsed (Seconds, optional): how long it took. Defaults to 0.
+        resumed (int, optional): how many bytes of a previous run were reused. Defaults to 0.
+        skipped (bool, optional): whether the file already existed and was left as is. Defaults to False.
+        exception (Optional[Exception], optional): the exception which has failed the download. Defaults to None.
+    """
+
+    def __init__(self, mediaItem: CoreMediaItem, path: Path, size: int = 0, downloaded: int = 0,
+                 elapsed: Seconds = 0, resumed: int = 0, skipped: bool = False,
+                 exception: Optional[Exception] = None) -> None:
+        self.mediaItem = mediaItem
+        self.path = path
+        self.size = size
+        self.downloaded = downloaded
+        self.elapsed = elapsed
+        self.resumed = resumed
+        self.skipped = skipped
+        self.exception = exception
+
+    @property
+    def ok(self) -> bool:
+        """whether the file is on disk
+        """
+        return self.exception is None
+
+    @property
+    def throughput(self) -> float:
+        """bytes per second received for this file
+        """
+        return self.downloaded / self.elapsed if self.elapsed > 0 else 0
+
+
+class MediaDownloader:
+    """Downloads the original bytes of media items on a pool of worker threads.
+    every body is streamed to a temporary file next to its destination in chunks of 'chunk_size',
+    which replaces the destination only once it is complete. a temporary file left by an interrupted
+    download is resumed with an HTTP Range request, by this run or a later one.
+    the baseUrls of the media items are refreshed in batches right before they are used,
+    and once more for a media item whose baseUrl is refused
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        directory (Path, optional): where to save the files. Defaults to ".".
+        max_workers (int, optional): how many files to download at once. Defaults to DEFAULT_DOWNLOAD_WORKERS.
+        max_pending (int, optional): how many media items may be taken from the input before their results
+            have been consumed. Defaults to DEFAULT_DOWNLOAD_MAX_PENDING.
+        chunk_size (int, optional): how many bytes are written to disk at a time. Defaults to DOWNLOAD_CHUNK_SIZE.
+        overwrite (bool, optional): whether to download a file which already exists again. Defaults to False.
+        keep_times (bool, optional): whether to give every file the creation time of its media item.
+            Defaults to True.
+        name (Optional[Callable[[CoreMediaItem], str]], optional): the path of a media item relative to
+            'directory', which may include subdirectories. Defaults to None which is its filename.
+            a name already taken by another media item of the run is suffixed with the end of the id.
+        refresher (Optional[BaseUrlRefresher], optional): refreshes the baseUrls.
+            Defaults to None which creates one.
+    """
+
+    def __init__(
+        self,
+        gp: GooglePhotos,
+        directory: Path = ".",
+        max_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        max_pending: int = DEFAULT_DOWNLOAD_MAX_PENDING,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        overwrite: bool = False,
+        keep_times: bool = True,
+        name: Optional[Callable[[CoreMediaItem], str]] = None,
+        refresher: Optional[BaseUrlRefresher] = None
+    ) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        if not (0 < max_pending):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_pending' should be a positive integer")
+        if not (0 < chunk_size):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'chunk_size' should be a positive integer")
+        self.gp = gp
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.overwrite = overwrite
+        self.keep_times = keep_times
+        self.name = name
+        self.refresher = refresher if refresher is not None else BaseUrlRefresher(gp)
+        # aggregated over every download of this object
+        self.files = 0
+        self.failed = 0
+        self.bytes = 0
+        self.elapsed: Seconds = 0
+        self._names: t_dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def throughput(self) -> float:
+        """bytes per second received over the time spent downloading
+        """
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0
+
+    @staticmethod
+    def url(mediaItem: CoreMediaItem) -> str:
+        """the url of the original bytes of 'mediaItem'
+        """
+        is_video = mediaItem.mediaMetadata.video is not None or mediaItem.mimeType.startswith("video/")
+        return f"{mediaItem.baseUrl}={'dv' if is_video else 'd'}"
+
+    def path_of(self, mediaItem: CoreMediaItem) -> Path:
+        """the path 'mediaItem' is saved to
+        """
+        if self.name is None:
+            name = pathlib.Path(mediaItem.filename).name
+        else:
+            # without the root and the parent references, so a name can't point outside of the directory
+            relative = pathlib.Path(self.name(mediaItem))
+            parts = [part for part in relative.relative_to(relative.anchor).parts if part not in (".", "..")]
+            name = os.path.join(*parts) if parts else pathlib.Path(mediaItem.filename).name
+        with self._lock:
+            if self._names.setdefault(name, mediaItem.id) != mediaItem.id:
+                stem, extension = os.path.splitext(name)
+                name = f"{stem}_{mediaItem.id[-8:]}{extension}"
+                self._names[name] = mediaItem.id
+        return os.path.join(self.directory, name)
+
+    def _fetch(self, mediaItem: CoreMediaItem, partial: Path) -> int:
+        # downloads into 'partial', continuing from its current size. returns the amount of bytes received
+        received = 0
+        resumes = 0
+        refreshed = False
+        while True:
+            offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+            try:
+                response = self.gp.request(
+                    RequestType.GET,
+                    MediaDownloader.url(mediaItem),
+                    HeaderType.DEFAULT,
+                    additional_headers={"Range": f"bytes={offset}-"} if offset else None,
+                    stream=True
+                )
+                with response:
+                    if response.status_code == 416 and offset:
+                        # the partial file doesn't match the media item anymore
+                        os.remove(partial)
+                        continue
+                    if response.status_code == 403 and not refreshed:
+                        # the baseUrl has expired sooner than expected
+                        refreshed = True
+                        self.refresher.refresh_all([mediaItem], force=True)
+                        continue
+                    response.raise_for_status()
+                    append = response.status_code == 206
+                    if append and not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                        # a range other than the one asked for can neither be appended nor start the file,
+                        # the next attempt downloads the whole file
+                        if os.path.exists(partial):
+                            os.remove(partial)
+                    else:
+                        expected = response.headers.get("Content-Length")
+                        written = 0
+                        with open(partial, "ab" if append else "wb", buffering=self.chunk_size) as f:
+                            for chunk in response.iter_content(min(self.chunk_size, DOWNLOAD_READ_SIZE)):
+                                f.write(chunk)
+                                written += len(chunk)
+                                # counted as it is written, a body which is cut short keeps what it has received
+                                received += len(chunk)
+                        if expected is None or written >= int(expected):
+                            return received
+            except HTTPError:
+                raise
+            except RequestException:
+                pass
+            # the body was cut short or was not the range asked for
+            resumes += 1
+            if resumes > DOWNLOAD_MAXIMUM_RESUMES:
+                raise RequestException(f"the download of {mediaItem.id} was interrupted too many times")
+
+    def _download(self, mediaItem: CoreMediaItem) -> DownloadResult:
+        start = time.perf_counter()
+        path = self.path_of(mediaItem)
+        if not self.overwrite and os.path.exists(path):
+            return DownloadResult(mediaItem, path, os.path.getsize(path), skipped=True)
+        partial = path + PARTIAL_DOWNLOAD_SUFFIX
+        resumed = os.path.getsize(partial) if os.path.exists(partial) else 0
+        try:
+            if self.refresher.is_stale(mediaItem):
+                self.refresher.refresh_all([mediaItem])
+            if mediaItem.baseUrl is None:
+                raise ValueError(f"media item {mediaItem.id} has no baseUrl")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            downloaded = self._fetch(mediaItem, partial)
+            os.replace(partial, path)
+            if self.keep_times:
+                set_file_times(path, mediaItem.mediaMetadata.creationTime.replace(tzinfo=timezone.utc))
+        except Exception as e:  # pylint: disable=broad-except
+            with self._lock:
+                self.failed += 1
+            return DownloadResult(mediaItem, path, elapsed=time.perf_counter() - start, resumed=resumed, exception=e)
+        size = os.path.getsize(path)
+        with self._lock:
+            self.files += 1
+            self.bytes += downloaded
+        return DownloadResult(mediaItem, path, size, downloaded, time.perf_counter() - start,
+                              resumed if downloaded < size else 0)
+
+    def download(self, mediaItem: CoreMediaItem) -> DownloadResult:
+        """downloads a single media item on the calling thread.
+        a failure is reported by the result instead of being raised
+
+        Args:
+            mediaItem (CoreMediaItem): the media item
+
+        Returns:
+            DownloadResult: the result
+        """
+        result = self._download(mediaItem)
+        with self._lock:
+            self.elapsed += result.elapsed
+        return result
+
+    def run(self, mediaItems: Iterable[CoreMediaItem]) -> Generator[DownloadResult, None, None]:
+        """downloads all of 'mediaItems'.
+        results are yielded in the order they complete and a failed file does not stop the run.
+        the wall time of the run is added to 'elapsed', no matter how many files were downloaded at once
+
+        Args:
+            mediaItems (Iterable[CoreMediaItem]): the media items, i.e the results of a search. consumed lazily
+
+        Yields:
+            Generator[DownloadResult, None, None]: the result of every media item
+        """
+        # the stale baseUrls are refreshed in batches as the media items are taken from the input
+        source = iter(self.refresher.refresh(mediaItems))
+        exhausted = False
+        running: t_dict[Future, CoreMediaItem] = {}
+        start = time.perf_counter()
+        executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="gp_wrapper_download")
+        try:
+            while True:
+                while not exhausted and len(running) < self.max_pending:
+                    try:
+                        mediaItem = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    running[executor.submit(self._download, mediaItem)] = mediaItem
+                if not running:
+                    return
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    yield future.result()
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+            with self._lock:
+                self.elapsed += time.perf_counter() - start
+
+
+__all__ = [
+    "MediaDownloader",
+    "DownloadResult",
+    "DOWNLOAD_CHUNK_SIZE",
+    "DOWNLOAD_READ_SIZE",
+    "DEFAULT_DOWNLOAD_WORKERS",
+    "DEFAULT_DOWNLOAD_MAX_PENDING",
+    "DOWNLOAD_MAXIMUM_RESUMES",
+    "PARTIAL_DOWNLOAD_SUFFIX"
+]
@@ -0,0 +1,367 @@
+import datetime
+import threading
+from typing import Optional, Iterable, Generator, Callable, Union
+from .core_media_item import CoreMediaItem, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE
+from .filters import SearchFilter, DateFilter, DateRange, Date, ContentFilter, ContentCategory, MediaTypeFilter, \
+    MediaType, FeatureFilter, Feature, DATE_FILTER_MAXIMUM_DATES, CONTENT_FILTER_MAXIMUM_CATEGORIES
+from ..gp import GooglePhotos
+from ....utils import AlbumId, MediaItemID, NextPageToken, Printable, paginate, paginate_many, split_iterable, \
+    get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Tuple as t_tuple, Set as t_set, FrozenSet as t_frozenset  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, tuple as t_tuple, set as t_set, frozenset as t_frozenset  # type:ignore
+
+DEFAULT_QUERY_WORKERS: int = 4
+AnyDate = Union[datetime.date, Date]
+AnyDateRange = Union[DateRange, t_tuple[AnyDate, AnyDate]]
+Predicate = Callable[[CoreMediaItem], bool]
+
+
+def _to_date(d: AnyDate) -> Union[datetime.date, Date]:
+    # full dates become datetime.date so they can be merged, dates with a wildcard (0) field stay as they are
+    if isinstance(d, datetime.date):
+        return d
+    if d.year and d.month and d.day:
+        return datetime.date(d.year, d.month, d.day)
+    return d
+
+
+def _to_api_date(d: Union[datetime.date, Date]) -> Date:
+    if isinstance(d, Date):
+        return d
+    return Date(d.year, d.month, d.day)
+
+
+def _date_matches(d: Union[datetime.date, Date], day: datetime.date) -> bool:
+    if isinstance(d, datetime.date):
+        return d == day
+    return (not d.year or d.year == day.year) and (not d.month or d.month == day.month) \
+        and (not d.day or d.day == day.day)
+
+
+class MediaQuery(Printable):
+    """A predicate over media items which, unlike SearchFilter, is not bound by the limits of a single request.
+    the conditions are ANDed. within 'dates' and 'ranges' together, and within each list of the other conditions,
+    the values are ORed. use QueryPlanner.search with several queries to OR whole queries
+
+    Args:
+        albumId (Optional[AlbumId], optional): only items in this album, may be combined with any other condition.
+            Defaults to None.
+        dates (Optional[Iterable[datetime.date | Date]], optional): any number of creation dates. Defaults to None.
+        ranges (Optional[Iterable[DateRange | tuple[date, date]]], optional): any number of inclusive ranges of
+            creation dates. Defaults to None.
+        mediaTypes (Optional[Iterable[MediaType]], optional): the types of media. Defaults to None which is all.
+        includedContentCategories (Optional[Iterable[ContentCategory]], optional): any number of categories
+            of which the items contain at least one. Defaults to None.
+        excludedContentCategories (Optional[Iterable[ContentCategory]], optional): categories the items must not
+            contain, at most CONTENT_FILTER_MAXIMUM_CATEGORIES. Defaults to None.
+        includedFeatures (Optional[Iterable[Feature]], optional): features of the items. Defaults to None.
+        includeArchivedMedia (bool, optional): whether to include archived items. Defaults to False.
+        excludeNonAppCreatedData (bool, optional): whether to only include items created by this app.
+            Defaults to False.
+
+    Raises:
+        ValueError: if more than CONTENT_FILTER_MAXIMUM_CATEGORIES categories are excluded,
+            as exclusions can't be split between requests
+    """
+
+    def __init__(
+        self,
+        albumId: Optional[AlbumId] = None,
+        dates: Optional[Iterable[AnyDate]] = None,
+        ranges: Optional[Iterable[AnyDateRange]] = None,
+        mediaTypes: Optional[Iterable[MediaType]] = None,
+        includedContentCategories: Optional[Iterable[ContentCategory]] = None,
+        excludedContentCategories: Optional[Iterable[ContentCategory]] = None,
+        includedFeatures: Optional[Iterable[Feature]] = None,
+        includeArchivedMedia: bool = False,
+        excludeNonAppCreatedData: bool = False
+    ) -> None:
+        self.albumId = albumId
+        self.dates = [_to_date(d) for d in dates or []]
+        self.ranges: t_list[t_tuple[Union[datetime.date, Date], Union[datetime.date, Date]]] = [
+            (_to_date(r.startDate), _to_date(r.endDate)) if isinstance(r, DateRange)
+            else (_to_date(r[0]), _to_date(r[1]))
+            for r in ranges or []
+        ]
+        self.mediaTypes = list(dict.fromkeys(mediaTypes or []))
+        self.includedContentCategories = list(dict.fromkeys(includedContentCategories or []))
+        self.excludedContentCategories = list(dict.fromkeys(excludedContentCategories or []))
+        if len(self.excludedContentCategories) > CONTENT_FILTER_MAXIMUM_CATEGORIES:
+            raise ValueError(
+                f"There's a maximum of {CONTENT_FILTER_MAXIMUM_CATEGORIES} excludedContentCategories per query")
+        self.includedFeatures = list(dict.fromkeys(includedFeatures or []))
+        self.includeArchivedMedia = includeArchivedMedia
+        self.excludeNonAppCreatedData = excludeNonAppCreatedData
+
+    @property
+    def has_date_condition(self) -> bool:
+        """whether the query limits the creation dates
+        """
+        return bool(self.dates or self.ranges)
+
+    @property
+    def media_type(self) -> Optional[MediaType]:
+        """the single media type to filter by, None if all types are allowed
+        """
+        types = set(self.mediaTypes)
+        if not types or MediaType.ALL_MEDIA in types or types == {MediaType.PHOTO, MediaType.VIDEO}:
+            return None
+        return types.pop()
+
+    @property
+    def is_client_checkable(self) -> bool:
+        """whether every condition besides the album can be checked on a media item itself.
+        content categories, features, archived and app created media can only be checked by the API
+        """
+        wildcard_ranges = any(isinstance(d, Date) for r in self.ranges for d in r)
+        return not (self.includedContentCategories or self.excludedContentCategories or self.includedFeatures
+                    or self.includeArchivedMedia or self.excludeNonAppCreatedData or wildcard_ranges)
+
+    def date_conditions(self) -> t_tuple[t_list[Union[datetime.date, Date]],
+                                         t_list[t_tuple[Union[datetime.date, Date], Union[datetime.date, Date]]]]:
+        """returns the smallest equivalent dates and ranges.
+        overlapping and adjacent ranges and the dates inside them are merged, and single days become dates
+        """
+        wildcards: t_list[Union[datetime.date, Date]] = [d for d in self.dates if isinstance(d, Date)]
+        spans: t_list[t_tuple[datetime.date, datetime.date]] = [
+            (d, d) for d in self.dates if isinstance(d, datetime.date)]
+        # ranges with a wildcard can't be merged and are kept as they are
+        kept: t_list[t_tuple[Union[datetime.date, Date], Union[datetime.date, Date]]] = []
+        for start, end in self.ranges:
+            if isinstance(start, datetime.date) and isinstance(end, datetime.date):
+                spans.append((start, end))
+            else:
+                kept.append((start, end))
+        spans.sort()
+        merged: t_list[t_list[datetime.date]] = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        dates: t_list[Union[datetime.date, Date]] = [start for start, end in merged if start == end]
+        ranges: t_list[t_tuple[Union[datetime.date, Date], Union[datetime.date, Date]]] = [
+            (start, end) for start, end in merged if start != end]
+        return wildcards + dates, ranges + kept
+
+    def matches(self, item: CoreMediaItem) -> bool:
+        """checks the conditions which can be checked on the item itself, see is_client_checkable.
+        creation dates are compared in UTC and ranges with a wildcard are not checked
+        """
+        media_type = self.media_type
+        if media_type is not None:
+            if not item.mimeType.startswith("video/" if media_type == MediaType.VIDEO else "image/"):
+                return False
+        if not self.has_date_condition:
+            return True
+        day = item.mediaMetadata.creationTime.date()
+        if any(_date_matches(d, day) for d in self.dates):
+            return True
+        for start, end in self.ranges:
+            if isinstance(start, datetime.date) and isinstance(end, datetime.date):
+                if start <= day <= end:
+                    return True
+        return False
+
+    def filters(self) -> t_list[Optional[SearchFilter]]:
+        """splits the conditions other than the album into the fewest SearchFilters which are valid in a single request.
+        an item matches the query if it matches any of them
+
+        Returns:
+            list[Optional[SearchFilter]]: the filters, [None] if there are no conditions
+        """
+        dates, ranges = self.date_conditions()
+        date_filters: t_list[Optional[DateFilter]] = [None]
+        if dates or ranges:
+            count = max(-(-len(dates) // DATE_FILTER_MAXIMUM_DATES), -(-len(ranges) // DATE_FILTER_MAXIMUM_DATES))
+            date_filters = []
+            for i in range(count):
+                chunk = slice(i * DATE_FILTER_MAXIMUM_DATES, (i + 1) * DATE_FILTER_MAXIMUM_DATES)
+                date_filters.append(DateFilter(
+                    dates=[_to_api_date(d) for d in dates[chunk]] or None,
+                    ranges=[DateRange(_to_api_date(start), _to_api_date(end)) for start, end in ranges[chunk]] or None
+                ))
+        included: t_list[Optional[t_list[ContentCategory]]] = [None]
+        if self.includedContentCategories:
+            included = list(split_iterable(self.includedContentCategories, CONTENT_FILTER_MAXIMUM_CATEGORIES))
+        media_type = self.media_type
+        filters: t_list[Optional[SearchFilter]] = []
+        for dateFilter in date_filters:
+            for categories in included:
+                contentFilter = None
+                if categories or self.excludedContentCategories:
+                    contentFilter = ContentFilter(categories, self.excludedContentCategories or None)
+                search_filter = SearchFilter(
+                    dateFilter=dateFilter,
+                    contentFilter=contentFilter,
+                    mediaTypeFilter=MediaTypeFilter([media_type]) if media_type is not None else None,
+                    featureFilter=FeatureFilter(self.includedFeatures) if self.includedFeatures else None,
+                    includeArchivedMedia=self.includeArchivedMedia,
+                    excludeNonAppCreatedData=self.excludeNonAppCreatedData
+                )
+                if dateFilter is None and contentFilter is None and media_type is None \
+                        and not self.includedFeatures and not self.includeArchivedMedia \
+                        and not self.excludeNonAppCreatedData:
+                    filters.append(None)
+                else:
+                    filters.append(search_filter)
+        return filters
+
+
+class SearchPlan(Printable):
+    """A single listing planned by a QueryPlanner
+
+    Args:
+        albumId (Optional[AlbumId]): the album to list, mutually exclusive with 'filters'
+        filters (Optional[SearchFilter]): the filters to search with
+        predicate (Optional[Predicate]): a check applied to each item of the listing on the client
+        time_ordered (bool): whether the API returns the listing newest first
+    """
+
+    def __init__(self, albumId: Optional[AlbumId], filters: Optional[SearchFilter],
+                 predicate: Optional[Predicate], time_ordered: bool) -> None:
+        self.albumId = albumId
+        self.filters = filters
+        self.predicate = predicate
+        self.time_ordered = time_ordered
+
+    def key(self) -> tuple:
+        """identifies plans which send the same requests
+        """
+        filters = None
+        if self.filters is not None:
+            f = self.filters
+            filters = tuple(
+                repr(part.to_dict()) if part is not None else None
+                for part in (f.dateFilter, f.contentFilter, f.mediaTypeFilter, f.featureFilter)
+            ) + (f.includeArchivedMedia, f.excludeNonAppCreatedData)
+        return self.albumId, filters
+
+
+class QueryPlanner:
+    """Turns MediaQuery objects into the fewest valid mediaItems:search listings, runs them concurrently,
+    checks what the API can't on the client and streams the merged results without duplicates.
+
+    a query with an album and other conditions, which the API refuses in a single request,
+    lists the album and checks the conditions on the client.
+    if some of the conditions can only be checked by the API, the filtered search is run instead
+    and only the items which are in the album are kept
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        max_workers (int, optional): how many pages to fetch at once. Defaults to DEFAULT_QUERY_WORKERS.
+    """
+
+    def __init__(self, gp: GooglePhotos, max_workers: int = DEFAULT_QUERY_WORKERS) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        self.gp = gp
+        self.max_workers = max_workers
+
+    def _album_ids(self, albumId: AlbumId) -> t_frozenset[MediaItemID]:
+        def fetch(pageToken: Optional[NextPageToken]):
+            items, pageToken = CoreMediaItem.search(self.gp, albumId, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, pageToken)
+            return (item.id for item in items), pageToken
+        return frozenset(paginate(fetch))
+
+    def plan(self, *queries: MediaQuery) -> t_list[SearchPlan]:
+        """returns the listings which together return every item matching any of 'queries'.
+        identical listings of different queries are only planned once
+
+        Raises:
+            ValueError: if no query was given
+        """
+        if not queries:
+            raise ValueError("at least one query should be given")
+        plans: t_list[SearchPlan] = []
+        for query in queries:
+            filters = query.filters()
+            if query.albumId is None:
+                plans.extend(SearchPlan(None, f, None, True) for f in filters)
+            elif filters == [None]:
+                plans.append(SearchPlan(query.albumId, None, None, False))
+            elif query.is_client_checkable:
+                plans.append(SearchPlan(query.albumId, None, query.matches, False))
+            else:
+                members = _LazyAlbum(self, query.albumId)
+                plans.extend(SearchPlan(None, f, members.contains, True) for f in filters)
+        unique: t_list[SearchPlan] = []
+        seen: t_set[tuple] = set()
+        for plan in plans:
+            # a plan with a predicate filters its listing so it is only merged with an identical plan
+            key = plan.key() + (plan.predicate,)
+            if key not in seen:
+                seen.add(key)
+                unique.append(plan)
+        return unique
+
+    def _fetch(self, plan: SearchPlan, ordered: bool):
+        def fetch(pageToken: Optional[NextPageToken]):
+            items, pageToken = CoreMediaItem.search(
+                self.gp, plan.albumId, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, pageToken, plan.filters)
+            if plan.predicate is not None:
+                items = (item for item in items if plan.predicate(item))  # type:ignore
+            return items, pageToken
+
+        def fetch_sorted(pageToken: Optional[NextPageToken]):
+            # the whole listing as a single page, newest first
+            items: t_list[CoreMediaItem] = sorted(
+                paginate(fetch, pageToken), key=lambda item: item.mediaMetadata.creationTime, reverse=True)
+            return items, None
+        return fetch_sorted if ordered and not plan.time_ordered else fetch
+
+    def search(self, *queries: MediaQuery, ordered: bool = False) -> Generator[CoreMediaItem, None, None]:
+        """streams every media item which matches any of 'queries', once
+
+        Args:
+            ordered (bool, optional): whether to yield the items newest first.
+                album listings are not ordered by the API and are sorted in memory. Defaults to False
+                which yields each page as soon as it arrives.
+
+        Raises:
+            ValueError: if no query was given
+            HTTPError: if a request has failed
+
+        Yields:
+            Generator[CoreMediaItem, None, None]: the matching media items
+        """
+        plans = self.plan(*queries)
+        stream: Iterable[CoreMediaItem] = paginate_many(
+            [self._fetch(plan, ordered) for plan in plans],
+            self.max_workers,
+            key=(lambda item: item.mediaMetadata.creationTime) if ordered else None,
+            reverse=True
+        )
+        seen: t_set[MediaItemID] = set()
+        for item in stream:
+            if item.id not in seen:
+                seen.add(item.id)
+                yield item
+
+
+class _LazyAlbum:
+    # the ids of an album, listed once by the first listing which needs them
+    def __init__(self, planner: QueryPlanner, albumId: AlbumId) -> None:
+        self.planner = planner
+        self.albumId = albumId
+        self._ids: Optional[t_frozenset[MediaItemID]] = None
+        self._lock = threading.Lock()
+
+    def contains(self, item: CoreMediaItem) -> bool:
+        """whether 'item' is in the album, the album is listed by the first call
+        """
+        if self._ids is None:
+            with self._lock:
+                if self._ids is None:
+                    self._ids = self.planner._album_ids(self.albumId)  # pylint: disable=protected-access
+        return item.id in self._ids
+
+
+__all__ = [
+    "MediaQuery",
+    "SearchPlan",
+    "QueryPlanner",
+    "DEFAULT_QUERY_WORKERS"
+]
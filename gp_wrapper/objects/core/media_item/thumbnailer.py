@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterable
+from requests import HTTPError
+from .core_media_item import CoreMediaItem
+from .base_url_refresher import BaseUrlRefresher
+from ..gp import GooglePhotos
+from ....utils import RequestType, HeaderType, CropMode, Path, ThumbnailStore, get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list  # type:ignore
+
+DEFAULT_THUMBNAIL_WORKERS: int = 8
+
+
+class Thumbnailer:
+    """Fetches thumbnails of media items through a ThumbnailStore,
+    so a media item is only fetched once per size and crop mode for as long as the store keeps it.
+    a thumbnail which is being fetched is not fetched again by a concurrent caller, which waits for it instead
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        store (Optional[ThumbnailStore], optional): where to keep the thumbnails.
+            Defaults to None which is ThumbnailStore.default().
+        max_workers (int, optional): how many thumbnails 'fill' fetches at once. Defaults to DEFAULT_THUMBNAIL_WORKERS.
+        refresher (Optional[BaseUrlRefresher], optional): refreshes the baseUrls. Defaults to None which creates one.
+    """
+
+    def __init__(self, gp: GooglePhotos, store: Optional[ThumbnailStore] = None,
+                 max_workers: int = DEFAULT_THUMBNAIL_WORKERS, refresher: Optional[BaseUrlRefresher] = None) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        self.gp = gp
+        self.store = store if store is not None else ThumbnailStore.default()
+        self.max_workers = max_workers
+        self.refresher = refresher if refresher is not None else BaseUrlRefresher(gp)
+
+    @staticmethod
+    def url(mediaItem: CoreMediaItem, width: int, height: int, crop: CropMode = CropMode.FIT) -> str:
+        """the url of the thumbnail of 'mediaItem' in a given size
+        """
+        if not (0 < width and 0 < height):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'width' and 'height' should be positive integers")
+        return f"{mediaItem.baseUrl}=w{width}-h{height}{'-c' if crop == CropMode.CROP else ''}"
+
+    def _fetch(self, mediaItem: CoreMediaItem, width: int, height: int, crop: CropMode) -> bytes:
+        if self.refresher.is_stale(mediaItem):
+            self.refresher.refresh_all([mediaItem])
+        response = self.gp.request(RequestType.GET, Thumbnailer.url(mediaItem, width, height, crop), HeaderType.DEFAULT)
+        if response.status_code == 403:
+            # the baseUrl has expired sooner than expected
+            self.refresher.refresh_all([mediaItem], force=True)
+            response = self.gp.request(
+                RequestType.GET, Thumbnailer.url(mediaItem, width, height, crop), HeaderType.DEFAULT)
+        response.raise_for_status()
+        return response.content
+
+    def path(self, mediaItem: CoreMediaItem, width: int, height: int, crop: CropMode = CropMode.FIT) -> Path:
+        """returns the path of the thumbnail of 'mediaItem' in a given size, fetching it if it is not stored
+
+        Args:
+            mediaItem (CoreMediaItem): the media item
+            width (int): the maximal width in pixels
+            height (int): the maximal height in pixels
+            crop (CropMode, optional): how to fit the media item into the size. Defaults to CropMode.FIT.
+
+        Raises:
+            HTTPError: if the thumbnail could not be fetched
+
+        Returns:
+            Path: the path of the thumbnail
+        """
+        key = ThumbnailStore.key(mediaItem.id, width, height, crop)
+        return self.store.get_or_fill(key, lambda: self._fetch(mediaItem, width, height, crop))
+
+    def get(self, mediaItem: CoreMediaItem, width: int, height: int, crop: CropMode = CropMode.FIT) -> bytes:
+        """like path but returns the bytes of the thumbnail, from the memory of the store if possible
+
+        Returns:
+            bytes: the thumbnail
+        """
+        key = ThumbnailStore.key(mediaItem.id, width, height, crop)
+        data = self.store.read(key)
+        if data is not None:
+            return data
+        path = self.path(mediaItem, width, height, crop)
+        data = self.store.read(key)
+        if data is None:
+            # evicted right away, i.e by another process
+            with open(path, "rb") as f:
+                data = f.read()
+        return data
+
+    def fill(self, mediaItems: Iterable[CoreMediaItem], width: int, height: int,
+             crop: CropMode = CropMode.FIT) -> t_list[Optional[Path]]:
+        """makes sure the thumbnails of 'mediaItems' in a given size are stored, fetching the missing ones
+        concurrently. their stale baseUrls are refreshed in batches first
+
+        Returns:
+            list[Optional[Path]]: the paths of the thumbnails in the order of 'mediaItems',
+                None for the ones which could not be fetched
+        """
+        mediaItems = list(mediaItems)
+        missing = [item for item in mediaItems
+                   if self.store.lookup(ThumbnailStore.key(item.id, width, height, crop)) is None]
+        if missing:
+            self.refresher.refresh_all(missing)
+
+        def fetch(mediaItem: CoreMediaItem) -> Optional[Path]:
+            try:
+                return self.path(mediaItem, width, height, crop)
+            except (HTTPError, ValueError, OSError):
+                return None
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="gp_wrapper_thumbnail") as executor:
+            return list(executor.map(fetch, mediaItems))
+
+
+__all__ = [
+    "Thumbnailer",
+    "DEFAULT_THUMBNAIL_WORKERS"
+]
@@ -0,0 +1,415 @@
+import time
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Iterable, Optional, Generator, Mapping
+from .core_media_item import CoreMediaItem, MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS
+from ..gp import GooglePhotos
+from ....utils import NewMediaItem, SimpleMediaItem, MediaItemResult, Status, StatusCode, Printable
+from ....utils import RequestType, UploadJournal, DedupIndex, Transcoder, VideoPolicy, get_python_version, file_hash, \
+    hash_files
+from ....utils import is_video, needs_conversion
+from ....utils import AlbumId, MediaItemID, Path, UploadToken, Seconds, ALBUMS_ENDPOINT
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Tuple as t_tuple, Dict as t_dict, Set as t_set  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, tuple as t_tuple, dict as t_dict, set as t_set  # type:ignore
+
+DEFAULT_UPLOAD_WORKERS: int = 4
+DEFAULT_UPLOAD_MAX_PENDING: int = 2 * MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS
+DEFAULT_BATCH_TIMEOUT: Seconds = 2
+
+# index, path and the upload token or the id of the media item
+_ReadyItem = t_tuple[int, Path, str]
+# the statuses of batchGet for an id which is not in the library,
+# as parsed from the response and as derived from a failed request
+_NOT_FOUND_CODES = frozenset({StatusCode.NOT_FOUND, StatusCode.INVALID_ARGUMENT,
+                              StatusCode.NOT_FOUND.value, StatusCode.INVALID_ARGUMENT.value})
+# a video which is being converted: the future of the transcoder, the output which is held for it
+# and the version of the file when it was submitted, if a journal needs it
+_Conversion = t_tuple["Future[t_tuple[Path, str]]", Optional[str], Optional[t_tuple[int, float]]]
+# the result of an upload job: the upload token or the id of an identical media item,
+# the hash of the file and the conversion which has to finish before the file is sent
+_Uploaded = t_tuple[Optional[UploadToken], Optional[MediaItemID], Optional[str], Optional[_Conversion]]
+
+
+class UploadResult(Printable):
+    """The outcome of a single file passed to UploadPipeline.run
+
+    Args:
+        index (int): the position of the file in the input
+        path (Path): the path of the file
+        result (MediaItemResult): the result of creating the media item.
+            if the file was not created its status describes the error
+        uploadToken (Optional[UploadToken], optional): the token of the upload if it has succeeded. Defaults to None.
+        exception (Optional[Exception], optional): the exception which has failed the file. Defaults to None.
+    """
+
+    def __init__(self, index: int, path: Path, result: MediaItemResult, uploadToken: Optional[UploadToken] = None,
+                 exception: Optional[Exception] = None) -> None:
+        self.index = index
+        self.path = path
+        self.result = result
+        self.uploadToken = uploadToken
+        self.exception = exception
+
+    @property
+    def mediaItem(self) -> Optional[CoreMediaItem]:
+        """the created media item or None if the file has failed
+        """
+        return self.result.mediaItem
+
+    @staticmethod
+    def failure(index: int, path: Path, exception: Exception,
+                uploadToken: Optional[UploadToken] = None) -> "UploadResult":
+        """creates the result of a file which has failed with 'exception'
+        """
+        return UploadResult(
+            index,
+            path,
+            MediaItemResult(status=Status(str(exception), StatusCode.UNKNOWN), uploadToken=uploadToken),
+            uploadToken,
+            exception
+        )
+
+
+class UploadPipeline:
+    """Uploads files on a pool of worker threads while creating the uploaded media items in batches.
+    batchCreate is sent as soon as 'batch_size' tokens are ready or the oldest ready token has waited
+    'batch_timeout' seconds, so items show up in the library while the rest of the files are still uploading
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        albumId (Optional[AlbumId], optional): an album to also add the created media items to. Defaults to None.
+        max_workers (int, optional): how many files to upload at once. Defaults to DEFAULT_UPLOAD_WORKERS.
+        max_pending (int, optional): how many files may be taken from the input before their results
+            have been consumed. Bounds the memory of the pipeline. Defaults to DEFAULT_UPLOAD_MAX_PENDING.
+        batch_size (int, optional): how many items to create per call.
+            Defaults to MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS.
+        batch_timeout (Seconds, optional): how long a ready token may wait for a batch to fill up.
+            Defaults to DEFAULT_BATCH_TIMEOUT.
+        journal (Optional[UploadJournal], optional): where to record the progress of every file
+            so that running the same job again skips the work which was already done. Defaults to None.
+        dedup (Optional[DedupIndex], optional): an index of the contents already in the library.
+            a file found in it is linked to the existing media item instead of being uploaded
+            and every created media item is added to it. Defaults to None.
+        video_policy (VideoPolicy, optional): how to prepare videos, see CoreMediaItem.upload_media.
+            Defaults to VideoPolicy.AUTO.
+        transcoder (Optional[Transcoder], optional): converts videos on a pool of processes
+            while other files are uploading. Defaults to None which uses Transcoder.default().
+    """
+
+    def __init__(
+        self,
+        gp: GooglePhotos,
+        albumId: Optional[AlbumId] = None,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        max_pending: int = DEFAULT_UPLOAD_MAX_PENDING,
+        batch_size: int = MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS,
+        batch_timeout: Seconds = DEFAULT_BATCH_TIMEOUT,
+        journal: Optional[UploadJournal] = None,
+        dedup: Optional[DedupIndex] = None,
+        video_policy: VideoPolicy = VideoPolicy.AUTO,
+        transcoder: Optional[Transcoder] = None
+    ) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        if not (0 < max_pending):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_pending' should be a positive integer")
+        if not (0 < batch_size <= MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError(
+                f"'batch_size' must be a positive integer. maximum value: {MEDIA_ITEM_BATCH_CREATE_MAXIMUM_IDS}")
+        if batch_timeout < 0:
+            raise ValueError("'batch_timeout' can't be negative")
+        self.gp = gp
+        self.albumId = albumId
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.journal = journal
+        self.dedup = dedup
+        self.video_policy = video_policy
+        self.transcoder = transcoder if transcoder is not None else Transcoder.default()
+
+    def _upload(self, path: Path, digest: Optional[str] = None) -> _Uploaded:
+        version: Optional[t_tuple[int, float]] = None
+        if self.journal is not None or self.dedup is not None:
+            # the version of the file is taken before the upload so a change while uploading is noticed later
+            version = UploadJournal.stat(path)
+            if digest is None:
+                digest = file_hash(path)
+        if self.dedup is not None:
+            mediaItemId = self.dedup.get(digest)  # type:ignore
+            if mediaItemId is not None:
+                return None, mediaItemId, digest, None
+        if is_video(path) and needs_conversion(path, self.video_policy):
+            # the conversion runs on the processes of the transcoder, the file is sent by _upload_converted
+            # once it has finished so this thread is free for other files meanwhile
+            future, held = self.transcoder.hold(path, self.video_policy, digest)
+            return None, None, digest, (future, held, version)
+        token = CoreMediaItem.upload_media(self.gp, path, video_policy=self.video_policy)
+        self._record(path, version, digest, token)
+        return token, None, digest, None
+
+    def _upload_converted(self, path: Path, digest: Optional[str], conversion: _Conversion) -> _Uploaded:
+        future, held, version = conversion
+        try:
+            converted, _ = future.result()
+            token = CoreMediaItem.upload_media(self.gp, converted, video_policy=VideoPolicy.PASSTHROUGH)
+        finally:
+            if held is not None:
+                self.transcoder.release(held)
+        self._record(path, version, digest, token)
+        return token, None, digest, None
+
+    def _record(self, path: Path, version: Optional[t_tuple[int, float]], digest: Optional[str],
+                token: UploadToken) -> None:
+        if self.journal is not None:
+            size, mtime = version  # type:ignore
+            self.journal.record_upload(path, size, mtime, digest, token)  # type:ignore
+
+    def _create(self, batch: t_list[_ReadyItem]) -> t_list[UploadResult]:
+        items = [NewMediaItem("", SimpleMediaItem(token, pathlib.Path(path).stem)) for _, path, token in batch]
+        try:
+            results = CoreMediaItem.batchCreate(self.gp, items, self.albumId)
+        except Exception as e:  # pylint: disable=broad-except
+            return [UploadResult.failure(index, path, e, token) for index, path, token in batch]
+        by_token = {result.uploadToken: result for result in results if result.uploadToken}
+        res = []
+        for position, (index, path, token) in enumerate(batch):
+            result = by_token.get(token)
+            if result is None:
+                result = results[position] if position < len(results) else MediaItemResult(
+                    status=Status("missing from the response of batchCreate", StatusCode.UNKNOWN),
+                    uploadToken=token
+                )
+            res.append(UploadResult(index, path, result, token))
+        if self.journal is not None:
+            self.journal.record_created(
+                (r.path, r.mediaItem.id) for r in res if r.mediaItem is not None)  # type:ignore
+        return res
+
+    def _fetch(self, batch: t_list[_ReadyItem]) -> t_list[UploadResult]:
+        # files the journal knows were already created, their third field is the id of the media item
+        try:
+            results = list(CoreMediaItem.batchGet(self.gp, [mediaItemId for _, _, mediaItemId in batch]))
+        except Exception as e:  # pylint: disable=broad-except
+            return [UploadResult.failure(index, path, e) for index, path, _ in batch]
+        return [UploadResult(index, path, result) for (index, path, _), result in zip(batch, results)]
+
+    def _link(self, batch: t_list[_ReadyItem]) -> t_list[UploadResult]:
+        # files the dedup index knows, their third field is the id of the identical media item
+        results = self._fetch(batch)
+        found = [result for result in results if result.mediaItem is not None]
+        if self.albumId is None or not found:
+            return results
+        # the items are fetched first as a single missing item fails the whole call
+        ids = [result.mediaItem.id for result in found]  # type:ignore
+        try:
+            response = self.gp.request(
+                RequestType.POST,
+                f"{ALBUMS_ENDPOINT}/{self.albumId}:batchAddMediaItems",
+                json={"mediaItemIds": ids}
+            )
+            response.raise_for_status()
+        except Exception as e:  # pylint: disable=broad-except
+            return [UploadResult.failure(r.index, r.path, e) if r.mediaItem is not None else r for r in results]
+        self.gp.notify_observers("album_media_added", self.albumId, ids)
+        return results
+
+    def _needs_upload(self, path: Path) -> bool:
+        entry = self.journal.lookup(path) if self.journal is not None else None
+        return entry is None or not (entry.is_created or entry.token_is_live())
+
+    def hash_ahead(self, paths: Iterable[Path], max_workers: Optional[int] = None) -> t_dict[Path, str]:
+        """hashes the files which will be looked up in the dedup index, all at once on a pool of processes,
+        to be passed to run. files the journal has already finished are skipped,
+        and the files it has created are added to the index first.
+        returns an empty dict without a dedup index
+
+        Args:
+            paths (Iterable[Path]): the files which will be passed to run
+            max_workers (Optional[int], optional): the amount of processes.
+                Defaults to None which is the amount of CPUs.
+
+        Returns:
+            dict[Path, str]: the hash of every file which may be uploaded
+        """
+        if self.dedup is None:
+            return {}
+        if self.journal is not None:
+            self.dedup.add_from_journal(self.journal)
+        return dict(hash_files([path for path in paths if self._needs_upload(path)], max_workers))
+
+    def run(self, paths: Iterable[Path],
+            digests: Optional[Mapping[Path, str]] = None) -> Generator[UploadResult, None, None]:
+        """uploads and creates all of 'paths'.
+        results are yielded in the order they complete, use UploadResult.index to match them with the input.
+        a failed file does not stop the pipeline, its UploadResult holds the error instead.
+        with a journal, files which were already created are only fetched, unless their media item was deleted,
+        and files with a live upload token are created without being uploaded again.
+        with a dedup index, files with known contents are only linked
+
+        Args:
+            paths (Iterable[Path]): the files to upload. consumed lazily
+            digests (Optional[Mapping[Path, str]], optional): hashes of the files which were calculated
+                in advance, see hash_ahead. the rest are hashed while uploading. Defaults to None.
+
+        Yields:
+            Generator[UploadResult, None, None]: the result of every file
+        """
+        source = iter(enumerate(paths))
+        digests = digests if digests is not None else {}
+        exhausted = False
+        # files taken from 'source' whose result was not yielded yet
+        pending = 0
+        uploads: t_dict[Future, t_tuple[int, Path]] = {}
+        # the conversions of videos which were started by an upload job, by the future of the transcoder
+        conversions: t_dict[Future, t_tuple[int, Path, Optional[str], _Conversion]] = {}
+        # the upload jobs of converted videos, which release their output once they have run
+        sending: t_dict[Future, _Conversion] = {}
+        creates: t_set[Future] = set()
+        ready: t_list[_ReadyItem] = []
+        existing: t_list[_ReadyItem] = []
+        known: t_list[_ReadyItem] = []
+        # indices of files whose token or media item was taken from the journal
+        reused: t_set[int] = set()
+        fetched: t_set[int] = set()
+        # indices of files which were linked, and the hashes of files which are being created
+        linked: t_set[int] = set()
+        hashes: t_dict[int, str] = {}
+        ready_since: float = 0
+        upload_pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="gp_wrapper_upload")
+        # videos which need a conversion are hashed and submitted to the transcoder on their own threads,
+        # so their conversion starts as soon as they are taken from the input instead of behind other uploads
+        convert_pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="gp_wrapper_convert")
+        create_pool = ThreadPoolExecutor(1, thread_name_prefix="gp_wrapper_create")
+
+        def upload(index: int, path: Path) -> None:
+            pool = convert_pool if is_video(path) and needs_conversion(path, self.video_policy) else upload_pool
+            uploads[pool.submit(self._upload, path, digests.get(path))] = (index, path)  # type:ignore
+        try:
+            while True:
+                while not exhausted and pending < self.max_pending:
+                    try:
+                        index, path = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending += 1
+                    entry = self.journal.lookup(path) if self.journal is not None else None
+                    if entry is None or not (entry.is_created or entry.token_is_live()):
+                        upload(index, path)
+                        continue
+                    if not (ready or existing or known):
+                        ready_since = time.monotonic()
+                    if entry.hash is not None:
+                        hashes[index] = entry.hash
+                    if entry.is_created:
+                        fetched.add(index)
+                        existing.append((index, path, entry.mediaItemId))  # type:ignore
+                    else:
+                        reused.add(index)
+                        ready.append((index, path, entry.uploadToken))  # type:ignore
+
+                now = time.monotonic()
+                # once no upload is running no more tokens will arrive soon
+                flush_all = not (uploads or conversions) or now - ready_since >= self.batch_timeout
+                for queue, func in ((ready, self._create), (existing, self._fetch), (known, self._link)):
+                    while queue and (len(queue) >= self.batch_size or flush_all):
+                        creates.add(create_pool.submit(func, queue[:self.batch_size]))
+                        del queue[:self.batch_size]
+                        ready_since = now
+
+                if not (uploads or conversions or creates):  # pylint: disable=superfluous-parens
+                    return
+                timeout: Optional[Seconds] = None
+                if ready or existing or known:
+                    timeout = max(0.0, ready_since + self.batch_timeout - now)
+                done, _ = wait([*uploads, *conversions, *creates], timeout, FIRST_COMPLETED)
+                for future in done:
+                    if future in conversions:
+                        index, path, digest, conversion = conversions.pop(future)
+                        job = upload_pool.submit(self._upload_converted, path, digest, conversion)
+                        uploads[job] = (index, path)
+                        sending[job] = conversion
+                        continue
+                    if future in uploads:
+                        index, path = uploads.pop(future)
+                        sending.pop(future, None)
+                        try:
+                            token, mediaItemId, digest, conversion = future.result()
+                        except Exception as e:  # pylint: disable=broad-except
+                            pending -= 1
+                            yield UploadResult.failure(index, path, e)
+                            continue
+                        if conversion is not None:
+                            conversions[conversion[0]] = (index, path, digest, conversion)
+                            continue
+                        if digest is not None:
+                            hashes[index] = digest
+                        if not (ready or existing or known):
+                            ready_since = time.monotonic()
+                        if mediaItemId is not None:
+                            linked.add(index)
+                            known.append((index, path, mediaItemId))
+                        else:
+                            ready.append((index, path, token))  # type:ignore
+                        continue
+                    creates.discard(future)
+                    finished: t_list[UploadResult] = []
+                    for result in future.result():
+                        retry = False
+                        if result.index in reused:
+                            reused.discard(result.index)
+                            if result.mediaItem is None:
+                                # the saved token was rejected, i.e it has expired
+                                self.journal.forget_token(result.path)  # type:ignore
+                                retry = True
+                        elif result.index in fetched:
+                            fetched.discard(result.index)
+                            status = result.result.status
+                            if result.mediaItem is None and status is not None and status.code in _NOT_FOUND_CODES:
+                                # the media item was deleted from the library since it was created
+                                self.journal.forget(result.path)  # type:ignore
+                                retry = True
+                        elif result.index in linked:
+                            linked.discard(result.index)
+                            if result.mediaItem is None and result.exception is None:
+                                # the media item is no longer in the library
+                                self.dedup.remove(hashes[result.index])  # type:ignore
+                                retry = True
+                        if retry:
+                            upload(result.index, result.path)
+                            continue
+                        finished.append(result)
+                    created = [(hashes.pop(r.index, None), r.mediaItem) for r in finished]
+                    if self.dedup is not None:
+                        self.dedup.add_many(
+                            (digest, item.id) for digest, item in created if digest is not None and item is not None)
+                    for result in finished:
+                        pending -= 1
+                        yield result
+        finally:
+            for future in uploads:
+                future.cancel()
+            upload_pool.shutdown(wait=True)
+            convert_pool.shutdown(wait=True)
+            create_pool.shutdown(wait=True)
+            # the outputs of the conversions which were never sent
+            unsent = [conversion for _, _, _, conversion in conversions.values()]
+            unsent += [conversion for job, conversion in sending.items() if job.cancelled()]
+            unsent += [job.result()[3] for job in uploads
+                       if job not in sending and not job.cancelled() and job.exception() is None]
+            for conversion in unsent:
+                if conversion is not None and conversion[1] is not None:
+                    self.transcoder.release(conversion[1])
+
+
+__all__ = [
+    "UploadPipeline",
+    "UploadResult",
+    "DEFAULT_UPLOAD_WORKERS",
+    "DEFAULT_UPLOAD_MAX_PENDING",
+    "DEFAULT_BATCH_TIMEOUT"
+]
@@ -0,0 +1,37 @@
+from typing import Optional, Iterable
+from ...utils import AlbumId, MediaItemID
+
+
+class LibraryObserver:
+    """A base class for objects that want to be told about every change made to the library
+    through a GooglePhotos object, i.e to keep a local copy of it up to date.
+    override the methods you need, all are no-ops by default.
+    observers are only called after the API has accepted the change,
+    on the thread which has made it, so they should return quickly
+    """
+
+    def media_items_created(self, mediaItems: Iterable["CoreMediaItem"],  # type:ignore # noqa
+                            albumId: Optional[AlbumId] = None) -> None:
+        """called after media items were created, with the ones which were created successfully
+        """
+
+    def media_item_updated(self, mediaItem: "CoreMediaItem") -> None:  # type:ignore # noqa
+        """called after a media item was patched, with the updated media item
+        """
+
+    def album_updated(self, album: "CoreAlbum") -> None:  # type:ignore # noqa
+        """called after an album was created or patched, with the updated album
+        """
+
+    def album_media_added(self, albumId: AlbumId, mediaItemIds: Iterable[MediaItemID]) -> None:
+        """called after media items were added to an album
+        """
+
+    def album_media_removed(self, albumId: AlbumId, mediaItemIds: Iterable[MediaItemID]) -> None:
+        """called after media items were removed from an album
+        """
+
+
+__all__ = [
+    "LibraryObserver"
+]
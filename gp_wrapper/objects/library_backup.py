@@ -0,0 +1,299 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional, Iterable, Generator
+from .core import GooglePhotos, CoreMediaItem, MediaDownloader, DownloadResult, DEFAULT_DOWNLOAD_WORKERS
+from .MediaItem import MediaItem
+from ..utils import MediaItemID, Path, Seconds, Printable, get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, dict as t_dict  # type:ignore
+
+# the name of the manifest in the root of a backup
+BACKUP_MANIFEST_NAME: str = ".gp_wrapper_backup.sqlite"
+# how many rows are written per transaction while backing up
+BACKUP_WRITE_BATCH: int = 100
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS files ("
+    "id TEXT PRIMARY KEY, path TEXT NOT NULL, filename TEXT NOT NULL, description TEXT, size INTEGER NOT NULL, "
+    "creation_time TEXT NOT NULL, mime_type TEXT NOT NULL, generation INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS files_path ON files (path)",
+    "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+
+class BackupEntry(Printable):
+    """A media item recorded in the manifest of a LibraryBackup
+
+    Args:
+        id (MediaItemID): the id of the media item
+        path (str): where its file is, relative to the root of the backup and separated by '/'
+        filename (str): its filename when it was last seen
+        description (Optional[str]): its description when it was last seen
+        size (int): the size of its file
+        creationTime (str): its creation time
+        mimeType (str): its mime type
+    """
+
+    def __init__(self, id: MediaItemID, path: str, filename: str,  # pylint: disable=redefined-builtin
+                 description: Optional[str], size: int, creationTime: str, mimeType: str) -> None:
+        self.id = id
+        self.path = path
+        self.filename = filename
+        self.description = description
+        self.size = size
+        self.creationTime = creationTime
+        self.mimeType = mimeType
+
+
+class BackupReport(Printable):
+    """What a single LibraryBackup.run has done
+
+    Args:
+        listed (int): how many media items are in the library
+        downloaded (int): how many files were downloaded
+        bytes (int): how many bytes were received
+        renamed (int): how many files were moved because their media item was renamed
+        updated (int): how many media items had a new description
+        unchanged (int): how many media items were already backed up as they are
+        removed (int): how many media items of the manifest are not in the library anymore
+        failed (list[DownloadResult]): the downloads which have failed, they are retried by the next run
+        elapsed (Seconds): how long the run took
+    """
+
+    def __init__(self) -> None:
+        self.listed = 0
+        self.downloaded = 0
+        self.bytes = 0
+        self.renamed = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.failed: t_list[DownloadResult] = []
+        self.elapsed: Seconds = 0
+
+
+class LibraryBackup:
+    """An incremental copy of the original bytes of the whole library in a local directory,
+    laid out as YYYY/MM/filename by the creation time of every media item.
+
+    a manifest of what was saved is kept in the directory, so a run lists the library and downloads only
+    the media items which are not in it yet or whose file is gone. a media item which was renamed is moved on disk
+    and a new description is written to the manifest, neither downloads the file again.
+    the downloads run concurrently with the listing, on a MediaDownloader, and an interrupted run resumes
+    its partial files on the next one.
+
+    NOTE: a media item deleted from the library is kept in the backup unless 'prune' is passed to run
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        directory (Path): the root of the backup
+        max_workers (int, optional): how many files to download at once. Defaults to DEFAULT_DOWNLOAD_WORKERS.
+        keep_times (bool, optional): whether to give every file the creation time of its media item.
+            Defaults to True.
+    """
+
+    def __init__(self, gp: GooglePhotos, directory: Path, max_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+                 keep_times: bool = True) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        self.gp = gp
+        self.directory = directory
+        self.max_workers = max_workers
+        self.keep_times = keep_times
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            os.path.join(directory, BACKUP_MANIFEST_NAME), check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+
+    # ================================= HELPERS =================================
+
+    def _execute_many(self, statement: str, rows: Iterable[tuple]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(statement, rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _put(self, rows: Iterable[tuple]) -> None:
+        self._execute_many(
+            "INSERT OR REPLACE INTO files "
+            "(id, path, filename, description, size, creation_time, mime_type, generation) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    @staticmethod
+    def _row(item: CoreMediaItem, path: str, size: int, generation: int) -> tuple:
+        return (item.id, path, item.filename, item.description, size,
+                item.mediaMetadata.creationTime.strftime(_TIME_FORMAT), item.mimeType, generation)
+
+    def _absolute(self, path: str) -> str:
+        return os.path.join(self.directory, *path.split("/"))
+
+    @staticmethod
+    def relative_path(item: CoreMediaItem) -> str:
+        """where the file of 'item' belongs, relative to the root of the backup
+        """
+        creationTime = item.mediaMetadata.creationTime
+        filename = os.path.basename(item.filename.replace("\\", "/")) or item.id
+        return f"{creationTime.year:04d}/{creationTime.month:02d}/{filename}"
+
+    @property
+    def generation(self) -> int:
+        """the number of runs which have listed the whole library
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM state WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def entry(self, mediaItemId: MediaItemID) -> Optional[BackupEntry]:
+        """returns how a media item is recorded in the manifest, or None if it was never backed up
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, path, filename, description, size, creation_time, mime_type FROM files WHERE id = ?",
+                (mediaItemId,)
+            ).fetchone()
+        return BackupEntry(*row) if row is not None else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # ================================= RUN =================================
+
+    def run(self, prune: bool = False) -> BackupReport:
+        """lists the library and brings the backup up to date with it.
+        everything done before an interruption is kept in the manifest
+
+        Args:
+            prune (bool, optional): whether to delete the files of the media items which are not in the
+                library anymore. Defaults to False.
+
+        Raises:
+            HTTPError: if listing the library has failed. a failed download is reported instead
+
+        Returns:
+            BackupReport: what was done
+        """
+        start = time.perf_counter()
+        report = BackupReport()
+        generation = self.generation + 1
+        with self._lock:
+            known = {row[0]: BackupEntry(*row) for row in self._connection.execute(
+                "SELECT id, path, filename, description, size, creation_time, mime_type FROM files")}
+        # path -> the id of the media item it belongs to
+        taken: t_dict[str, MediaItemID] = {entry.path: entry.id for entry in known.values()}
+        assigned: t_dict[MediaItemID, str] = {}
+        rows: t_list[tuple] = []
+
+        def flush(force: bool = False) -> None:
+            if force or len(rows) >= BACKUP_WRITE_BATCH:
+                self._put(rows)
+                rows.clear()
+
+        def place(item: CoreMediaItem) -> str:
+            # a path which belongs to no other media item
+            path = LibraryBackup.relative_path(item)
+            owner = taken.get(path)
+            if (owner is not None and owner != item.id) or (owner is None and os.path.exists(self._absolute(path))):
+                stem, extension = os.path.splitext(path)
+                path = f"{stem}_{item.id[-8:]}{extension}"
+            taken[path] = item.id
+            return path
+
+        def pending() -> Generator[MediaItem, None, None]:
+            # the media items to download, everything else is settled here
+            for item in MediaItem.all_media(self.gp, pre_fetch=True):
+                report.listed += 1
+                entry = known.get(item.id)
+                absolute = self._absolute(entry.path) if entry is not None else None
+                if entry is None or not os.path.isfile(absolute) or os.path.getsize(absolute) != entry.size:  # type:ignore # noqa
+                    if entry is not None and taken.get(entry.path) == item.id:
+                        del taken[entry.path]
+                    assigned[item.id] = place(item)
+                    yield item
+                    continue
+                path = entry.path
+                moved = os.path.dirname(path) != os.path.dirname(LibraryBackup.relative_path(item)) \
+                    or entry.filename != item.filename
+                if moved:
+                    del taken[path]
+                    path = place(item)
+                    if path != entry.path:
+                        os.makedirs(os.path.dirname(self._absolute(path)), exist_ok=True)
+                        os.replace(absolute, self._absolute(path))  # type:ignore
+                    report.renamed += 1
+                if entry.description != item.description:
+                    report.updated += 1
+                if not moved and entry.description == item.description:
+                    report.unchanged += 1
+                rows.append(LibraryBackup._row(item, path, entry.size, generation))
+                flush()
+
+        downloader = MediaDownloader(self.gp, self.directory, self.max_workers, overwrite=True,
+                                     keep_times=self.keep_times, name=lambda item: assigned[item.id])
+        try:
+            for result in downloader.run(pending()):
+                if not result.ok:
+                    report.failed.append(result)
+                    continue
+                report.downloaded += 1
+                report.bytes += result.downloaded
+                rows.append(LibraryBackup._row(
+                    result.mediaItem, assigned[result.mediaItem.id], result.size, generation))
+                flush()
+        finally:
+            flush(force=True)
+        # the whole library was listed, so everything which was not seen has been deleted from it.
+        # a media item whose download has failed was seen but keeps its previous row
+        with self._lock:
+            removed = [(mediaItemId, path) for mediaItemId, path in self._connection.execute(
+                "SELECT id, path FROM files WHERE generation < ?", (generation,)) if mediaItemId not in assigned]
+        report.removed = len(removed)
+        if prune:
+            for _, path in removed:
+                try:
+                    os.remove(self._absolute(path))
+                except FileNotFoundError:
+                    pass
+            self._execute_many("DELETE FROM files WHERE id = ?", ((mediaItemId,) for mediaItemId, _ in removed))
+        self._execute_many("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                           [("generation", str(generation)), ("backed_up_at", str(time.time()))])
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def close(self) -> None:
+        """closes the manifest
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "LibraryBackup":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+__all__ = [
+    "LibraryBackup",
+    "BackupReport",
+    "BackupEntry",
+    "BACKUP_MANIFEST_NAME",
+    "BACKUP_WRITE_BATCH"
+]
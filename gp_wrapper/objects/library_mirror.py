@@ -0,0 +1,427 @@
+import json
+import time
+import sqlite3
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterable, Any
+from .core import GooglePhotos, CoreMediaItem, CoreAlbum, LibraryObserver, LibraryScanner, \
+    DEFAULT_SCAN_WORKERS, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, ALBUM_LIST_MAXIMUM_PAGE_SIZE
+from .MediaItem import MediaItem
+from .Album import Album
+from ..utils import AlbumId, MediaItemID, paginate, split_iterable, get_python_version
+if get_python_version() < (3, 9):
+    from typing import List as t_list, Tuple as t_tuple, Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import list as t_list, tuple as t_tuple, dict as t_dict  # type:ignore
+
+# an incremental sync starts this long before the newest creation time in the mirror
+MIRROR_SYNC_MARGIN: datetime.timedelta = datetime.timedelta(days=2)
+# how many rows are written per transaction while syncing
+MIRROR_WRITE_BATCH: int = 500
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS media_items ("
+    "id TEXT PRIMARY KEY, filename TEXT NOT NULL, mime_type TEXT NOT NULL, description TEXT, "
+    "creation_time TEXT NOT NULL, width INTEGER, height INTEGER, data TEXT NOT NULL, generation INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS media_items_filename ON media_items (filename)",
+    "CREATE INDEX IF NOT EXISTS media_items_creation_time ON media_items (creation_time)",
+    "CREATE INDEX IF NOT EXISTS media_items_mime_type ON media_items (mime_type)",
+    "CREATE TABLE IF NOT EXISTS albums ("
+    "id TEXT PRIMARY KEY, title TEXT NOT NULL, media_items_count INTEGER NOT NULL, data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS albums_title ON albums (title)",
+    "CREATE TABLE IF NOT EXISTS album_items ("
+    "album_id TEXT NOT NULL, media_item_id TEXT NOT NULL, PRIMARY KEY (album_id, media_item_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS album_items_media_item_id ON album_items (media_item_id)",
+    "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+
+class LibraryMirror(LibraryObserver):
+    """A local SQLite copy of the metadata of the library, so that questions about it are answered
+    in milliseconds instead of paging through the whole library again.
+
+    the first sync lists the whole library. later syncs only fetch the media items created since the newest one
+    in the mirror, using a date filter, and re-list the albums whose size has changed.
+    while the mirror observes its GooglePhotos object, every change made through it is written to the mirror as well.
+    baseUrls expire and so are not kept, the media items returned by the mirror have none.
+
+    NOTE: an incremental sync goes by creation time, which is when a photo was taken and not when it was uploaded.
+    old photos uploaded from another device and deletions are only picked up by a full sync
+
+    Args:
+        gp (GooglePhotos): Google Photos object
+        path (str, optional): the path of the database file. Defaults to ':memory:' which is not persisted.
+        observe (bool, optional): whether to write the changes made through 'gp' to the mirror. Defaults to True.
+        max_workers (int, optional): how many requests to send at once while syncing.
+            with more than one, media items are listed by a LibraryScanner and those without a creation date are
+            skipped. Defaults to DEFAULT_SCAN_WORKERS.
+    """
+
+    def __init__(self, gp: GooglePhotos, path: str = ":memory:", observe: bool = True,
+                 max_workers: int = DEFAULT_SCAN_WORKERS) -> None:
+        if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_workers' should be a positive integer")
+        self.gp = gp
+        self.path = path
+        self.max_workers = max_workers
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self.observing = False
+        if observe:
+            self.observe()
+
+    # ================================= HELPERS =================================
+
+    def _state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_state(self, key: str, value: Any) -> None:
+        self._execute_many("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", [(key, str(value))])
+
+    def _execute_many(self, statement: str, rows: Iterable[tuple]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(statement, rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    @staticmethod
+    def _media_item_row(item: CoreMediaItem, generation: int) -> tuple:
+        metadata = item.mediaMetadata
+        creationTime = metadata.creationTime.strftime(_TIME_FORMAT)
+        data: t_dict[str, Any] = {
+            "id": item.id,
+            "productUrl": item.productUrl,
+            "mimeType": item.mimeType,
+            "filename": item.filename,
+            "mediaMetadata": {
+                k: v for k, v in {
+                    "creationTime": creationTime,
+                    "width": metadata.width,
+                    "height": metadata.height,
+                    "photo": metadata.photo,
+                    "video": metadata.video,
+                }.items() if v is not None
+            },
+        }
+        if item.description is not None:
+            data["description"] = item.description
+        return (item.id, item.filename, item.mimeType, item.description, creationTime,
+                metadata.width, metadata.height, json.dumps(data), generation)
+
+    @staticmethod
+    def _album_row(album: CoreAlbum) -> tuple:
+        data = {
+            "id": album.id,
+            "title": album.title,
+            "productUrl": album.productUrl,
+            "isWriteable": album.isWriteable,
+            "mediaItemsCount": album.mediaItemsCount,
+            "coverPhotoBaseUrl": album.coverPhotoBaseUrl,
+            "coverPhotoMediaItemId": album.coverPhotoMediaItemId,
+        }
+        return album.id, album.title, album.mediaItemsCount, json.dumps(data)
+
+    def _put_media_items(self, items: Iterable[CoreMediaItem], generation: Optional[int] = None) -> None:
+        if generation is None:
+            generation = self.generation
+        self._execute_many(
+            "INSERT OR REPLACE INTO media_items "
+            "(id, filename, mime_type, description, creation_time, width, height, data, generation) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self._media_item_row(item, generation) for item in items)
+        )
+
+    def _put_albums(self, albums: Iterable[CoreAlbum]) -> None:
+        self._execute_many(
+            "INSERT OR REPLACE INTO albums (id, title, media_items_count, data) VALUES (?, ?, ?, ?)",
+            (self._album_row(album) for album in albums)
+        )
+
+    def _album_media_ids(self, albumId: AlbumId) -> t_list[MediaItemID]:
+        def fetch(pageToken):
+            items, pageToken = CoreMediaItem.search(
+                self.gp, albumId, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, pageToken)
+            return (item.id for item in items), pageToken
+        return list(paginate(fetch))
+
+    def _sync_albums(self, full: bool) -> None:
+        albums = list(Album.all_albums(self.gp, ALBUM_LIST_MAXIMUM_PAGE_SIZE))
+        with self._lock:
+            known = dict(self._connection.execute("SELECT id, media_items_count FROM albums"))
+        current = {album.id for album in albums}
+        # an album is re-listed if it is new or its size has changed
+        changed = [album for album in albums if full or known.get(album.id) != album.mediaItemsCount]
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            memberships = list(executor.map(lambda album: self._album_media_ids(album.id), changed))
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                for albumId in set(known) - current:
+                    self._connection.execute("DELETE FROM albums WHERE id = ?", (albumId,))
+                    self._connection.execute("DELETE FROM album_items WHERE album_id = ?", (albumId,))
+                for album, ids in zip(changed, memberships):
+                    self._connection.execute("DELETE FROM album_items WHERE album_id = ?", (album.id,))
+                    self._connection.executemany(
+                        "INSERT OR IGNORE INTO album_items (album_id, media_item_id) VALUES (?, ?)",
+                        ((album.id, mediaItemId) for mediaItemId in ids)
+                    )
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO albums (id, title, media_items_count, data) VALUES (?, ?, ?, ?)",
+                    (self._album_row(album) for album in albums)
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _media_items(self, start: Optional[datetime.date] = None) -> Iterable[CoreMediaItem]:
+        if self.max_workers > 1:
+            return LibraryScanner(self.gp, self.max_workers, ordered=False, start=start).scan()
+        if start is not None:
+            return LibraryScanner(self.gp, 1, start=start).scan()
+        return paginate(
+            lambda token: CoreMediaItem.list(self.gp, MEDIA_ITEM_LIST_MAXIMUM_PAGE_SIZE, token),
+            pre_fetch=1
+        )
+
+    # ================================= SYNC =================================
+
+    @property
+    def generation(self) -> int:
+        """the number of full syncs done so far
+        """
+        value = self._state("generation")
+        return int(value) if value is not None else 0
+
+    @property
+    def watermark(self) -> Optional[datetime.datetime]:
+        """the newest creation time in the mirror, None before the first sync
+        """
+        value = self._state("watermark")
+        return datetime.datetime.strptime(value, _TIME_FORMAT) if value else None
+
+    @property
+    def synced_at(self) -> Optional[float]:
+        """when the last sync has finished, as returned by time.time
+        """
+        value = self._state("synced_at")
+        return float(value) if value is not None else None
+
+    def sync(self, full: bool = False) -> None:
+        """brings the mirror up to date with the library
+
+        Args:
+            full (bool, optional): whether to list the whole library again, which also removes deleted items.
+                Defaults to False which only fetches what was created since the last sync,
+                unless the mirror was never synced.
+
+        Raises:
+            HTTPError: if a request has failed. everything written before the error is kept
+        """
+        watermark = self.watermark
+        if full or watermark is None:
+            generation = self.generation + 1
+            start = None
+        else:
+            generation = self.generation
+            start = (watermark - MIRROR_SYNC_MARGIN).date()
+        for batch in split_iterable(self._media_items(start), MIRROR_WRITE_BATCH):
+            self._put_media_items(batch, generation)
+        if start is None:
+            # every item which was not listed again has been deleted
+            with self._lock:
+                self._connection.execute("DELETE FROM media_items WHERE generation < ?", (generation,))
+            self._set_state("generation", generation)
+        self._sync_albums(start is None)
+        with self._lock:
+            newest = self._connection.execute("SELECT MAX(creation_time) FROM media_items").fetchone()[0]
+        if newest is not None:
+            self._set_state("watermark", newest)
+        self._set_state("synced_at", time.time())
+
+    # ================================= OBSERVER =================================
+
+    def observe(self) -> None:
+        """starts writing the changes made through the GooglePhotos object to the mirror
+        """
+        if not self.observing:
+            self.gp.add_observer(self)
+            self.observing = True
+
+    def media_items_created(self, mediaItems: Iterable[CoreMediaItem], albumId: Optional[AlbumId] = None) -> None:
+        mediaItems = list(mediaItems)
+        self._put_media_items(mediaItems)
+        if albumId is not None:
+            self.album_media_added(albumId, [item.id for item in mediaItems])
+
+    def media_item_updated(self, mediaItem: CoreMediaItem) -> None:
+        self._put_media_items([mediaItem])
+
+    def album_updated(self, album: CoreAlbum) -> None:
+        self._put_albums([album])
+
+    def album_media_added(self, albumId: AlbumId, mediaItemIds: Iterable[MediaItemID]) -> None:
+        self._execute_many(
+            "INSERT OR IGNORE INTO album_items (album_id, media_item_id) VALUES (?, ?)",
+            ((albumId, mediaItemId) for mediaItemId in mediaItemIds)
+        )
+
+    def album_media_removed(self, albumId: AlbumId, mediaItemIds: Iterable[MediaItemID]) -> None:
+        self._execute_many(
+            "DELETE FROM album_items WHERE album_id = ? AND media_item_id = ?",
+            ((albumId, mediaItemId) for mediaItemId in mediaItemIds)
+        )
+
+    # ================================= QUERIES =================================
+
+    @staticmethod
+    def _where(filename: Optional[str], mimeType: Optional[str], start: Optional[datetime.datetime],
+               end: Optional[datetime.datetime], albumId: Optional[AlbumId]) -> t_tuple[str, list]:
+        conditions: t_list[str] = []
+        params: list = []
+        if filename is not None:
+            conditions.append("filename = ?")
+            params.append(filename)
+        if mimeType is not None:
+            if mimeType.endswith("/"):
+                # a whole type, i.e "video/"
+                conditions.append("mime_type >= ? AND mime_type < ?")
+                params.extend([mimeType, mimeType[:-1] + "0"])
+            else:
+                conditions.append("mime_type = ?")
+                params.append(mimeType)
+        if start is not None:
+            conditions.append("creation_time >= ?")
+            params.append(start.strftime(_TIME_FORMAT))
+        if end is not None:
+            conditions.append("creation_time < ?")
+            params.append(end.strftime(_TIME_FORMAT))
+        if albumId is not None:
+            conditions.append("id IN (SELECT media_item_id FROM album_items WHERE album_id = ?)")
+            params.append(albumId)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def get(self, mediaItemId: MediaItemID) -> Optional[MediaItem]:
+        """returns the media item with the id 'mediaItemId' if it is in the mirror
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM media_items WHERE id = ?", (mediaItemId,)).fetchone()
+        return MediaItem.from_dict(self.gp, json.loads(row[0])) if row is not None else None
+
+    def find(
+        self,
+        filename: Optional[str] = None,
+        mimeType: Optional[str] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        albumId: Optional[AlbumId] = None,
+        limit: Optional[int] = None
+    ) -> t_list[MediaItem]:
+        """returns the media items which match all of the given conditions, newest first
+
+        Args:
+            filename (Optional[str], optional): the exact filename. Defaults to None.
+            mimeType (Optional[str], optional): the exact mime type,
+                or a whole type if it ends with '/', i.e "video/". Defaults to None.
+            start (Optional[datetime.datetime], optional): the earliest creation time, in UTC. Defaults to None.
+            end (Optional[datetime.datetime], optional): the creation time to stop before, in UTC. Defaults to None.
+            albumId (Optional[AlbumId], optional): an album the items are in. Defaults to None.
+            limit (Optional[int], optional): the maximum amount of items to return. Defaults to None.
+
+        Returns:
+            list[MediaItem]: the matching media items
+        """
+        where, params = self._where(filename, mimeType, start, end, albumId)
+        statement = f"SELECT data FROM media_items{where} ORDER BY creation_time DESC"
+        if limit is not None:
+            statement += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(statement, params).fetchall()
+        return [MediaItem.from_dict(self.gp, json.loads(data)) for data, in rows]
+
+    def count(
+        self,
+        filename: Optional[str] = None,
+        mimeType: Optional[str] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        albumId: Optional[AlbumId] = None
+    ) -> int:
+        """returns how many media items match all of the given conditions, see LibraryMirror.find
+        """
+        where, params = self._where(filename, mimeType, start, end, albumId)
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM media_items{where}", params).fetchone()[0]
+
+    def albums(self, title: Optional[str] = None) -> t_list[Album]:
+        """returns the albums in the mirror, only those named 'title' if it is given
+        """
+        statement = "SELECT data FROM albums"
+        params: list = []
+        if title is not None:
+            statement += " WHERE title = ?"
+            params.append(title)
+        with self._lock:
+            rows = self._connection.execute(statement, params).fetchall()
+        return [Album.from_dict(self.gp, json.loads(data)) for data, in rows]
+
+    def album_media_ids(self, albumId: AlbumId) -> t_list[MediaItemID]:
+        """returns the ids of the media items in an album
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT media_item_id FROM album_items WHERE album_id = ?", (albumId,)).fetchall()
+        return [mediaItemId for mediaItemId, in rows]
+
+    def albums_of(self, mediaItemId: MediaItemID) -> t_list[AlbumId]:
+        """returns the ids of the albums a media item is in
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT album_id FROM album_items WHERE media_item_id = ?", (mediaItemId,)).fetchall()
+        return [albumId for albumId, in rows]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __contains__(self, mediaItemId: MediaItemID) -> bool:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT 1 FROM media_items WHERE id = ?", (mediaItemId,)).fetchone() is not None
+
+    def close(self) -> None:
+        """stops observing and closes the database
+        """
+        if self.observing:
+            self.gp.remove_observer(self)
+            self.observing = False
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "LibraryMirror":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+__all__ = [
+    "LibraryMirror",
+    "MIRROR_SYNC_MARGIN",
+    "MIRROR_WRITE_BATCH"
+]
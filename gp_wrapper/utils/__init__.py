@@ -1,4 +1,15 @@
 from .helpers import *
 from .structures import *
 from .pbar import *
+from .quota import *
+from .retry import *
+from .token_store import *
+from .metrics import *
+from .upload_journal import *
+from .dedup_index import *
+from .pagination import *
+from .ttl_cache import *
+from .video import *
+from .transcoder import *
+from .thumbnail_store import *
 from .win32_ctime import *
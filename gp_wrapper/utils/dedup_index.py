@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Iterable, Generator
+from .helpers import get_python_version, file_hash
+from .structures import MediaItemID, Path
+from .upload_journal import UploadJournal
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple, Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple, dict as t_dict  # type:ignore
+
+
+def hash_files(paths: Iterable[Path], max_workers: Optional[int] = None,
+               chunksize: int = 16) -> Generator[t_tuple[Path, str], None, None]:
+    """calculates the file_hash of many files in parallel on a pool of processes
+
+    Args:
+        paths (Iterable[Path]): the files to hash
+        max_workers (Optional[int], optional): the amount of processes. Defaults to None which is the amount of CPUs.
+        chunksize (int, optional): how many paths to send to a process at once. Defaults to 16.
+
+    Yields:
+        Generator[tuple[Path, str], None, None]: each path with its hash, in the order of 'paths'
+    """
+    paths = list(paths)
+    with ProcessPoolExecutor(max_workers) as executor:
+        yield from zip(paths, executor.map(file_hash, paths, chunksize=chunksize))
+
+
+class DedupIndex:
+    """Maps the sha256 of the contents of files to the ids of the media items created from them,
+    so that a file which is already in the library is linked instead of being uploaded again.
+    the whole index is kept in a dict for O(1) lookups and persisted to SQLite.
+    digests are kept as raw bytes to halve the memory of large indices.
+    may be shared between threads
+
+    Args:
+        path (str, optional): the path of the database file. Defaults to ':memory:' which is not persisted.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS hashes (hash BLOB PRIMARY KEY, media_item_id TEXT NOT NULL) WITHOUT ROWID")
+        self._index: t_dict[bytes, MediaItemID] = dict(
+            self._connection.execute("SELECT hash, media_item_id FROM hashes"))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, hash: str) -> bool:  # pylint: disable=redefined-builtin
+        return bytes.fromhex(hash) in self._index
+
+    def get(self, hash: str) -> Optional[MediaItemID]:  # pylint: disable=redefined-builtin
+        """returns the id of the media item whose contents have the hex digest 'hash', if known
+        """
+        return self._index.get(bytes.fromhex(hash))
+
+    def add(self, hash: str, mediaItemId: MediaItemID) -> None:  # pylint: disable=redefined-builtin
+        """records that the contents with the hex digest 'hash' are the media item 'mediaItemId'
+        """
+        self.add_many([(hash, mediaItemId)])
+
+    def add_many(self, entries: Iterable[t_tuple[str, MediaItemID]]) -> None:
+        """like add but for many entries in a single transaction
+
+        Args:
+            entries (Iterable[tuple[str, MediaItemID]]): pairs of hex digests and media item ids
+        """
+        rows = [(bytes.fromhex(hash), mediaItemId) for hash, mediaItemId in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO hashes (hash, media_item_id) VALUES (?, ?)", rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            self._index.update(rows)
+
+    def add_from_journal(self, journal: UploadJournal) -> None:
+        """adds every file which the journal has recorded as created and which is not in the index yet
+        """
+        self.add_many((digest, mediaItemId) for digest, mediaItemId in journal.created_hashes()
+                      if self._index.get(bytes.fromhex(digest)) != mediaItemId)
+
+    def remove(self, hash: str) -> None:  # pylint: disable=redefined-builtin
+        """forgets the contents with the hex digest 'hash', i.e after their media item was deleted
+        """
+        key = bytes.fromhex(hash)
+        with self._lock:
+            self._connection.execute("DELETE FROM hashes WHERE hash = ?", (key,))
+            self._index.pop(key, None)
+
+    def close(self) -> None:
+        """closes the database
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "DedupIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+__all__ = [
+    "DedupIndex",
+    "hash_files"
+]
@@ -1,5 +1,8 @@
+import os
+import mmap
 import functools
 import time
+import hashlib
 import platform
 from typing import Callable, TypeVar, Generator, Iterable, Any, ForwardRef
 
@@ -79,29 +82,53 @@ def slowdown(interval: ForwardRef("Seconds")):  # type:ignore
     Args:
         minimal_interval_duration (float): duration to space out calls
     """
-    from .structures import Seconds, Milliseconds
+    from .structures import Seconds
     if not isinstance(interval, (int, float)):
         raise ValueError("minimal_interval_duration must be a number")
 
     def deco(func: Callable[P, T]) -> Callable[P, T]:  # type:ignore
-        index = 0
         prev_start: float = -float("inf")
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> T:
-            nonlocal index, prev_start
-            start = time.time()
-            time_passed: Milliseconds = (start-prev_start)/1000
+            nonlocal prev_start
+            time_passed: Seconds = time.monotonic()-prev_start
             time_to_wait: Seconds = interval-time_passed
             if time_to_wait > 0:
                 time.sleep(time_to_wait)
-            res = func(*args, **kwargs)
-            prev_start = start
-            return res
+            prev_start = time.monotonic()
+            return func(*args, **kwargs)
         return wrapper
     return deco
 
 
+def file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """calculates the sha256 of the contents of a file.
+    the file is memory-mapped so its contents are hashed straight from the page cache without being copied
+
+    Args:
+        path (str): the path of the file
+        chunk_size (int, optional): how many bytes to hash at once. Defaults to 1MiB.
+
+    Returns:
+        str: the hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # an empty file can't be mapped
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, chunk_size):
+                    digest.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
 def memo(func):
     """memoizes a function
     """
@@ -122,5 +149,6 @@ __all__ = [
     "json_default",
     "slowdown",
     "get_python_version",
+    "file_hash",
     "memo"
 ]
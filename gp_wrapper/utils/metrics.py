@@ -0,0 +1,250 @@
+import re
+import math
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+from requests import Response
+from .helpers import get_python_version
+from .structures import RequestType, Seconds, Printable
+if get_python_version() < (3, 9):
+    from typing import Dict as t_dict, List as t_list  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import dict as t_dict, list as t_list  # type:ignore
+
+API_HOST = "photoslibrary.googleapis.com"
+_ID_SEGMENT = re.compile(r"/(mediaItems|albums|sharedAlbums)/[^/:]+")
+
+
+def endpoint_template(url: str) -> str:
+    """replaces the identifiers in a url so that all calls to the same endpoint are grouped together
+
+    Args:
+        url (str): the url of a request
+
+    Returns:
+        str: the template, i.e "/v1/albums/{id}:batchAddMediaItems"
+    """
+    parts = urlsplit(url)
+    if parts.netloc != API_HOST:
+        # baseUrls and other hosts are only grouped by host
+        return f"{parts.netloc}/*"
+    return _ID_SEGMENT.sub(r"/\1/{id}", parts.path)
+
+
+class RequestMetrics(Printable):
+    """Information about a single call to GooglePhotos.request.
+    before the request only 'method', 'url' and 'endpoint' are populated
+
+    Args:
+        method (RequestType): the type of the request
+        url (str): the url of the request
+    """
+
+    def __init__(self, method: RequestType, url: str) -> None:
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint_template(url)
+        self.status: Optional[int] = None
+        self.request_bytes: int = 0
+        self.response_bytes: int = 0
+        self.wall_time: Seconds = 0
+        self.time_to_first_byte: Seconds = 0
+        self.retries: int = 0
+        self.exception: Optional[Exception] = None
+
+    def record_response(self, response: Response, streamed: bool = False) -> None:
+        """fills the fields which are taken from the final response
+        """
+        self.status = response.status_code
+        self.request_bytes = int(response.request.headers.get("Content-Length", 0) or 0)
+        if streamed:
+            self.response_bytes = int(response.headers.get("Content-Length", 0) or 0)
+        else:
+            self.response_bytes = len(response.content)
+        # requests measures until the headers of the response have been parsed
+        self.time_to_first_byte = response.elapsed.total_seconds()
+
+
+class RequestHook:
+    """A base class for objects that want to observe every request.
+    override the methods you need, both are no-ops by default.
+    hooks are called on the thread which sends the request so they should return quickly
+    """
+
+    def before_request(self, metrics: RequestMetrics) -> None:
+        """called once before the first attempt of a request
+        """
+
+    def after_request(self, metrics: RequestMetrics) -> None:
+        """called once after the last attempt of a request, whether it succeeded or not
+        """
+
+
+class LatencyHistogram:
+    """A histogram with HDR-style log-linear buckets.
+    every power of 2 is split into 2**'sub_bucket_bits' linear buckets so that
+    the relative error of a recorded value is below 2**-'sub_bucket_bits'
+
+    Args:
+        sub_bucket_bits (int, optional): precision of the histogram. Defaults to 5 (about 3%).
+        unit (Seconds, optional): the smallest value told apart. Defaults to 1e-5.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 5, unit: Seconds = 1e-5) -> None:
+        self.sub_bucket_bits = sub_bucket_bits
+        self.unit = unit
+        self.counts: t_dict[int, int] = {}
+        self.total: int = 0
+        self.sum: Seconds = 0
+        self.max: Seconds = 0
+
+    def _index(self, value: Seconds) -> int:
+        units = max(1, int(value / self.unit))
+        exponent = units.bit_length() - 1
+        if exponent < self.sub_bucket_bits:
+            return units
+        shift = exponent - self.sub_bucket_bits
+        sub_bucket = units >> shift
+        return ((shift + 1) << self.sub_bucket_bits) + sub_bucket - (1 << self.sub_bucket_bits)
+
+    def _upper_bound(self, index: int) -> Seconds:
+        size = 1 << self.sub_bucket_bits
+        if index < size:
+            return (index + 1) * self.unit
+        exponent = (index >> self.sub_bucket_bits) - 1
+        sub_bucket = (index & (size - 1)) + size
+        return ((sub_bucket + 1) << exponent) * self.unit
+
+    def record(self, value: Seconds) -> None:
+        """adds a value to the histogram
+        """
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Seconds:
+        """returns an upper bound of the 'p' percentile
+
+        Args:
+            p (float): the percentile, between 0 and 100
+
+        Returns:
+            Seconds: the value
+        """
+        if not (0 <= p <= 100):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'p' must be between 0 and 100")
+        if self.total == 0:
+            return 0
+        target = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self.max, self._upper_bound(index))
+        return self.max
+
+    @property
+    def mean(self) -> Seconds:
+        """the average of all recorded values
+        """
+        return self.sum / self.total if self.total else 0
+
+
+class EndpointStats(Printable):
+    """Counters of a single endpoint template kept by MetricsAggregator
+    """
+
+    def __init__(self) -> None:
+        self.requests: int = 0
+        self.errors: int = 0
+        self.retries: int = 0
+        self.request_bytes: int = 0
+        self.response_bytes: int = 0
+        self.busy_time: Seconds = 0
+        self.statuses: t_dict[int, int] = {}
+        self.latency = LatencyHistogram()
+        self.time_to_first_byte = LatencyHistogram()
+
+    @property
+    def throughput(self) -> float:
+        """bytes sent and received per second spent in requests
+        """
+        if self.busy_time == 0:
+            return 0
+        return (self.request_bytes + self.response_bytes) / self.busy_time
+
+    def summary(self) -> dict:
+        """returns the main figures as a dict
+        """
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "statuses": dict(self.statuses),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "throughput": self.throughput,
+            "p50": self.latency.percentile(50),
+            "p90": self.latency.percentile(90),
+            "p99": self.latency.percentile(99),
+            "max": self.latency.max,
+            "ttfb_p50": self.time_to_first_byte.percentile(50),
+        }
+
+
+class MetricsAggregator(RequestHook):
+    """An in-memory RequestHook which keeps an EndpointStats per endpoint template.
+    recording a request costs a dict lookup and a few additions under a lock
+    """
+
+    def __init__(self) -> None:
+        self._stats: t_dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def after_request(self, metrics: RequestMetrics) -> None:
+        key = f"{metrics.method.value.upper()} {metrics.endpoint}"
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = EndpointStats()
+            stats.requests += 1
+            stats.retries += metrics.retries
+            stats.request_bytes += metrics.request_bytes
+            stats.response_bytes += metrics.response_bytes
+            stats.busy_time += metrics.wall_time
+            if metrics.status is None or metrics.status >= 400:
+                stats.errors += 1
+            if metrics.status is not None:
+                stats.statuses[metrics.status] = stats.statuses.get(metrics.status, 0) + 1
+            stats.latency.record(metrics.wall_time)
+            stats.time_to_first_byte.record(metrics.time_to_first_byte)
+
+    def endpoints(self) -> t_list[str]:
+        """returns the keys of all endpoints seen so far
+        """
+        with self._lock:
+            return list(self._stats)
+
+    def summary(self) -> t_dict[str, dict]:
+        """returns the summary of every endpoint seen so far
+        """
+        with self._lock:
+            return {key: stats.summary() for key, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """forgets everything recorded so far
+        """
+        with self._lock:
+            self._stats = {}
+
+
+__all__ = [
+    "RequestMetrics",
+    "RequestHook",
+    "LatencyHistogram",
+    "EndpointStats",
+    "MetricsAggregator",
+    "endpoint_template"
+]
@@ -0,0 +1,238 @@
+import math
+import heapq
+import threading
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Generator, TypeVar, Any, Sequence
+from .helpers import get_python_version
+from .structures import NextPageToken
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple, List as t_list  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple, list as t_list  # type:ignore
+
+T = TypeVar("T")
+Page = t_tuple[Optional[Iterable[T]], Optional[NextPageToken]]
+
+# how many pages to fetch ahead when pre_fetch=True is given
+DEFAULT_PREFETCH_PAGES: int = 2
+_DONE = object()
+
+
+def paginate(
+    fetch: Callable[[Optional[NextPageToken]], Page],
+    pageToken: Optional[NextPageToken] = None,
+    max_pages: float = math.inf,
+    pre_fetch: int = 0
+) -> Generator[T, None, None]:
+    """yields the items of consecutive pages, following the page tokens
+
+    Args:
+        fetch (Callable[[Optional[NextPageToken]], tuple[Optional[Iterable[T]], Optional[NextPageToken]]]):
+            gets the page of a token, and the token of the next page
+        pageToken (Optional[NextPageToken], optional): the token of the first page. Defaults to None.
+        max_pages (float, optional): how many pages to fetch at most. Defaults to all of them.
+        pre_fetch (int, optional): how many pages to fetch ahead on a background thread
+            while the caller consumes the current one. Defaults to 0 which fetches each page only when it is needed.
+
+    Raises:
+        ValueError: if 'max_pages' is not positive or 'pre_fetch' is negative
+
+    Yields:
+        Generator[T, None, None]: the items in the order of the pages
+    """
+    if not (0 < max_pages):  # pylint: disable=unneeded-not,superfluous-parens
+        raise ValueError("'max_pages' should be a positive integer")
+    if not (0 <= pre_fetch):  # pylint: disable=unneeded-not,superfluous-parens
+        raise ValueError("'pre_fetch' should be a non-negative integer")
+    if pre_fetch is True:
+        pre_fetch = DEFAULT_PREFETCH_PAGES
+    if pre_fetch == 0:
+        pages = 0
+        while True:
+            items, pageToken = fetch(pageToken)
+            pages += 1
+            if items:
+                yield from items
+            if not pageToken or pages >= max_pages:
+                return
+    yield from _prefetch(fetch, pageToken, max_pages, pre_fetch)
+
+
+def _prefetch(
+    fetch: Callable[[Optional[NextPageToken]], Page],
+    pageToken: Optional[NextPageToken],
+    max_pages: float,
+    pre_fetch: int
+) -> Generator[Any, None, None]:
+    # each element is a page as a list, a failure as (None, exception) or _DONE
+    q: Queue = Queue(maxsize=pre_fetch)
+    stop = threading.Event()
+
+    def produce() -> None:
+        token = pageToken
+        pages = 0
+        # every put is preceded by a check of 'stop', so once the consumer has stopped
+        # and emptied the queue at most one more put happens, which can't block
+        try:
+            while not stop.is_set():
+                items, token = fetch(token)
+                pages += 1
+                # the conversion of the items also happens on this thread
+                q.put((list(items) if items else [], None))
+                if not token or pages >= max_pages:
+                    break
+        except BaseException as e:  # pylint: disable=broad-except
+            if not stop.is_set():
+                q.put((None, e))
+            return
+        if not stop.is_set():
+            q.put(_DONE)
+
+    thread = threading.Thread(target=produce, name="gp_wrapper-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            page = q.get()
+            if page is _DONE:
+                return
+            items, exception = page
+            if exception is not None:
+                raise exception
+            yield from items
+    finally:
+        # the consumer has stopped, the producer exits after the page it is fetching
+        stop.set()
+        while True:
+            try:
+                q.get_nowait()
+            except Empty:
+                break
+
+
+def limit_pages(
+    fetch: Callable[[Optional[NextPageToken], int], Page],
+    pageSize: int,
+    limit: float = math.inf,
+    maximum: Optional[int] = None
+) -> Callable[[Optional[NextPageToken]], Page]:
+    """wraps a fetch which gets a page of a given size so that no more than 'limit' items are fetched in total,
+    to be used with paginate.
+    every page is sized to the items still missing, so with a large limit the pages are of 'maximum' size
+    and only the last one is smaller. once 'limit' items were fetched the listing ends without another request
+
+    Args:
+        fetch (Callable[[Optional[NextPageToken], int], tuple[Optional[Iterable[T]], Optional[NextPageToken]]]):
+            gets the page of a token with a given size, and the token of the next page
+        pageSize (int): the size of the pages when there is no limit
+        limit (float, optional): how many items to fetch at most. Defaults to all of them.
+        maximum (Optional[int], optional): the maximal size of a page. Defaults to None which is 'pageSize'.
+
+    Raises:
+        ValueError: if 'limit' is not positive
+
+    Returns:
+        Callable[[Optional[NextPageToken]], tuple[Optional[Iterable[T]], Optional[NextPageToken]]]: the new fetch
+    """
+    if not (0 < limit):  # pylint: disable=unneeded-not,superfluous-parens
+        raise ValueError("'limit' should be a positive integer")
+    if limit == math.inf:
+        return lambda pageToken: fetch(pageToken, pageSize)
+    maximum = maximum if maximum is not None else pageSize
+    # a page may hold fewer items than requested, so the count is of the items actually received
+    fetched = 0
+
+    def limited(pageToken: Optional[NextPageToken]) -> Page:
+        nonlocal fetched
+        items, pageToken = fetch(pageToken, int(min(maximum, limit - fetched)))  # type:ignore
+        page = list(items)[:int(limit - fetched)] if items else []
+        fetched += len(page)
+        return page, (pageToken if fetched < limit else None)
+    return limited
+
+
+def paginate_many(
+    fetches: Sequence[Callable[[Optional[NextPageToken]], Page]],
+    max_workers: int = DEFAULT_PREFETCH_PAGES,
+    key: Optional[Callable[[Any], Any]] = None,
+    reverse: bool = False
+) -> Generator[T, None, None]:
+    """pages through several listings at once on a pool of threads, see paginate.
+    the next page of a listing is requested as soon as its current page arrives,
+    so at most one page per listing is waiting to be consumed
+
+    Args:
+        fetches (Sequence[Callable[[Optional[NextPageToken]], tuple[Optional[Iterable[T]], Optional[NextPageToken]]]]):
+            the listings
+        max_workers (int, optional): how many pages to fetch at once. Defaults to DEFAULT_PREFETCH_PAGES.
+        key (Optional[Callable[[T], Any]], optional): if given, every listing is sorted by it and
+            the listings are merged in its order. Defaults to None which yields the pages in the order they arrive.
+        reverse (bool, optional): whether the listings are sorted in descending order of 'key'. Defaults to False.
+
+    Raises:
+        ValueError: if 'max_workers' is not positive
+
+    Yields:
+        Generator[T, None, None]: the items of all listings
+    """
+    if not (0 < max_workers):  # pylint: disable=unneeded-not,superfluous-parens
+        raise ValueError("'max_workers' should be a positive integer")
+    if not fetches:
+        return
+    # with a key every listing has a queue of its own, otherwise all of them share the first one
+    queues: t_list[Queue] = [Queue() for _ in (fetches if key is not None else [None])]
+    stop = threading.Event()
+
+    def run(i: int, pageToken: Optional[NextPageToken]) -> None:
+        if stop.is_set():
+            return
+        page: t_tuple[int, Optional[t_list[Any]], Optional[NextPageToken], Optional[BaseException]]
+        try:
+            items, pageToken = fetches[i](pageToken)
+            page = (i, list(items) if items else [], pageToken, None)
+        except BaseException as e:  # pylint: disable=broad-except
+            page = (i, None, None, e)
+        queues[i if key is not None else 0].put(page)
+
+    def listing(i: int) -> Generator[Any, None, None]:
+        while True:
+            _, items, pageToken, exception = queues[i].get()
+            if exception is not None:
+                raise exception
+            if pageToken:
+                executor.submit(run, i, pageToken)
+            yield from items
+            if not pageToken:
+                return
+
+    def arrivals() -> Generator[Any, None, None]:
+        remaining = len(fetches)
+        while remaining > 0:
+            i, items, pageToken, exception = queues[0].get()
+            if exception is not None:
+                raise exception
+            if pageToken:
+                executor.submit(run, i, pageToken)
+            else:
+                remaining -= 1
+            yield from items
+
+    executor = ThreadPoolExecutor(max_workers, thread_name_prefix="gp_wrapper-paginate")
+    try:
+        for i in range(len(fetches)):
+            executor.submit(run, i, None)
+        if key is None:
+            yield from arrivals()
+        else:
+            yield from heapq.merge(*(listing(i) for i in range(len(fetches))), key=key, reverse=reverse)
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+__all__ = [
+    "paginate",
+    "paginate_many",
+    "limit_pages",
+    "DEFAULT_PREFETCH_PAGES"
+]
@@ -1,10 +1,35 @@
-import math
-from typing import Iterable
+import os
+from typing import Iterator, Optional, Union, BinaryIO
 from abc import ABC, abstractmethod
 from tqdm import tqdm
+from .helpers import get_python_version
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple  # type:ignore
 
 
 DEFAULT_BAR_FORMAT = "{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}"
+KB = 1024
+MB = 1024*KB
+GB = 1024*MB
+DEFAULT_CHUNK_SIZE = 64*KB
+
+
+def size_unit(size: int) -> t_tuple[int, str]:
+    """returns the unit a progress bar should use to show 'size' bytes
+
+    Args:
+        size (int): amount of bytes
+
+    Returns:
+        tuple[int, str]: the size of the unit in bytes, the name of the unit
+    """
+    if size/GB > 1:
+        return GB, "GB"
+    if size/MB > 1:
+        return MB, "MB"
+    return KB, "KB"
 
 
 class ProgressBar(ABC):
@@ -41,47 +66,78 @@ ProgressBar.register(tqdm)
 
 
 class ProgressBarInjector:
-    """allows seeing an indication of the progress of the request using tqdm
+    """A streaming request body which optionally reports its progress to a ProgressBar.
+    bytes are sent as memoryview slices and files are read with 'readinto' into a single reused buffer,
+    so no copies of the data are made and a file is never loaded into memory as a whole.
+    the body may be iterated more than once which allows a failed request to be sent again
+
+    Args:
+        data (Union[bytes, BinaryIO]): the data to send or a file opened in binary mode
+        pbar (Optional[ProgressBar], optional): the progress bar to update. Defaults to None.
+        chunk_size (int, optional): the size of each chunk. Defaults to DEFAULT_CHUNK_SIZE.
+        offset (Optional[int], optional): where to start in 'data'.
+            Defaults to None which means the start of bytes or the current position of a file.
+        length (Optional[int], optional): how many bytes to send. Defaults to None which means until the end.
     """
 
-    def __init__(self, data: bytes, pbar: ProgressBar, chunk_size: int = 8192) -> None:
-        self.data = data
-        self._len = len(self.data)
+    def __init__(self, data: Union[bytes, BinaryIO], pbar: Optional[ProgressBar] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, offset: Optional[int] = None,
+                 length: Optional[int] = None) -> None:
+        if not (0 < chunk_size):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'chunk_size' must be a positive integer")
+        self.file: Optional[BinaryIO] = None
+        self._view: Optional[memoryview] = None
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            self._view = memoryview(data).cast("B")
+            self.offset = offset if offset is not None else 0
+            size = self._view.nbytes
+        else:
+            self.file = data
+            self.offset = offset if offset is not None else data.tell()
+            size = os.fstat(data.fileno()).st_size
+        available = max(0, size - self.offset)
+        self._len = available if length is None else min(length, available)
         self.pbar = pbar
         self.chunk_size = chunk_size
 
     def __len__(self) -> int:
         return self._len
 
-    def __iter__(self) -> Iterable[bytes]:
-        num_of_chunks = math.ceil(len(self)/self.chunk_size)
-        chunks = (self.data[i:i + self.chunk_size]
-                  for i in range(0, len(self), self.chunk_size))
-        KB = 1024
-        MB = 1024*KB
-        GB = 1024*MB
-
-        if len(self)/GB > 1:
-            total = len(self)/GB
-            unit = "GB"
-        elif len(self)/MB > 1:
-            total = len(self)/MB
-            unit = "MB"
-        else:
-            total = len(self)/KB
-            unit = "KB"
-
-        update_amount = total/num_of_chunks
+    def _chunks(self) -> Iterator[memoryview]:
+        if self._view is not None:
+            end = self.offset + len(self)
+            for i in range(self.offset, end, self.chunk_size):
+                yield self._view[i:min(i + self.chunk_size, end)]
+            return
+        self.file.seek(self.offset)  # type:ignore
+        buffer = memoryview(bytearray(min(self.chunk_size, len(self)) or 1))
+        remaining = len(self)
+        while remaining > 0:
+            read = self.file.readinto(buffer[:min(len(buffer), remaining)])  # type:ignore
+            if not read:
+                raise EOFError("the file has ended before all of its data was sent")
+            remaining -= read
+            # the buffer is reused, the chunk is sent before the next one is read
+            yield buffer[:read]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        if self.pbar is None:
+            yield from self._chunks()
+            return
+        unit_size, unit = size_unit(len(self))
+        self.pbar.reset()
         self.pbar.unit = unit
-        self.pbar.total = total
+        self.pbar.total = len(self)/unit_size
         self.pbar.bar_format = DEFAULT_BAR_FORMAT
-        for chunk in chunks:
+        for chunk in self._chunks():
             yield chunk
-            self.pbar.update(update_amount)
+            self.pbar.update(len(chunk)/unit_size)
         self.pbar.reset()
 
 
 __all__ = [
     "ProgressBar",
-    "ProgressBarInjector"
+    "ProgressBarInjector",
+    "size_unit",
+    "DEFAULT_CHUNK_SIZE"
 ]
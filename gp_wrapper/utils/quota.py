@@ -0,0 +1,160 @@
+import time
+import asyncio
+import threading
+from typing import Optional
+from .helpers import get_python_version
+from .structures import EndpointClass, RequestType, Seconds, Printable
+from .structures import ALBUMS_ENDPOINT, UPLOAD_MEDIA_ITEM_ENDPOINT, MEDIA_ITEMS_CREATE_ENDPOINT, \
+    MEDIA_ITEMS_SEARCH_ENDPOINT, LIBRARY_API_ENDPOINT
+if get_python_version() < (3, 9):
+    from typing import Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import dict as t_dict  # type:ignore
+
+
+class RateLimit(Printable):
+    """A description of how many requests are allowed over time
+
+    Args:
+        rate (float): sustained amount of requests per second
+        burst (float, optional): how many requests may be sent at once after being idle.
+            Defaults to 1.
+    """
+
+    def __init__(self, rate: float, burst: float = 1) -> None:
+        if not (0 < rate):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'rate' must be a positive number")
+        if not (1 <= burst):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'burst' must be at-least 1")
+        self.rate = rate
+        self.burst = burst
+
+
+DEFAULT_RATE_LIMITS: t_dict[EndpointClass, RateLimit] = {
+    EndpointClass.UPLOAD: RateLimit(5, 10),
+    EndpointClass.BATCH_CREATE: RateLimit(2, 5),
+    EndpointClass.READ: RateLimit(10, 20),
+    EndpointClass.ALBUM_MUTATION: RateLimit(2, 5),
+    EndpointClass.DOWNLOAD: RateLimit(10, 20),
+    EndpointClass.OTHER: RateLimit(5, 10),
+}
+
+
+class TokenBucket:
+    """A thread-safe token bucket.
+    a caller reserves a token and then waits until the bucket would have held it,
+    so waiting callers are served in the order they arrived and never busy-wait
+
+    Args:
+        limit (RateLimit): the rate and capacity of the bucket
+    """
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self._tokens: float = limit.burst
+        self._last: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> Seconds:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.limit.burst, self._tokens + (now - self._last) * self.limit.rate)
+            self._last = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.limit.rate
+
+    def acquire(self, amount: float = 1) -> Seconds:
+        """blocks until 'amount' tokens are available
+
+        Returns:
+            Seconds: how long the caller has waited
+        """
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, amount: float = 1) -> Seconds:
+        """like acquire but awaits instead of blocking the event loop
+
+        Returns:
+            Seconds: how long the caller has waited
+        """
+        wait = self._reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class QuotaScheduler:
+    """Spaces out requests according to a RateLimit per EndpointClass.
+    A single instance may be shared between threads and event loops.
+
+    Args:
+        limits (Optional[dict[EndpointClass, Optional[RateLimit]]], optional): overrides for DEFAULT_RATE_LIMITS.
+            Mapping a class to None removes its limit. Defaults to None.
+    """
+
+    def __init__(self, limits: Optional[t_dict[EndpointClass, Optional[RateLimit]]] = None) -> None:
+        merged: t_dict[EndpointClass, Optional[RateLimit]] = dict(DEFAULT_RATE_LIMITS)
+        if limits:
+            merged.update(limits)
+        self._buckets: t_dict[EndpointClass, TokenBucket] = {
+            endpoint_class: TokenBucket(limit) for endpoint_class, limit in merged.items() if limit is not None
+        }
+
+    @staticmethod
+    def classify(req_type: RequestType, endpoint: str) -> EndpointClass:
+        """returns the EndpointClass whose quota a request is counted against
+
+        Args:
+            req_type (RequestType): the type of the request
+            endpoint (str): the url of the request
+
+        Returns:
+            EndpointClass: the matching class
+        """
+        if endpoint.startswith(UPLOAD_MEDIA_ITEM_ENDPOINT):
+            return EndpointClass.UPLOAD
+        if endpoint.startswith(MEDIA_ITEMS_CREATE_ENDPOINT):
+            return EndpointClass.BATCH_CREATE
+        if req_type == RequestType.GET and not endpoint.startswith(LIBRARY_API_ENDPOINT):
+            # the bytes of media items, from their baseUrls
+            return EndpointClass.DOWNLOAD
+        if req_type == RequestType.GET or endpoint.startswith(MEDIA_ITEMS_SEARCH_ENDPOINT):
+            return EndpointClass.READ
+        if endpoint.startswith(ALBUMS_ENDPOINT):
+            return EndpointClass.ALBUM_MUTATION
+        return EndpointClass.OTHER
+
+    def acquire(self, endpoint_class: EndpointClass) -> Seconds:
+        """blocks until a request of 'endpoint_class' may be sent
+
+        Returns:
+            Seconds: how long the caller has waited
+        """
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is None:
+            return 0
+        return bucket.acquire()
+
+    async def acquire_async(self, endpoint_class: EndpointClass) -> Seconds:
+        """like acquire but awaits instead of blocking the event loop
+
+        Returns:
+            Seconds: how long the caller has waited
+        """
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is None:
+            return 0
+        return await bucket.acquire_async()
+
+
+__all__ = [
+    "RateLimit",
+    "TokenBucket",
+    "QuotaScheduler",
+    "DEFAULT_RATE_LIMITS"
+]
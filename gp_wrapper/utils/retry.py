@@ -0,0 +1,186 @@
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Callable, FrozenSet
+from requests import Response, RequestException, ConnectionError as RequestsConnectionError, Timeout
+from .structures import RequestType, Seconds, Printable
+from .structures import UPLOAD_MEDIA_ITEM_ENDPOINT, MEDIA_ITEMS_SEARCH_ENDPOINT
+
+RETRYABLE_STATUS_CODES: FrozenSet[int] = frozenset({408, 429, 500, 502, 503, 504})
+TOO_MANY_REQUESTS: int = 429
+
+
+class RetryEvent(Printable):
+    """Information about a single retry which is passed to RetryPolicy.on_retry
+
+    Args:
+        req_type (RequestType): the type of the request
+        endpoint (str): the url of the request
+        attempt (int): the number of the attempt that has failed, starting at 1
+        delay (Seconds): how long the request will wait before the next attempt
+        status_code (Optional[int]): the status of the failed attempt if a response was received
+        exception (Optional[Exception]): the exception of the failed attempt if no response was received
+        total_delay (Seconds): the total time this request has spent backing off, including 'delay'
+    """
+
+    def __init__(self, req_type: RequestType, endpoint: str, attempt: int, delay: Seconds,
+                 status_code: Optional[int] = None, exception: Optional[Exception] = None,
+                 total_delay: Seconds = 0) -> None:
+        self.req_type = req_type
+        self.endpoint = endpoint
+        self.attempt = attempt
+        self.delay = delay
+        self.status_code = status_code
+        self.exception = exception
+        self.total_delay = total_delay
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request should be sent again.
+    429 responses are always retried as the request was not processed.
+    Server errors and connection failures are only retried for idempotent requests.
+
+    Args:
+        max_attempts (int, optional): maximum amount of attempts per request, including the first. Defaults to 5.
+        base_delay (Seconds, optional): the delay before the first retry, doubled on each attempt. Defaults to 1.
+        max_delay (Seconds, optional): maximum delay between two attempts. Defaults to 60.
+        jitter (bool, optional): whether to use full jitter, a random delay between 0 and the backoff.
+            Defaults to True.
+        respect_retry_after (bool, optional): whether to wait as instructed by a Retry-After header,
+            up to 'max_delay'. Defaults to True.
+        on_retry (Optional[Callable[[RetryEvent], None]], optional): called before each retry. Defaults to None.
+        max_total_delay (Optional[Seconds], optional): maximum time a single request may spend backing off,
+            it is given up instead of waiting longer. Defaults to None which is no limit.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: Seconds = 1,
+        max_delay: Seconds = 60,
+        jitter: bool = True,
+        respect_retry_after: bool = True,
+        on_retry: Optional[Callable[[RetryEvent], None]] = None,
+        max_total_delay: Optional[Seconds] = None
+    ) -> None:
+        if not (0 < max_attempts):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_attempts' should be a positive integer")
+        if base_delay < 0 or max_delay < base_delay:
+            raise ValueError("must satisfy 0 <= 'base_delay' <= 'max_delay'")
+        if max_total_delay is not None and max_total_delay < 0:
+            raise ValueError("'max_total_delay' should be a non-negative number")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.max_total_delay = max_total_delay
+        self.on_retry = on_retry
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_idempotent(req_type: RequestType, endpoint: str) -> bool:
+        """whether sending the same request twice has the same effect as sending it once
+
+        Args:
+            req_type (RequestType): the type of the request
+            endpoint (str): the url of the request
+
+        Returns:
+            bool: the answer
+        """
+        if req_type in {RequestType.GET, RequestType.PATCH}:
+            return True
+        # an upload only returns a new token, nothing is added to the library
+        return endpoint.startswith(UPLOAD_MEDIA_ITEM_ENDPOINT) or endpoint.startswith(MEDIA_ITEMS_SEARCH_ENDPOINT)
+
+    def _retry_after(self, response: Optional[Response]) -> Optional[Seconds]:
+        if not self.respect_retry_after or response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    def backoff(self, attempt: int, response: Optional[Response] = None) -> Seconds:
+        """calculates how long to wait after the failed attempt number 'attempt'
+
+        Args:
+            attempt (int): the number of the failed attempt, starting at 1
+            response (Optional[Response], optional): the response of the failed attempt. Defaults to None.
+
+        Returns:
+            Seconds: the delay
+        """
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            # a worker thread is blocked for the whole delay, so the server doesn't get to choose it freely
+            return min(self.max_delay, retry_after)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        if self.jitter:
+            with self._lock:
+                delay = self._random.uniform(0, delay)
+        return delay
+
+    def should_retry(self, req_type: RequestType, endpoint: str, attempt: int,
+                     response: Optional[Response] = None, exception: Optional[Exception] = None) -> bool:
+        """whether the failed attempt number 'attempt' should be followed by another one
+
+        Returns:
+            bool: the answer
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if exception is not None:
+            if not isinstance(exception, (RequestsConnectionError, Timeout)):
+                return False
+            return self.is_idempotent(req_type, endpoint)
+        if response is None or response.status_code not in RETRYABLE_STATUS_CODES:
+            return False
+        if response.status_code == TOO_MANY_REQUESTS:
+            return True
+        return self.is_idempotent(req_type, endpoint)
+
+    def next_delay(self, req_type: RequestType, endpoint: str, attempt: int,
+                   response: Optional[Response] = None, exception: Optional[RequestException] = None,
+                   total_delay: Seconds = 0) -> Optional[Seconds]:
+        """combines should_retry and backoff and reports the retry to 'on_retry'
+
+        Returns:
+            Optional[Seconds]: how long to wait before the next attempt or None if there should not be one
+        """
+        if not self.should_retry(req_type, endpoint, attempt, response, exception):
+            return None
+        delay = self.backoff(attempt, response)
+        if self.max_total_delay is not None and total_delay + delay > self.max_total_delay:
+            return None
+        if self.on_retry is not None:
+            self.on_retry(RetryEvent(
+                req_type,
+                endpoint,
+                attempt,
+                delay,
+                status_code=response.status_code if response is not None else None,
+                exception=exception,
+                total_delay=total_delay + delay
+            ))
+        return delay
+
+
+__all__ = [
+    "RetryEvent",
+    "RetryPolicy",
+    "RETRYABLE_STATUS_CODES"
+]
@@ -18,6 +18,19 @@ Path = str
 NextPageToken = str
 Value = str
 
+# see https://github.com/googleapis/googleapis/blob/master/google/rpc/code.proto
+_HTTP_STATUS_CODES = {
+    400: StatusCode.INVALID_ARGUMENT,
+    401: StatusCode.UNAUTHENTICATED,
+    403: StatusCode.PERMISSION_DENIED,
+    404: StatusCode.NOT_FOUND,
+    409: StatusCode.ABORTED,
+    429: StatusCode.RESOURCE_EXHAUSTED,
+    501: StatusCode.UNIMPLEMENTED,
+    503: StatusCode.UNAVAILABLE,
+    504: StatusCode.DEADLINE_EXCEEDED,
+}
+
 
 class SimpleMediaItem(Dictable, Printable):
     """A simple media item to be created in Google Photos via an upload token.
@@ -183,6 +196,20 @@ class Status(Dictable, Printable):
             details=dct["details"] if "details" in dct else None
         )
 
+    @staticmethod
+    def from_exception(exception: BaseException) -> "Status":
+        """creates a Status describing a failed request, its code is derived from the HTTP status of the response
+        """
+        response = getattr(exception, "response", None)
+        http_status = getattr(response, "status_code", None)
+        if http_status in _HTTP_STATUS_CODES:
+            code = _HTTP_STATUS_CODES[http_status]
+        elif http_status is not None and 500 <= http_status:
+            code = StatusCode.INTERNAL
+        else:
+            code = StatusCode.UNKNOWN
+        return Status(str(exception), code)
+
     def __init__(self, message: str, code: Optional[StatusCode] = None, details: Optional[t_list[dict]] = None) -> None:
         self.__message = message
         self.__code = code
@@ -388,6 +415,8 @@ SCOPES = [
 ]
 EMPTY_PROMPT_MESSAGE = ""
 DEFAULT_NUM_WORKERS: int = 2
+LIBRARY_API_ENDPOINT = "https://photoslibrary.googleapis.com/"
 ALBUMS_ENDPOINT = "https://photoslibrary.googleapis.com/v1/albums"
 UPLOAD_MEDIA_ITEM_ENDPOINT = "https://photoslibrary.googleapis.com/v1/uploads"
 MEDIA_ITEMS_CREATE_ENDPOINT = "https://photoslibrary.googleapis.com/v1/mediaItems:batchCreate"
+MEDIA_ITEMS_SEARCH_ENDPOINT = "https://photoslibrary.googleapis.com/v1/mediaItems:search"
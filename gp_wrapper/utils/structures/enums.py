@@ -17,13 +17,45 @@ class HeaderType(Enum):
     OCTET = "octet-stream"
 
 
+class EndpointClass(Enum):
+    """An inner use Enum to group API endpoints which share the same quota
+    """
+    UPLOAD = "upload"
+    BATCH_CREATE = "batchCreate"
+    READ = "read"
+    ALBUM_MUTATION = "albumMutation"
+    DOWNLOAD = "download"
+    OTHER = "other"
+
+
 class MimeType(Enum):
     """An enum to specify the supported mime-types"""
     PNG = "image/png"
     JPEG = "image/jpeg"
     MP4 = "video/mp4"
     MOV = "video/quicktime"
-    WMV = "x-ms-asf"
+    WMV = "video/x-ms-wmv"
+
+
+class VideoPolicy(Enum):
+    """Enum to specify how CoreMediaItem.upload_media prepares a video before uploading it.
+    AUTO uploads accepted formats as they are, remuxes the rest to mp4 and re-encodes only if remuxing fails.
+    PASSTHROUGH always uploads the file as it is, REMUX always copies the streams into an mp4 container
+    without re-encoding and TRANSCODE always re-encodes to mp4
+    """
+    AUTO = "auto"
+    PASSTHROUGH = "passthrough"
+    REMUX = "remux"
+    TRANSCODE = "transcode"
+
+
+class CropMode(Enum):
+    """Enum to specify how a thumbnail is fitted into the requested size.
+    FIT scales the media item to fit within the size keeping its aspect ratio,
+    CROP scales and crops it to exactly the size
+    """
+    FIT = "fit"
+    CROP = "crop"
 
 
 class PositionType(Enum):
@@ -0,0 +1,251 @@
+import os
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Callable, Iterable
+from .helpers import get_python_version
+from .structures import CropMode, Path
+from .pbar import MB, GB
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple, Dict as t_dict, List as t_list  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple, dict as t_dict, list as t_list  # type:ignore
+
+DEFAULT_THUMBNAIL_CACHE_DIRECTORY: str = os.path.join(os.path.expanduser("~"), ".cache", "gp_wrapper", "thumbnails")
+DEFAULT_THUMBNAIL_CACHE_SIZE: int = 1 * GB
+DEFAULT_THUMBNAIL_MEMORY_SIZE: int = 64 * MB
+# an eviction trims the store to this share of its maximum size so the next few additions don't evict again
+THUMBNAIL_EVICTION_TARGET: float = 0.9
+
+
+class ThumbnailStore:
+    """A directory of thumbnails named after the hash of their media item, size and crop mode,
+    with an optional in-memory tier in front of it for the most recently used ones.
+    the least recently used thumbnails are deleted once the directory grows beyond 'max_size'.
+    the modification time of a thumbnail is its last use, so the directory may be shared between processes
+
+    Args:
+        directory (str, optional): where to keep the thumbnails. Defaults to DEFAULT_THUMBNAIL_CACHE_DIRECTORY.
+        max_size (int, optional): maximum total size of the thumbnails on disk in bytes.
+            Defaults to DEFAULT_THUMBNAIL_CACHE_SIZE.
+        memory_size (int, optional): maximum total size of the thumbnails kept in memory in bytes, 0 disables it.
+            Defaults to 0.
+    """
+    _default: Optional["ThumbnailStore"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, directory: str = DEFAULT_THUMBNAIL_CACHE_DIRECTORY,
+                 max_size: int = DEFAULT_THUMBNAIL_CACHE_SIZE, memory_size: int = 0) -> None:
+        if not (0 < max_size):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_size' should be a positive integer")
+        if not (0 <= memory_size):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'memory_size' should be a non-negative integer")
+        self.directory = directory
+        self.max_size = max_size
+        self.memory_size = memory_size
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # the size on disk, counted once and then kept up to date by this object
+        self._size: Optional[int] = None
+        self._memory: OrderedDict = OrderedDict()
+        self._memory_used = 0
+        self._running: t_dict[str, Future] = {}
+
+    @staticmethod
+    def default() -> "ThumbnailStore":
+        """returns a ThumbnailStore shared by everything which was not given one,
+        with an in-memory tier of DEFAULT_THUMBNAIL_MEMORY_SIZE
+        """
+        with ThumbnailStore._default_lock:
+            if ThumbnailStore._default is None:
+                ThumbnailStore._default = ThumbnailStore(memory_size=DEFAULT_THUMBNAIL_MEMORY_SIZE)
+            return ThumbnailStore._default
+
+    @staticmethod
+    def key(mediaItemId: str, width: int, height: int, crop: CropMode = CropMode.FIT) -> str:
+        """the name of the thumbnail of a media item in a given size
+        """
+        return hashlib.sha256(f"{mediaItemId}:{width}x{height}:{crop.value}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        """where the thumbnail with 'key' is kept
+        """
+        return os.path.join(self.directory, key[:2], f"{key}.jpg")
+
+    def lookup(self, key: str) -> Optional[str]:
+        """returns the path of the thumbnail with 'key' if it exists and marks it as recently used
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def read(self, key: str) -> Optional[bytes]:
+        """returns the thumbnail with 'key' if it exists, from memory if possible
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            return None
+        self._remember(key, data)
+        return data
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_size:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_used -= len(previous)
+            self._memory[key] = data
+            self._memory_used += len(data)
+            while self._memory_used > self.memory_size:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+
+    def put(self, key: str, data: bytes) -> str:
+        """stores the thumbnail with 'key', replacing it atomically if it exists
+
+        Returns:
+            str: its path
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # a hidden name which is not counted as a thumbnail until it is complete
+        temporary = os.path.join(os.path.dirname(path), f".{key}.{uuid.uuid4().hex}.tmp")
+        with open(temporary, "wb") as f:
+            f.write(data)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temporary, path)
+        self._remember(key, data)
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - previous
+            over = self._size is None or self._size > self.max_size
+        if over:
+            self.evict(keep=[path])
+        return path
+
+    def get_or_fill(self, key: str, fill: Callable[[], bytes]) -> str:
+        """returns the path of the thumbnail with 'key', storing the result of 'fill' first if it is missing.
+        callers asking for the same missing key at the same time wait for a single call of 'fill'
+
+        Raises:
+            Exception: whatever 'fill' has raised
+
+        Returns:
+            str: its path
+        """
+        path = self.lookup(key)
+        if path is not None:
+            return path
+        with self._lock:
+            running = self._running.get(key)
+            leader = running is None
+            if leader:
+                running = Future()
+                self._running[key] = running
+        if not leader:
+            return running.result()  # type:ignore
+        try:
+            # another leader may have finished between the lookup and taking the lock
+            path = self.path(key)
+            if not os.path.exists(path):
+                path = self.put(key, fill())
+        except BaseException as e:
+            running.set_exception(e)  # type:ignore
+            raise
+        else:
+            running.set_result(path)  # type:ignore
+        finally:
+            with self._lock:
+                del self._running[key]
+        return path
+
+    def _entries(self) -> t_list[t_tuple[float, int, str]]:
+        entries = []
+        for directory, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".jpg") or name.startswith("."):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """the total size of the thumbnails on disk in bytes
+        """
+        size = sum(size for _, size, _ in self._entries())
+        with self._lock:
+            self._size = size
+        return size
+
+    def evict(self, keep: Iterable[Path] = ()) -> int:
+        """deletes the least recently used thumbnails from disk
+        until the store fits in THUMBNAIL_EVICTION_TARGET of 'max_size'
+
+        Args:
+            keep (Iterable[Path], optional): paths which must not be deleted. Defaults to ().
+
+        Returns:
+            int: how many bytes were freed
+        """
+        keep = {os.path.abspath(path) for path in keep}  # type:ignore
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        if total > self.max_size:
+            for _, size, path in entries:
+                if total - freed <= self.max_size * THUMBNAIL_EVICTION_TARGET:
+                    break
+                if os.path.abspath(path) in keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                freed += size
+        with self._lock:
+            self._size = total - freed
+        return freed
+
+    def clear_memory(self) -> None:
+        """empties the in-memory tier
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+
+
+__all__ = [
+    "ThumbnailStore",
+    "DEFAULT_THUMBNAIL_CACHE_DIRECTORY",
+    "DEFAULT_THUMBNAIL_CACHE_SIZE",
+    "DEFAULT_THUMBNAIL_MEMORY_SIZE",
+    "THUMBNAIL_EVICTION_TARGET"
+]
@@ -0,0 +1,114 @@
+import os
+import json
+import tempfile
+import threading
+from typing import Optional
+from abc import ABC, abstractmethod
+from google.oauth2.credentials import Credentials  # type:ignore
+from .structures import SCOPES
+
+DEFAULT_TOKEN_PATH = "./token.json"
+
+
+def credentials_from_info(info: dict) -> Credentials:
+    """creates Credentials from the output of Credentials.to_json.
+    unlike Credentials.from_authorized_user_info the saved 'token_uri' is kept
+
+    Args:
+        info (dict): the parsed json
+
+    Raises:
+        ValueError: if 'info' is missing required fields
+
+    Returns:
+        Credentials: the resulting credentials
+    """
+    credentials = Credentials.from_authorized_user_info(info, SCOPES)  # type:ignore
+    if info.get("token_uri"):
+        # 'with_token_uri' does not carry over the expiry
+        expiry = credentials.expiry
+        credentials = credentials.with_token_uri(info["token_uri"])
+        credentials.expiry = expiry
+    return credentials
+
+
+class TokenStore(ABC):
+    """An interface for a place to persist OAuth credentials between runs
+    """
+
+    @abstractmethod
+    def load(self) -> Optional[Credentials]:
+        """A function to load previously saved credentials
+
+        Returns:
+            Optional[Credentials]: the credentials or None if none were saved
+        """
+
+    @abstractmethod
+    def save(self, credentials: Credentials) -> None:
+        """A function to save credentials so that a later 'load' will return them
+        """
+
+
+class FileTokenStore(TokenStore):
+    """Stores credentials as a json file readable only by the current user.
+    The file is replaced atomically so concurrent workers never read a partial file
+
+    Args:
+        path (str, optional): the path of the file. Defaults to DEFAULT_TOKEN_PATH.
+    """
+
+    def __init__(self, path: str = DEFAULT_TOKEN_PATH) -> None:
+        self.path = path
+
+    def load(self) -> Optional[Credentials]:
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                info = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        try:
+            return credentials_from_info(info)
+        except ValueError:
+            return None
+
+    def save(self, credentials: Credentials) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                f.write(credentials.to_json())  # type:ignore
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class MemoryTokenStore(TokenStore):
+    """Keeps credentials in memory only.
+    Useful to share credentials between several GooglePhotos objects of the same process
+    """
+
+    def __init__(self) -> None:
+        self._info: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Credentials]:
+        with self._lock:
+            if self._info is None:
+                return None
+            return credentials_from_info(json.loads(self._info))
+
+    def save(self, credentials: Credentials) -> None:
+        with self._lock:
+            self._info = credentials.to_json()  # type:ignore
+
+
+__all__ = [
+    "TokenStore",
+    "FileTokenStore",
+    "MemoryTokenStore",
+    "credentials_from_info",
+    "DEFAULT_TOKEN_PATH"
+]
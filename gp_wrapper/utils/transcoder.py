@@ -0,0 +1,257 @@
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Iterable, Iterator
+from .helpers import get_python_version, file_hash
+from .structures import VideoPolicy, MimeType, Path
+from .pbar import GB
+from .video import TRANSCODE_SETTINGS, needs_conversion, mime_type, prepare_video
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple, Dict as t_dict, List as t_list  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple, dict as t_dict, list as t_list  # type:ignore
+
+DEFAULT_TRANSCODE_CACHE_DIRECTORY: str = os.path.join(os.path.expanduser("~"), ".cache", "gp_wrapper", "videos")
+DEFAULT_TRANSCODE_CACHE_SIZE: int = 10 * GB
+
+
+class TranscodeCache:
+    """A directory of converted videos named after the hash of their source and the conversion settings,
+    so a clip is never converted twice and two different clips never share an output.
+    the least recently used outputs are deleted once the directory grows beyond 'max_size'.
+    the modification time of an output is its last use, so the cache may be shared between processes
+
+    Args:
+        directory (str, optional): where to keep the outputs. Defaults to DEFAULT_TRANSCODE_CACHE_DIRECTORY.
+        max_size (int, optional): maximum total size of the outputs in bytes. Defaults to DEFAULT_TRANSCODE_CACHE_SIZE.
+    """
+
+    def __init__(self, directory: str = DEFAULT_TRANSCODE_CACHE_DIRECTORY,
+                 max_size: int = DEFAULT_TRANSCODE_CACHE_SIZE) -> None:
+        if not (0 < max_size):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'max_size' should be a positive integer")
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(digest: str, policy: VideoPolicy) -> str:
+        """the name of the output of converting contents with the hex digest 'digest' under 'policy'
+        """
+        return hashlib.sha256(f"{digest}:{policy.value}:{TRANSCODE_SETTINGS}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        """where the output with 'key' is kept
+        """
+        return os.path.join(self.directory, key[:2], f"{key}.mp4")
+
+    def lookup(self, key: str) -> Optional[str]:
+        """returns the output with 'key' if it exists and marks it as recently used
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _entries(self) -> t_list[t_tuple[float, int, str]]:
+        entries = []
+        for directory, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".mp4") or name.startswith("."):
+                    # conversions which are still being written
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """the total size of the outputs in bytes
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep: Iterable[str] = ()) -> int:
+        """deletes the least recently used outputs until the cache fits in 'max_size'
+
+        Args:
+            keep (Iterable[str], optional): paths which must not be deleted, i.e because they are in use.
+                Defaults to ().
+
+        Returns:
+            int: how many bytes were freed
+        """
+        keep = {os.path.abspath(path) for path in keep}
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            freed = 0
+            for _, size, path in entries:
+                if total - freed <= self.max_size:
+                    break
+                if os.path.abspath(path) in keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                freed += size
+            return freed
+
+
+def _convert(source: Path, policy: str, destination: str) -> str:
+    # runs in a worker process
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    prepare_video(source, VideoPolicy(policy), destination)
+    # the modification time marks the last use of an output
+    os.utime(destination)
+    return destination
+
+
+class Transcoder:
+    """Converts videos on a pool of processes into a TranscodeCache.
+    converting the same clip twice at the same time is only done once.
+    the pool is only started once the first conversion is needed
+
+    Args:
+        cache (Optional[TranscodeCache], optional): where to keep the outputs.
+            Defaults to None which is a TranscodeCache with the default settings.
+        max_workers (Optional[int], optional): the amount of processes. Defaults to None which is the amount of CPUs.
+    """
+    _default: Optional["Transcoder"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, cache: Optional[TranscodeCache] = None, max_workers: Optional[int] = None) -> None:
+        self.cache = cache if cache is not None else TranscodeCache()
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # reentrant as a done callback runs on the calling thread if the future has already finished
+        self._lock = threading.RLock()
+        self._running: t_dict[str, Future] = {}
+        self._in_use: t_dict[str, int] = {}
+
+    @staticmethod
+    def default() -> "Transcoder":
+        """returns a Transcoder shared by everything which was not given one
+        """
+        with Transcoder._default_lock:
+            if Transcoder._default is None:
+                Transcoder._default = Transcoder()
+            return Transcoder._default
+
+    def submit(self, source: Path, policy: VideoPolicy = VideoPolicy.AUTO,
+               digest: Optional[str] = None) -> "Future[t_tuple[Path, str]]":
+        """starts preparing a video for upload, see prepare_video
+
+        Args:
+            source (Path): the path of the video
+            policy (VideoPolicy, optional): how to treat the video. Defaults to VideoPolicy.AUTO.
+            digest (Optional[str], optional): the file_hash of 'source' if it is already known. Defaults to None.
+
+        Returns:
+            Future[tuple[Path, str]]: the path to upload and its mime type
+        """
+        return self._submit(source, policy, digest, False)[0]
+
+    def hold(self, source: Path, policy: VideoPolicy = VideoPolicy.AUTO,
+             digest: Optional[str] = None) -> t_tuple["Future[t_tuple[Path, str]]", Optional[str]]:
+        """like submit but also keeps the output from being evicted until it is passed to release
+
+        Returns:
+            tuple[Future[tuple[Path, str]], Optional[str]]: the future of submit
+                and the output to release, None if the video is not converted
+        """
+        return self._submit(source, policy, digest, True)
+
+    def _submit(self, source: Path, policy: VideoPolicy, digest: Optional[str],
+                hold: bool) -> t_tuple["Future[t_tuple[Path, str]]", Optional[str]]:
+        # with 'hold' the output is kept from being evicted from the moment it is resolved,
+        # the caller releases the returned path with release
+        result: "Future[t_tuple[Path, str]]" = Future()
+        if not needs_conversion(source, policy):
+            result.set_result((source, mime_type(source) or "application/octet-stream"))
+            return result, None
+        key = TranscodeCache.key(digest if digest is not None else file_hash(source), policy)
+        held: Optional[str] = None
+        with self._lock:
+            if hold:
+                held = self.cache.path(key)
+                self._in_use[held] = self._in_use.get(held, 0) + 1
+            cached = self.cache.lookup(key)
+            if cached is not None:
+                result.set_result((cached, MimeType.MP4.value))
+                return result, held
+            running = self._running.get(key)
+            if running is None:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.max_workers)
+                running = self._executor.submit(_convert, source, policy.value, self.cache.path(key))
+                self._running[key] = running
+                running.add_done_callback(lambda _: self._done(key))
+
+        def chain(future: Future) -> None:
+            exception = future.exception()
+            if exception is not None:
+                result.set_exception(exception)
+            else:
+                result.set_result((future.result(), MimeType.MP4.value))
+        running.add_done_callback(chain)
+        return result, held
+
+    def _done(self, key: str) -> None:
+        with self._lock:
+            self._running.pop(key, None)
+
+    def release(self, path: str) -> None:
+        """allows an output of hold to be evicted again and trims the cache back to its maximum size
+        """
+        with self._lock:
+            self._in_use[path] -= 1
+            if self._in_use[path] == 0:
+                del self._in_use[path]
+            keep = [*self._in_use, *map(self.cache.path, self._running)]
+        self.cache.evict(keep)
+
+    @contextmanager
+    def prepared(self, source: Path, policy: VideoPolicy = VideoPolicy.AUTO,
+                 digest: Optional[str] = None) -> Iterator[t_tuple[Path, str]]:
+        """waits for submit and keeps the output from being evicted until the block is left,
+        after which the cache is trimmed back to its maximum size
+
+        Yields:
+            Iterator[tuple[Path, str]]: the path to upload and its mime type
+        """
+        future, held = self.hold(source, policy, digest)
+        try:
+            yield future.result()
+        finally:
+            if held is not None:
+                self.release(held)
+
+    def close(self) -> None:
+        """shuts down the pool of processes after the running conversions have finished
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self) -> "Transcoder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+__all__ = [
+    "TranscodeCache",
+    "Transcoder",
+    "DEFAULT_TRANSCODE_CACHE_DIRECTORY",
+    "DEFAULT_TRANSCODE_CACHE_SIZE"
+]
@@ -0,0 +1,98 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Callable, Hashable, Any, Iterable
+from .structures import Seconds, Printable
+
+# a baseUrl of a media item is valid for about an hour
+BASE_URL_LIFETIME: Seconds = 60 * 60
+# entries expire before the baseUrls they hold, leaving time to use them
+DEFAULT_CACHE_TTL: Seconds = BASE_URL_LIFETIME - 10 * 60
+DEFAULT_CACHE_SIZE: int = 10_000
+
+
+class TTLCache(Printable):
+    """A thread-safe cache which holds at most 'maxsize' entries, each for at most 'ttl' seconds.
+    when full, the least recently used entry is evicted
+
+    Args:
+        maxsize (int, optional): the maximal amount of entries, 0 disables the cache. Defaults to DEFAULT_CACHE_SIZE.
+        ttl (Seconds, optional): how long an entry is valid after it was put. Defaults to DEFAULT_CACHE_TTL.
+        clock (Callable[[], Seconds], optional): the time source. Defaults to time.monotonic.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: Seconds = DEFAULT_CACHE_TTL,
+                 clock: Callable[[], Seconds] = time.monotonic) -> None:
+        if not (0 <= maxsize):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'maxsize' should be a non-negative integer")
+        if not (0 < ttl):  # pylint: disable=unneeded-not,superfluous-parens
+            raise ValueError("'ttl' should be a positive number")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry, value), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """returns the value of 'key', or 'default' if it is missing or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.clock() < entry[0]:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[Seconds] = None) -> None:
+        """stores 'value' under 'key' for 'ttl' seconds, which defaults to the ttl of the cache
+        """
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + (ttl if ttl is not None else self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        """removes the entries of 'keys' if they exist
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """removes all entries, the statistics are kept
+        """
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """the share of lookups which were hits, 0 if there were none
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self.clock() < entry[0]
+
+
+__all__ = [
+    "TTLCache",
+    "BASE_URL_LIFETIME",
+    "DEFAULT_CACHE_TTL",
+    "DEFAULT_CACHE_SIZE"
+]
@@ -0,0 +1,206 @@
+import os
+import time
+import sqlite3
+import threading
+from enum import Enum
+from typing import Optional, Iterable, Iterator
+from .helpers import get_python_version
+from .structures import Path, UploadToken, MediaItemID, Seconds, Printable
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple  # type:ignore
+
+# upload tokens are valid for a day, a margin is kept for the time it takes to create the item
+UPLOAD_TOKEN_LIFETIME: Seconds = 23 * 60 * 60
+
+
+class JournalStatus(Enum):
+    """The states of a file in an UploadJournal
+    """
+    UPLOADED = "uploaded"
+    CREATED = "created"
+
+
+class JournalEntry(Printable):
+    """A single file recorded in an UploadJournal
+
+    Args:
+        path (Path): the path of the file
+        size (int): the size of the file when it was recorded
+        mtime (float): the modification time of the file when it was recorded
+        hash (Optional[str]): the sha256 of the contents of the file
+        uploadToken (Optional[UploadToken]): the token returned by the upload
+        token_time (Optional[float]): when the token was received, as returned by time.time
+        mediaItemId (Optional[MediaItemID]): the id of the created media item
+        status (JournalStatus): the state of the file
+    """
+
+    def __init__(self, path: Path, size: int, mtime: float, hash: Optional[str],  # pylint: disable=redefined-builtin
+                 uploadToken: Optional[UploadToken], token_time: Optional[float],
+                 mediaItemId: Optional[MediaItemID], status: JournalStatus) -> None:
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.hash = hash
+        self.uploadToken = uploadToken
+        self.token_time = token_time
+        self.mediaItemId = mediaItemId
+        self.status = status
+
+    @property
+    def is_created(self) -> bool:
+        """whether the media item of this file was already created
+        """
+        return self.status == JournalStatus.CREATED and self.mediaItemId is not None
+
+    def token_is_live(self, lifetime: Seconds = UPLOAD_TOKEN_LIFETIME) -> bool:
+        """whether the upload token of this file may still be used to create a media item
+        """
+        if self.uploadToken is None or self.token_time is None:
+            return False
+        return time.time() - self.token_time < lifetime
+
+
+class UploadJournal:
+    """An SQLite journal of the files uploaded by an UploadPipeline.
+    every upload and every created media item is committed as soon as it happens,
+    so a job which was interrupted can be run again and only do the work which is really missing.
+    a file is identified by its path and is considered changed if its size or modification time differ.
+    may be shared between threads
+
+    Args:
+        path (str): the path of the database file. ':memory:' keeps the journal in memory only
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, hash TEXT, "
+            "upload_token TEXT, token_time REAL, media_item_id TEXT, status TEXT NOT NULL)"
+        )
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return os.path.abspath(path)
+
+    @staticmethod
+    def stat(path: Path) -> t_tuple[int, float]:
+        """returns the size and the modification time which identify the current version of a file
+        """
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+
+    def get(self, path: Path) -> Optional[JournalEntry]:
+        """returns the entry of a file as it was recorded, even if the file has changed since
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT path, size, mtime, hash, upload_token, token_time, media_item_id, status "
+                "FROM files WHERE path = ?",
+                (self._key(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        return JournalEntry(row[0], row[1], row[2], row[3], row[4], row[5], row[6], JournalStatus(row[7]))
+
+    def lookup(self, path: Path) -> Optional[JournalEntry]:
+        """returns the entry of a file only if the file has not changed since it was recorded
+
+        Args:
+            path (Path): the path of the file
+
+        Returns:
+            Optional[JournalEntry]: the entry or None
+        """
+        entry = self.get(path)
+        if entry is None:
+            return None
+        try:
+            size, mtime = self.stat(path)
+        except OSError:
+            return None
+        if (size, mtime) != (entry.size, entry.mtime):
+            return None
+        return entry
+
+    def record_upload(self, path: Path, size: int, mtime: float, hash: Optional[str],  # pylint: disable=redefined-builtin
+                      uploadToken: UploadToken) -> None:
+        """records that a file was uploaded and has not been created yet
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, size, mtime, hash, upload_token, token_time, media_item_id, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                (self._key(path), size, mtime, hash, uploadToken, time.time(), JournalStatus.UPLOADED.value)
+            )
+
+    def record_created(self, created: Iterable[t_tuple[Path, MediaItemID]]) -> None:
+        """records that the media items of files were created, in a single transaction
+
+        Args:
+            created (Iterable[tuple[Path, MediaItemID]]): the paths and the ids of their media items
+        """
+        rows = [(mediaItemId, JournalStatus.CREATED.value, self._key(path)) for path, mediaItemId in created]
+        if not rows:
+            return
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "UPDATE files SET media_item_id = ?, status = ?, upload_token = NULL WHERE path = ?", rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def created_hashes(self) -> Iterator[t_tuple[str, MediaItemID]]:
+        """yields the hash and the media item id of every created file which has a known hash
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT hash, media_item_id FROM files WHERE status = ? AND hash IS NOT NULL",
+                (JournalStatus.CREATED.value,)
+            ).fetchall()
+        yield from rows
+
+    def forget_token(self, path: Path) -> None:
+        """drops the upload token of a file, i.e after it was rejected, so that the file is uploaded again
+        """
+        with self._lock:
+            self._connection.execute(
+                "UPDATE files SET upload_token = NULL, token_time = NULL WHERE path = ? AND status = ?",
+                (self._key(path), JournalStatus.UPLOADED.value)
+            )
+
+    def forget(self, path: Path) -> None:
+        """drops everything recorded about a file, i.e after its media item was deleted, so that it is uploaded again
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM files WHERE path = ?", (self._key(path),))
+
+    def close(self) -> None:
+        """closes the database
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "UploadJournal":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+__all__ = [
+    "UploadJournal",
+    "JournalEntry",
+    "JournalStatus",
+    "UPLOAD_TOKEN_LIFETIME"
+]
@@ -0,0 +1,187 @@
+import os
+import shutil
+import pathlib
+import mimetypes
+import threading
+import subprocess
+from typing import Optional
+from .helpers import get_python_version
+from .structures import MimeType, VideoPolicy, Path
+from .win32_ctime import copy_file_time
+if get_python_version() < (3, 9):
+    from typing import Tuple as t_tuple, Dict as t_dict  # pylint: disable=ungrouped-imports,redefined-builtin
+else:
+    from builtins import tuple as t_tuple, dict as t_dict  # type:ignore
+
+# the video containers Google Photos accepts as they are
+# see https://support.google.com/googleone/answer/6193313
+ACCEPTED_VIDEO_MIME_TYPES: t_dict[str, str] = {
+    ".mp4": MimeType.MP4.value,
+    ".mov": MimeType.MOV.value,
+    ".wmv": MimeType.WMV.value,
+    ".asf": "video/x-ms-asf",
+    ".avi": "video/x-msvideo",
+    ".mkv": "video/x-matroska",
+    ".m4v": "video/x-m4v",
+    ".3gp": "video/3gpp",
+    ".3g2": "video/3gpp2",
+    ".mpg": "video/mpeg",
+    ".mts": "video/mp2t",
+    ".m2ts": "video/mp2t",
+    ".m2t": "video/mp2t",
+}
+VIDEO_CODEC = "libx264"
+AUDIO_CODEC = "aac"
+# changes whenever the output of remux or transcode would change
+TRANSCODE_SETTINGS = f"mp4;{VIDEO_CODEC};{AUDIO_CODEC};faststart"
+# video containers which have to be converted before they are uploaded
+CONVERTIBLE_VIDEO_EXTENSIONS = frozenset({".webm", ".flv", ".ogv", ".f4v", ".ts", ".vob"})
+
+
+def is_video(path: Path) -> bool:
+    """whether 'path' is a video, judging by its extension
+    """
+    extension = pathlib.Path(path).suffix.lower()
+    return extension in ACCEPTED_VIDEO_MIME_TYPES or extension in CONVERTIBLE_VIDEO_EXTENSIONS
+
+
+def mime_type(path: Path) -> Optional[str]:
+    """returns the mime type to upload 'path' with, judging by its extension
+
+    Args:
+        path (Path): the path of the file
+
+    Returns:
+        Optional[str]: the mime type or None if it is unknown
+    """
+    extension = pathlib.Path(path).suffix.lower()
+    if extension in ACCEPTED_VIDEO_MIME_TYPES:
+        return ACCEPTED_VIDEO_MIME_TYPES[extension]
+    return mimetypes.guess_type(str(path))[0]
+
+
+def ffmpeg_executable() -> str:
+    """returns the path of an ffmpeg binary.
+    the one bundled with imageio-ffmpeg, which is installed with moviepy, is preferred
+
+    Raises:
+        FileNotFoundError: if no ffmpeg binary was found
+    """
+    try:
+        import imageio_ffmpeg  # type:ignore # pylint: disable=import-outside-toplevel
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        pass
+    executable = shutil.which("ffmpeg")
+    if executable is None:
+        raise FileNotFoundError("ffmpeg was not found. install imageio-ffmpeg or add ffmpeg to PATH")
+    return executable
+
+
+def remux(source: Path, destination: Path) -> None:
+    """copies the video and audio streams of 'source' into an mp4 container without re-encoding them
+
+    Raises:
+        FileNotFoundError: if ffmpeg was not found
+        subprocess.CalledProcessError: if the streams can't be stored in mp4 as they are
+    """
+    subprocess.run(
+        [
+            ffmpeg_executable(), "-v", "error", "-y", "-i", str(source),
+            "-map", "0:v", "-map", "0:a?", "-c", "copy", "-movflags", "+faststart", str(destination)
+        ],
+        check=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+
+def transcode(source: Path, destination: Path) -> None:
+    """re-encodes 'source' to an h264 mp4 using moviepy
+    """
+    # imported here as moviepy is slow to import and only needed for re-encoding
+    try:
+        from moviepy import VideoFileClip  # type:ignore # pylint: disable=import-outside-toplevel
+    except ImportError:
+        from moviepy.editor import VideoFileClip  # type:ignore # pylint: disable=import-outside-toplevel
+    clip = VideoFileClip(str(source))
+    try:
+        clip.write_videofile(str(destination), codec=VIDEO_CODEC, audio_codec=AUDIO_CODEC, logger=None)
+    finally:
+        clip.close()
+
+
+def needs_conversion(source: Path, policy: VideoPolicy = VideoPolicy.AUTO) -> bool:
+    """whether prepare_video would convert 'source' under 'policy'
+    """
+    if policy == VideoPolicy.PASSTHROUGH:
+        return False
+    return policy != VideoPolicy.AUTO or pathlib.Path(source).suffix.lower() not in ACCEPTED_VIDEO_MIME_TYPES
+
+
+def converted_path(source: Path, policy: VideoPolicy) -> str:
+    """the path which prepare_video writes the converted 'source' to when no output directory is given
+    """
+    p = pathlib.Path(source)
+    if p.suffix.lower() == ".mp4":
+        return os.path.join(p.parent, f"{p.stem}.{policy.value}.mp4")
+    return os.path.join(p.parent, f"{p.stem}.mp4")
+
+
+def prepare_video(source: Path, policy: VideoPolicy = VideoPolicy.AUTO,
+                  destination: Optional[Path] = None) -> t_tuple[Path, str]:
+    """makes sure a video is in a format which can be uploaded, doing as little work as possible
+
+    Args:
+        source (Path): the path of the video
+        policy (VideoPolicy, optional): how to treat the video. Defaults to VideoPolicy.AUTO.
+        destination (Optional[Path], optional): where to write a converted video.
+            Defaults to None which is next to 'source', see converted_path.
+
+    Raises:
+        FileNotFoundError: if ffmpeg is needed and was not found
+        subprocess.CalledProcessError: if the policy is REMUX and the streams can't be stored in mp4
+
+    Returns:
+        tuple[Path, str]: the path to upload and its mime type
+    """
+    if not needs_conversion(source, policy):
+        return source, mime_type(source) or "application/octet-stream"
+    if destination is None:
+        destination = converted_path(source, policy)
+        if os.path.exists(destination):
+            return destination, MimeType.MP4.value
+    # written under a temporary name so that an interrupted conversion is never mistaken for a finished one
+    d = pathlib.Path(destination)
+    temporary = str(d.with_name(f".{d.stem}.{os.getpid()}-{threading.get_ident()}.tmp.mp4"))
+    try:
+        if policy in {VideoPolicy.AUTO, VideoPolicy.REMUX}:
+            try:
+                remux(source, temporary)
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                if policy == VideoPolicy.REMUX:
+                    raise
+                transcode(source, temporary)
+        else:
+            transcode(source, temporary)
+        copy_file_time(str(source), temporary)
+        os.replace(temporary, destination)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return destination, MimeType.MP4.value
+
+
+__all__ = [
+    "ACCEPTED_VIDEO_MIME_TYPES",
+    "CONVERTIBLE_VIDEO_EXTENSIONS",
+    "TRANSCODE_SETTINGS",
+    "is_video",
+    "mime_type",
+    "needs_conversion",
+    "remux",
+    "transcode",
+    "prepare_video",
+    "converted_path"
+]
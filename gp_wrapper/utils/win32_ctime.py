@@ -95,7 +95,7 @@ class HELPERS:
             raise WinError(get_last_error())
 
     @staticmethod
-    def datetime_to_wintypes_FILETIME(dt: Optional[datetime]) -> wintypes.FILETIME:
+    def datetime_to_wintypes_FILETIME(dt: Optional[datetime]) -> "wintypes.FILETIME":
         if dt is None:
             return wintypes.FILETIME(0xFFFFFFFF, 0xFFFFFFFF)
 
@@ -119,12 +119,9 @@ def set_file_time(filepath: str, filetime: FileTime, *, follow_symlinks: bool =
 
     filepath = os.path.normpath(os.path.abspath(str(filepath)))
 
-    ctime: wintypes.FILETIME = HELPERS.datetime_to_wintypes_FILETIME(
-        filetime.creation)
-    atime: wintypes.FILETIME = HELPERS.datetime_to_wintypes_FILETIME(
-        filetime.access)
-    mtime: wintypes.FILETIME = HELPERS.datetime_to_wintypes_FILETIME(
-        filetime.modification)
+    ctime = HELPERS.datetime_to_wintypes_FILETIME(filetime.creation)
+    atime = HELPERS.datetime_to_wintypes_FILETIME(filetime.access)
+    mtime = HELPERS.datetime_to_wintypes_FILETIME(filetime.modification)
 
     flags = 128 | 0x02000000
 
@@ -193,8 +190,34 @@ def get_file_time(filepath: str, follow_symlinks: bool = True) -> FileTime:
     return FileTime(*list(stage3))
 
 
+def copy_file_time(source: str, destination: str) -> None:
+    """gives 'destination' the times of 'source'.
+    on Windows the creation time is copied as well, elsewhere only the access and modification times
+    """
+    if SUPPORTED:
+        ft = get_file_time(source)
+        set_file_time(destination, FileTime(creation=ft.creation, access=ft.creation, modification=ft.creation))
+        return
+    st = os.stat(source)
+    os.utime(destination, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def set_file_times(filepath: str, moment: datetime) -> None:
+    """gives 'filepath' the time 'moment'.
+    on Windows the creation time is set as well, elsewhere only the access and modification times.
+    a naive 'moment' is taken as local time
+    """
+    if SUPPORTED:
+        set_file_time(filepath, FileTime(creation=moment, access=moment, modification=moment))
+        return
+    timestamp = moment.timestamp()
+    os.utime(filepath, (timestamp, timestamp))
+
+
 __all__ = [
     "set_file_time",
+    "copy_file_time",
+    "set_file_times",
     "get_file_time",
     'FileTime'
 ]
@@ -0,0 +1,68 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Callable
+import pytest
+from google.oauth2.credentials import Credentials  # type:ignore
+from gp_wrapper import GooglePhotos, MemoryTokenStore, RetryPolicy
+from gp_wrapper.utils import SCOPES
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """passes every request to the 'handle' function of its server
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self.server.handle(self)  # type:ignore
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        self.server.handle(self)  # type:ignore
+
+    def reply(self, status: int, body: bytes = b"", headers: Optional[dict] = None) -> None:
+        """sends a complete response
+        """
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server():
+    """starts local HTTP servers which answer with a function of the request handler,
+    returns the root url of each one
+    """
+    servers = []
+
+    def start(handle: Callable[[StubHandler], None]) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        server.handle = handle  # type:ignore
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def gp() -> GooglePhotos:
+    """a GooglePhotos object with valid credentials which sends no request on its own
+    and retries without waiting
+    """
+    store = MemoryTokenStore()
+    store.save(Credentials(
+        token="token", refresh_token="refresh", token_uri="http://127.0.0.1:9/token", client_id="client",
+        client_secret="secret", scopes=SCOPES,
+        expiry=datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+    ))
+    return GooglePhotos(token_store=store, retry_policy=RetryPolicy(base_delay=0, max_delay=0))
@@ -0,0 +1,161 @@
+import os
+import socket
+import hashlib
+import pytest
+from gp_wrapper import MediaDownloader, BaseUrlRefresher, PARTIAL_DOWNLOAD_SUFFIX
+from gp_wrapper.objects.core import CoreMediaItem
+
+DATA = os.urandom(700_000)
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+class FileServer:
+    """serves DATA under every path and records the Range headers it received.
+    the behaviour of a path is chosen by its first component
+    """
+
+    def __init__(self, stub_server) -> None:
+        self.ranges: list = []
+        self.requests: list = []
+        self.drops = 1
+        self.url = stub_server(self.handle)
+
+    def handle(self, handler) -> None:
+        kind = handler.path.strip("/").split("=")[0]
+        header = handler.headers.get("Range")
+        self.requests.append(kind)
+        self.ranges.append(header)
+        if kind == "expired":
+            handler.reply(403)
+            return
+        start = int(header.split("=")[1].rstrip("-")) if header else 0
+        if start >= len(DATA):
+            handler.reply(416, headers={"Content-Range": f"bytes */{len(DATA)}"})
+            return
+        if header and kind == "wrongrange":
+            # answers every range with the start of the file
+            handler.reply(206, DATA, {"Content-Range": f"bytes 0-{len(DATA) - 1}/{len(DATA)}"})
+            return
+        if header:
+            headers = {"Content-Range": f"bytes {start}-{len(DATA) - 1}/{len(DATA)}"}
+            status = 206
+        else:
+            headers, status = {}, 200
+        body = DATA[start:]
+        if kind == "drop" and self.drops > 0:
+            # promises the whole body but closes the connection half way
+            self.drops -= 1
+            handler.send_response(status)
+            for key, value in headers.items():
+                handler.send_header(key, value)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body[:len(body) // 2])
+            handler.wfile.flush()
+            handler.close_connection = True
+            handler.connection.shutdown(socket.SHUT_RDWR)
+            return
+        handler.reply(status, body, headers)
+
+    def item(self, gp, kind: str, filename: str = "photo.jpg") -> CoreMediaItem:
+        return CoreMediaItem._from_dict(gp, {  # pylint: disable=protected-access
+            "id": f"id-{kind}", "productUrl": "", "mimeType": "image/jpeg", "filename": filename,
+            "mediaMetadata": {"creationTime": "2020-01-02T03:04:05Z"}, "baseUrl": f"{self.url}/{kind}"
+        })
+
+
+class StubRefresher(BaseUrlRefresher):
+    """gives every refreshed media item the baseUrl of 'kind' instead of calling batchGet
+    """
+
+    def __init__(self, gp, server: FileServer, kind: str) -> None:
+        super().__init__(gp)
+        self.server = server
+        self.kind = kind
+        self.calls = 0
+
+    def _refresh(self, items) -> None:
+        self.calls += 1
+        for item in items:
+            item._set_base_url(f"{self.server.url}/{self.kind}")  # pylint: disable=protected-access
+            self.refreshed += 1
+
+
+def sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def server(stub_server) -> FileServer:
+    return FileServer(stub_server)
+
+
+def test_dropped_body_is_resumed_with_range(gp, server, tmp_path):
+    downloader = MediaDownloader(gp, str(tmp_path))
+    result = downloader.download(server.item(gp, "drop"))
+    assert result.ok, result.exception
+    assert sha256(result.path) == SHA256
+    assert server.ranges[0] is None
+    assert server.ranges[1] is not None and server.ranges[1] != "bytes=0-"
+    assert result.downloaded == len(DATA)
+    assert not os.path.exists(result.path + PARTIAL_DOWNLOAD_SUFFIX)
+
+
+def test_partial_file_of_a_previous_run_is_resumed(gp, server, tmp_path):
+    downloader = MediaDownloader(gp, str(tmp_path))
+    item = server.item(gp, "ok")
+    with open(downloader.path_of(item) + PARTIAL_DOWNLOAD_SUFFIX, "wb") as f:
+        f.write(DATA[:50_000])
+    result = downloader.download(item)
+    assert result.ok, result.exception
+    assert server.ranges == ["bytes=50000-"]
+    assert result.resumed == 50_000
+    assert result.downloaded == len(DATA) - 50_000
+    assert sha256(result.path) == SHA256
+
+
+def test_unsatisfiable_range_restarts_the_download(gp, server, tmp_path):
+    downloader = MediaDownloader(gp, str(tmp_path))
+    item = server.item(gp, "ok")
+    with open(downloader.path_of(item) + PARTIAL_DOWNLOAD_SUFFIX, "wb") as f:
+        f.write(os.urandom(len(DATA) + 10))
+    result = downloader.download(item)
+    assert result.ok, result.exception
+    assert server.ranges == [f"bytes={len(DATA) + 10}-", None]
+    assert sha256(result.path) == SHA256
+
+
+def test_wrong_range_is_not_written_as_the_start_of_the_file(gp, server, tmp_path):
+    downloader = MediaDownloader(gp, str(tmp_path))
+    item = server.item(gp, "wrongrange")
+    with open(downloader.path_of(item) + PARTIAL_DOWNLOAD_SUFFIX, "wb") as f:
+        f.write(DATA[:50_000])
+    result = downloader.download(item)
+    assert result.ok, result.exception
+    assert server.ranges == ["bytes=50000-", None]
+    assert sha256(result.path) == SHA256
+
+
+def test_refused_base_url_is_refreshed_once(gp, server, tmp_path):
+    refresher = StubRefresher(gp, server, "ok")
+    downloader = MediaDownloader(gp, str(tmp_path), refresher=refresher)
+    item = server.item(gp, "expired")
+    result = downloader.download(item)
+    assert result.ok, result.exception
+    assert refresher.calls == 1
+    assert server.requests == ["expired", "ok"]
+    assert item.baseUrl == f"{server.url}/ok"
+    assert sha256(result.path) == SHA256
+
+
+def test_base_url_refused_after_a_refresh_fails_the_item(gp, server, tmp_path):
+    refresher = StubRefresher(gp, server, "expired")
+    downloader = MediaDownloader(gp, str(tmp_path), refresher=refresher)
+    results = list(downloader.run([server.item(gp, "expired"), server.item(gp, "ok", "other.jpg")]))
+    by_id = {result.mediaItem.id: result for result in results}
+    assert refresher.calls == 1
+    assert not by_id["id-expired"].ok
+    assert by_id["id-expired"].exception.response.status_code == 403
+    assert by_id["id-ok"].ok
+    assert downloader.files == 1 and downloader.failed == 1
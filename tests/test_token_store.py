@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta, timezone
+from google.oauth2.credentials import Credentials  # type:ignore
+from gp_wrapper import GooglePhotos, FileTokenStore, MemoryTokenStore, TokenStore
+from gp_wrapper.utils import SCOPES
+
+
+class RecordingStore(MemoryTokenStore):
+    """a MemoryTokenStore which counts its saves
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.saves = 0
+
+    def save(self, credentials: Credentials) -> None:
+        self.saves += 1
+        super().save(credentials)
+
+
+def now() -> datetime:
+    # google-auth keeps 'expiry' as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def credentials(token_uri: str, expires_in: timedelta) -> Credentials:
+    return Credentials(
+        token="old", refresh_token="refresh", token_uri=token_uri, client_id="client", client_secret="secret",
+        scopes=SCOPES, expiry=now() + expires_in
+    )
+
+
+def token_endpoint(stub_server, status: int = 200) -> tuple:
+    calls = []
+
+    def handle(handler) -> None:
+        calls.append(handler.rfile.read(int(handler.headers["Content-Length"])).decode())
+        if status != 200:
+            handler.reply(status, json.dumps({"error": "invalid_grant"}).encode(),
+                          {"Content-Type": "application/json"})
+            return
+        body = {"access_token": f"new{len(calls)}", "expires_in": 3600, "token_type": "Bearer"}
+        handler.reply(200, json.dumps(body).encode(), {"Content-Type": "application/json"})
+    return stub_server(handle) + "/token", calls
+
+
+def test_valid_token_is_loaded_without_refreshing(stub_server):
+    uri, calls = token_endpoint(stub_server)
+    store = RecordingStore()
+    store.save(credentials(uri, timedelta(hours=1)))
+    gp = GooglePhotos(token_store=store)
+    assert gp.credentials.token == "old"
+    assert not calls
+    assert store.saves == 1
+
+
+def test_expired_token_is_refreshed_and_persisted(stub_server, tmp_path):
+    uri, calls = token_endpoint(stub_server)
+    store = FileTokenStore(str(tmp_path / "token.json"))
+    store.save(credentials(uri, timedelta(minutes=-5)))
+    gp = GooglePhotos(token_store=store)
+    assert gp.credentials.token == "new1"
+    assert len(calls) == 1 and "grant_type=refresh_token" in calls[0]
+    loaded = FileTokenStore(store.path).load()
+    assert loaded is not None
+    assert loaded.token == "new1"
+    assert loaded.token_uri == uri
+    assert loaded.expiry > now() + timedelta(minutes=30)
+
+
+def test_token_is_refreshed_before_it_expires(stub_server):
+    uri, calls = token_endpoint(stub_server)
+    store = RecordingStore()
+    store.save(credentials(uri, timedelta(hours=1)))
+    gp = GooglePhotos(token_store=store)
+    gp.credentials.expiry = now() + timedelta(seconds=60)
+    gp._refresh_credentials()  # pylint: disable=protected-access
+    assert gp.credentials.token == "new1"
+    assert len(calls) == 1
+    assert store.load().token == "new1"  # type:ignore
+    # a fresh token is not refreshed again
+    gp._refresh_credentials()  # pylint: disable=protected-access
+    assert len(calls) == 1
+
+
+def test_refused_refresh_falls_back_to_the_flow(stub_server, monkeypatch):
+    uri, calls = token_endpoint(stub_server, status=400)
+    store: TokenStore = RecordingStore()
+    store.save(credentials(uri, timedelta(minutes=-5)))
+    fresh = credentials(uri, timedelta(hours=1))
+    fresh.token = "interactive"
+
+    class Flow:
+        def run_local_server(self, **kwargs) -> Credentials:
+            return fresh
+    monkeypatch.setattr("gp_wrapper.objects.core.gp.InstalledAppFlow.from_client_secrets_file",
+                        lambda *args, **kwargs: Flow())
+    gp = GooglePhotos(token_store=store)
+    assert len(calls) == 1
+    assert gp.credentials.token == "interactive"
+    assert store.load().token == "interactive"  # type:ignore